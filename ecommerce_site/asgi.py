@@ -3,6 +3,9 @@ ASGI config for ecommerce_site project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Opt-in: the Procfile's `web_asgi` entry serves it with uvicorn workers under
+gunicorn. It turns on STORE_ASGI, which also turns on DB_POOL on PostgreSQL.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -12,5 +15,6 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ecommerce_site.settings')
+os.environ.setdefault('STORE_ASGI', 'True')
 
 application = get_asgi_application()
@@ -44,8 +44,10 @@ INSTALLED_APPS = [
 #  MIDDLEWARE
 # ==========================
 MIDDLEWARE = [
+    'store.middleware.PerfMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'store.middleware.AsyncWhiteNoiseMiddleware',
+    'store.middleware.ReplicaPinMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -57,10 +59,19 @@ MIDDLEWARE = [
 
 
 # ==========================
-#  URLS / WSGI
+#  URLS / WSGI / ASGI
 # ==========================
 ROOT_URLCONF = 'ecommerce_site.urls'
 WSGI_APPLICATION = 'ecommerce_site.wsgi.application'
+ASGI_APPLICATION = 'ecommerce_site.asgi.application'
+
+# Set by ecommerce_site/asgi.py. Under ASGI the index, product detail, cart
+# and catalog list API are served by the async views in store/async_views.py
+# (STORE_ASYNC_VIEWS overrides that), and database connections are not kept
+# between requests, since ASGI runs each request's queries in its own thread:
+# DB_POOL is on by default instead, so connections are still reused.
+STORE_ASGI = os.environ.get('STORE_ASGI', 'False') == 'True'
+STORE_ASYNC_VIEWS = os.environ.get('STORE_ASYNC_VIEWS', str(STORE_ASGI)) == 'True'
 
 # ==========================
 #  DATABASE
@@ -80,6 +91,34 @@ WSGI_APPLICATION = 'ecommerce_site.wsgi.application'
 # Database configuration - Railway Standard
 DATABASE_URL = os.environ.get('DATABASE_URL')
 
+# PostgreSQL connection strategy (see "Database Connections" in the README):
+# - default: each worker thread keeps its connection for CONN_MAX_AGE seconds.
+# - DB_POOL=True: a psycopg 3 pool per worker process, shared by its threads
+#   and async requests; requests check a connection out and return it when
+#   they finish. The server sees processes x DB_POOL_MAX_SIZE connections at
+#   most, so size it under max_connections.
+# - DB_PGBOUNCER=True: PgBouncer in transaction mode does the pooling, so no
+#   persistent connections and no server-side cursors (they do not survive
+#   transaction pooling).
+# CONN_HEALTH_CHECKS pings a reused persistent connection before a request's
+# first query, or a pooled one on checkout, so a dropped connection
+# (server restart, idle timeout) is replaced instead of failing a request.
+DB_PGBOUNCER = os.environ.get('DB_PGBOUNCER', 'False') == 'True'
+DB_POOL = os.environ.get('DB_POOL', str(STORE_ASGI and not DB_PGBOUNCER)) == 'True'
+CONN_MAX_AGE = int(os.environ.get('CONN_MAX_AGE', 0 if DB_POOL or DB_PGBOUNCER or STORE_ASGI else 600))
+CONN_HEALTH_CHECKS = os.environ.get('CONN_HEALTH_CHECKS', 'True') == 'True'
+# How often each worker publishes its pool stats for db_pool_report
+STORE_POOL_STATS_SECONDS = int(os.environ.get('STORE_POOL_STATS_SECONDS', 10))
+DB_POOL_OPTIONS = {
+    'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+    'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+    # Seconds a request waits for a free connection before failing
+    'timeout': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+    # Idle connections above min_size are closed after this many seconds
+    'max_idle': float(os.environ.get('DB_POOL_MAX_IDLE', 300)),
+    'max_lifetime': float(os.environ.get('DB_POOL_MAX_LIFETIME', 1800)),
+}
+
 if not DATABASE_URL:
     print("WARNING: DATABASE_URL environment variable is not set or empty. Defaulting to SQLite for local development.")
     DATABASES = {
@@ -103,14 +142,81 @@ else:
     DATABASES = {
         'default': dj_database_url.parse(
             DATABASE_URL,
-            conn_max_age=600,
+            conn_max_age=CONN_MAX_AGE,
+            conn_health_checks=CONN_HEALTH_CHECKS,
+            disable_server_side_cursors=DB_PGBOUNCER,
             ssl_require=False
         )
     }
+    if DB_POOL and DATABASES['default']['ENGINE'].endswith('postgresql'):
+        DATABASES['default'].setdefault('OPTIONS', {})['pool'] = DB_POOL_OPTIONS
+
+# Read replicas: comma-separated database URLs, added as replica_1,
+# replica_2, ... Catalog pages, catalog API reads, the dashboard and order
+# exports read from one of them (see store/replicas.py); all writes, and
+# every read from a client that wrote in the last REPLICA_PIN_SECONDS, go to
+# the primary. Tests read the test database through them (TEST MIRROR).
+REPLICA_DATABASE_URLS = [url for url in os.environ.get('REPLICA_DATABASE_URLS', '').split(',') if url]
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', 5))
+
+for index, url in enumerate(REPLICA_DATABASE_URLS, 1):
+    DATABASES[f'replica_{index}'] = dj_database_url.parse(
+        url,
+        conn_max_age=CONN_MAX_AGE,
+        conn_health_checks=CONN_HEALTH_CHECKS,
+        disable_server_side_cursors=DB_PGBOUNCER,
+        ssl_require=False
+    )
+    DATABASES[f'replica_{index}']['TEST'] = {'MIRROR': 'default'}
+    if DB_POOL and DATABASES[f'replica_{index}']['ENGINE'].endswith('postgresql'):
+        DATABASES[f'replica_{index}'].setdefault('OPTIONS', {})['pool'] = DB_POOL_OPTIONS
+
+STORE_READ_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['store.replicas.ReplicaRouter']
+
+# ==========================
+#  CACHE & SESSIONS
+# ==========================
+# REDIS_URL (e.g. redis://localhost:6379/0; comma-separate replicas after the
+# primary) gives every process one shared cache and turns on cached_db
+# sessions: reads come from Redis, writes also go to the database so a flush
+# loses nothing. Without it each process keeps a bounded LRU LocMemCache and
+# sessions stay in the database, since a per-process cache in front of
+# sessions would serve stale carts once requests hit different workers.
+# SESSION_BACKEND (db, cached_db, cache, signed_cookies) overrides the choice.
+REDIS_URL = os.environ.get('REDIS_URL')
+CACHE_KEY_PREFIX = os.environ.get('CACHE_KEY_PREFIX', 'store')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL.split(','),
+            'KEY_PREFIX': CACHE_KEY_PREFIX,
+            'OPTIONS': {
+                # Fail fast to the database instead of hanging on a dead Redis
+                'socket_connect_timeout': float(os.environ.get('REDIS_CONNECT_TIMEOUT', 1)),
+                'socket_timeout': float(os.environ.get('REDIS_SOCKET_TIMEOUT', 1)),
+            },
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'store',
+            'KEY_PREFIX': CACHE_KEY_PREFIX,
+            'OPTIONS': {'MAX_ENTRIES': int(os.environ.get('LOCMEM_CACHE_MAX_ENTRIES', 10000))},
+        }
+    }
+
+SESSION_BACKEND = os.environ.get('SESSION_BACKEND', 'cached_db' if REDIS_URL else 'db')
+SESSION_ENGINE = f'django.contrib.sessions.backends.{SESSION_BACKEND}'
 
 
 # Hardcode these for stability until connection is fixed
-DEBUG = True
+# (DEBUG=False in production: DEBUG records every SQL query in memory)
+DEBUG = os.environ.get('DEBUG', 'True') == 'True'
 ALLOWED_HOSTS = ['*']
 SECRET_KEY = os.environ.get('SECRET_KEY', 'django-insecure-6kw3%ir=)%zxl8e8f#sqa!5b=5ao=oebm@&l)t@185$4so5rp7')
 
@@ -163,6 +269,14 @@ LOGOUT_REDIRECT_URL = '/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Serve MEDIA_ROOT through store.media.serve_media even when DEBUG is off.
+# Content-hashed files are cached for a year; others for this many seconds.
+STORE_SERVE_MEDIA = os.environ.get('STORE_SERVE_MEDIA', 'False') == 'True'
+STORE_MEDIA_CACHE_SECONDS = int(os.environ.get('STORE_MEDIA_CACHE_SECONDS', 3600))
+# Internal nginx location mapped to MEDIA_ROOT (e.g. /protected-media/):
+# Django only sets headers and nginx sends the file.
+STORE_MEDIA_ACCEL_REDIRECT = os.environ.get('STORE_MEDIA_ACCEL_REDIRECT', '')
+
 
 # ==========================
 #  MESSAGE FRAMEWORK
@@ -215,9 +329,101 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 10
 }
 
+# Serve product/category list & detail reads from raw rows instead of
+# ModelSerializer (same JSON, much less CPU). See store/fast_serializers.py.
+STORE_FAST_API_READS = os.environ.get('STORE_FAST_API_READS', 'False') == 'True'
+
+# How long a CDN / reverse proxy may serve catalog pages and API reads
+# (s-maxage) before revalidating with the ETag.
+STORE_CATALOG_CACHE_SECONDS = int(os.environ.get('STORE_CATALOG_CACHE_SECONDS', 60))
+
+# Lifetime of cached product cards / detail fragments. Keys include the
+# catalog version, so this only bounds how long dead fragments linger.
+STORE_FRAGMENT_CACHE_SECONDS = int(os.environ.get('STORE_FRAGMENT_CACHE_SECONDS', 3600))
+
+# Checkouts and "frequently bought together" refreshes change the catalog at
+# order rate, so they bump the catalog version (invalidating every ETag and
+# fragment) at most once per this many seconds. A product selling out always
+# bumps it: the storefront only shows whether a product is in stock.
+STORE_CATALOG_MIN_BUMP_SECONDS = int(os.environ.get('STORE_CATALOG_MIN_BUMP_SECONDS', 60))
+
+# "Frequently bought together" products kept per product (store.recommendations);
+# the product page shows the first few, the API all of them.
+STORE_RECOMMENDATIONS_TOP_K = int(os.environ.get('STORE_RECOMMENDATIONS_TOP_K', 10))
+
 CORS_ALLOW_ALL_ORIGINS = True # Change this for production
 
 CSRF_TRUSTED_ORIGINS = [
     'https://*.railway.app',
 ]
 
+# ==========================
+#  STORE SEARCH
+# ==========================
+# Dotted path to a store.search backend. Empty = auto (Postgres full-text
+# search on PostgreSQL, in-process inverted index everywhere else). The
+# inverted index is rebuilt in each process after products are saved in
+# another one (SearchIndexVersion) and returns at most its max_results (1000)
+# best matches; prefer PostgreSQL for large catalogs.
+STORE_SEARCH_BACKEND = os.environ.get('STORE_SEARCH_BACKEND', '')
+
+# Share of requests measured by store.middleware.PerfMiddleware (0 turns it
+# off). Counters reach the shared cache every STORE_PERF_FLUSH_SECONDS per
+# process; STORE_PERF_LOG=True also logs each sampled request as JSON.
+STORE_PERF_SAMPLE_RATE = float(os.environ.get('STORE_PERF_SAMPLE_RATE', 0.1))
+STORE_PERF_FLUSH_SECONDS = int(os.environ.get('STORE_PERF_FLUSH_SECONDS', 10))
+STORE_PERF_LOG = os.environ.get('STORE_PERF_LOG', 'False') == 'True'
+
+# ==========================
+#  BACKGROUND JOBS & EMAIL
+# ==========================
+# Post-checkout work (confirmation email, sales rollups, recommendations) and
+# image variants go through store.jobs. By default they run in the web
+# process after the request's transaction commits, so `runserver` needs no
+# worker. Production sets STORE_JOB_QUEUE=True (the Procfile does) to queue
+# them in the database for `manage.py run_store_worker` (STORE_JOB_CONCURRENCY
+# threads per process). Failed jobs are retried STORE_JOB_MAX_ATTEMPTS times,
+# STORE_JOB_RETRY_DELAY seconds apart, doubling each time; a job running
+# longer than STORE_JOB_TIMEOUT seconds is assumed lost and run again. Web
+# processes log a warning when a queued job has waited STORE_JOB_BACKLOG_WARNING
+# seconds, e.g. because no worker is running.
+STORE_JOB_QUEUE = os.environ.get('STORE_JOB_QUEUE', 'False') == 'True'
+STORE_JOB_CONCURRENCY = int(os.environ.get('STORE_JOB_CONCURRENCY', 4))
+STORE_JOB_POLL_SECONDS = float(os.environ.get('STORE_JOB_POLL_SECONDS', 1))
+STORE_JOB_MAX_ATTEMPTS = int(os.environ.get('STORE_JOB_MAX_ATTEMPTS', 5))
+STORE_JOB_RETRY_DELAY = int(os.environ.get('STORE_JOB_RETRY_DELAY', 10))
+STORE_JOB_TIMEOUT = int(os.environ.get('STORE_JOB_TIMEOUT', 300))
+STORE_JOB_BACKLOG_WARNING = int(os.environ.get('STORE_JOB_BACKLOG_WARNING', 300))
+
+# Console backend (emails printed to stdout) unless an SMTP server is set
+EMAIL_HOST = os.environ.get('EMAIL_HOST', '')
+EMAIL_BACKEND = os.environ.get(
+    'EMAIL_BACKEND',
+    'django.core.mail.backends.smtp.EmailBackend' if EMAIL_HOST else 'django.core.mail.backends.console.EmailBackend',
+)
+EMAIL_PORT = int(os.environ.get('EMAIL_PORT', 587))
+EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER', '')
+EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
+EMAIL_USE_TLS = os.environ.get('EMAIL_USE_TLS', 'True') == 'True'
+EMAIL_TIMEOUT = int(os.environ.get('EMAIL_TIMEOUT', 10))
+DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'store@localhost')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'store.perf': {
+            'handlers': ['console'],
+            'level': 'INFO' if STORE_PERF_LOG else 'WARNING',
+            'propagate': False,
+        },
+        'store.jobs': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
@@ -0,0 +1,79 @@
+"""Locust load test for a running store seeded with `manage.py seed_store`.
+
+    pip install locust
+    locust -f locustfile.py --host http://127.0.0.1:8000
+
+Shoppers browse, search, open products and cycle their cart (logged in as
+bench_customer_N); API clients read the DRF endpoints. For query counts per
+request, run the server with STORE_PERF_SAMPLE_RATE=1 and watch
+/dashboard/perf/ or the Server-Timing headers. For repeatable numbers that
+can be compared across commits, prefer `manage.py bench_suite`.
+"""
+import random
+
+from locust import HttpUser, between, task
+
+PASSWORD = 'bench-password'  # store.loadtest.PASSWORD
+USERS = 1000  # seed_store --users
+WORDS = ['red', 'blue', 'cotton', 'leather', 'classic', 'slim', 'sport', 'winter', 'summer', 'premium']
+
+
+class _Catalog(HttpUser):
+    abstract = True
+    product_ids = []
+
+    def on_start(self):
+        if not _Catalog.product_ids:
+            response = self.client.get('/api/products/', name='/api/products/')
+            _Catalog.product_ids = [product['id'] for product in response.json().get('results', [])]
+
+    def product_id(self):
+        return random.choice(self.product_ids) if self.product_ids else 1
+
+
+class Shopper(_Catalog):
+    weight = 3
+    wait_time = between(1, 3)
+
+    def on_start(self):
+        super().on_start()
+        self.client.get('/login/')
+        self.client.post('/login/', {
+            'username': f'bench_customer_{random.randrange(USERS)}', 'password': PASSWORD,
+        }, headers={'X-CSRFToken': self.client.cookies.get('csrftoken', '')})
+
+    @task(5)
+    def browse(self):
+        self.client.get('/')
+
+    @task(3)
+    def search(self):
+        self.client.get('/', params={'q': random.choice(WORDS)}, name='/?q=')
+
+    @task(4)
+    def product_detail(self):
+        self.client.get(f'/product/{self.product_id()}/', name='/product/[id]/')
+
+    @task(1)
+    def cart_cycle(self):
+        pk = self.product_id()
+        self.client.get(f'/cart/add/{pk}/', name='/cart/add/[id]/')
+        self.client.get('/cart/')
+        self.client.get(f'/cart/remove/{pk}/', name='/cart/remove/[id]/')
+
+
+class ApiClient(_Catalog):
+    weight = 1
+    wait_time = between(0.5, 2)
+
+    @task(3)
+    def products(self):
+        self.client.get('/api/products/', params={'page': random.randint(1, 20)}, name='/api/products/?page=')
+
+    @task(2)
+    def product(self):
+        self.client.get(f'/api/products/{self.product_id()}/', name='/api/products/[id]/')
+
+    @task(1)
+    def categories(self):
+        self.client.get('/api/categories/')
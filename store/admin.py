@@ -1,5 +1,12 @@
-from django.contrib import admin
-from .models import Category, Product, CartItem, WishlistItem, Order, OrderItem
+from django.contrib import admin, messages
+from django.core.exceptions import PermissionDenied
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
+from django.utils import timezone
+from .forms import ProductImportForm
+from .imports import ImportFileError, ProductImporter, format_for, read_rows, text_stream
+from .models import Category, Product, CartItem, WishlistItem, Order, OrderItem, Job
 
 class CategoryAdmin(admin.ModelAdmin):
     list_display = ('name', 'description')
@@ -14,6 +21,41 @@ class ProductAdmin(admin.ModelAdmin):
     ordering = ('name',)
     fields = ('name', 'description', 'price', 'category', 'image', 'stock')
 
+    def get_urls(self):
+        return [
+            path('import/', self.admin_site.admin_view(self.import_view), name='store_product_import'),
+        ] + super().get_urls()
+
+    def import_view(self, request):
+        """Upload a CSV / JSON Lines file; same rules as `manage.py import_products` (without images)."""
+        if not (self.has_add_permission(request) and self.has_change_permission(request)):
+            raise PermissionDenied
+        form = ProductImportForm(request.POST or None, request.FILES or None)
+        if form.is_valid():
+            upload = form.cleaned_data['file']
+            importer = ProductImporter(create_categories=form.cleaned_data['create_categories'])
+            try:
+                totals = importer.run(read_rows(text_stream(upload.file), format_for(upload.name)))
+            except (ImportFileError, UnicodeDecodeError) as exc:
+                form.add_error('file', str(exc))
+            else:
+                self.message_user(request, (
+                    f"Imported {totals['created'] + totals['updated']} of {totals['rows']} rows "
+                    f"({totals['created']} created, {totals['updated']} updated)."
+                ), messages.SUCCESS)
+                for error in totals['errors'][:10]:
+                    self.message_user(request, f"Row {error['row']}: {error['errors']}", messages.WARNING)
+                if totals['failed'] > 10:
+                    self.message_user(request, f"{totals['failed'] - 10} more rows failed.", messages.WARNING)
+                return redirect('admin:store_product_changelist')
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Import products',
+            'form': form,
+        }
+        return TemplateResponse(request, 'admin/store/product/import.html', context)
+
 class OrderItemInline(admin.TabularInline):
     model = OrderItem
     extra = 0
@@ -24,8 +66,22 @@ class OrderAdmin(admin.ModelAdmin):
     search_fields = ('first_name', 'email', 'phone')
     inlines = [OrderItemInline]
 
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'status', 'attempts', 'max_attempts', 'run_at', 'locked_by', 'created_at')
+    list_filter = ('status', 'name')
+    readonly_fields = ('locked_by', 'locked_at', 'last_error', 'created_at')
+    actions = ['retry']
+
+    @admin.action(description="Run selected jobs again")
+    def retry(self, request, queryset):
+        updated = queryset.exclude(status=Job.RUNNING).update(
+            status=Job.QUEUED, attempts=0, run_at=timezone.now(), last_error='',
+        )
+        self.message_user(request, f"Queued {updated} job(s).", messages.SUCCESS)
+
 admin.site.register(Category, CategoryAdmin)
 admin.site.register(Product, ProductAdmin)
 admin.site.register(Order, OrderAdmin)
 admin.site.register(CartItem)
-admin.site.register(WishlistItem)
\ No newline at end of file
+admin.site.register(WishlistItem)
+admin.site.register(Job, JobAdmin)
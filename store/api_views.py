@@ -1,42 +1,233 @@
-from rest_framework import viewsets, permissions
-from .models import Category, Product, CartItem, WishlistItem, Order
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import QuerySet
+from django.http import Http404, StreamingHttpResponse
+from django.utils import timezone
+from rest_framework import viewsets, permissions, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from . import bulk, exports
+from .models import Category, Product, CartItem, WishlistItem, Order, Recommendation
 from .serializers import CategorySerializer, ProductSerializer, CartItemSerializer, WishlistItemSerializer, OrderSerializer
+from .serializers import CategoryBulkSerializer, ProductBulkSerializer, StockUpdateSerializer, OrderExportFilterSerializer
+from .search import search_products
+from .cart import DBCart
+from .pagination import CatalogPagination
+from .fast_serializers import FastCategorySerializer, FastProductSerializer
+from .catalog import catalog_conditional
+from .replicas import replica_reads
 
-class CategoryViewSet(viewsets.ModelViewSet):
+
+class EagerLoadingViewSetMixin:
+    """Applies the serializer's eager-loading plan to every queryset, so list
+    endpoints cost a fixed number of queries whatever the page size."""
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        return self.get_serializer_class().setup_eager_loading(queryset)
+
+
+class FastReadMixin:
+    """Opt-in (settings.STORE_FAST_API_READS) list/retrieve path that fetches
+    raw rows and renders them with `fast_serializer_class` instead of the
+    ModelSerializer. Responses are identical; writes are unaffected."""
+
+    fast_serializer_class = None
+
+    def use_fast_reads(self):
+        return self.fast_serializer_class is not None and getattr(settings, 'STORE_FAST_API_READS', False)
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        # Ranked search results are product instances already, not a queryset
+        if not self.use_fast_reads() or not isinstance(queryset, QuerySet):
+            page = self.paginate_queryset(queryset)
+            if page is not None:
+                return self.get_paginated_response(self.get_serializer(page, many=True).data)
+            return Response(self.get_serializer(queryset, many=True).data)
+
+        to_dict = self.fast_serializer_class.compile(request)
+        rows = self.fast_serializer_class.rows(queryset)
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response([to_dict(row) for row in page])
+        return Response([to_dict(row) for row in rows])
+
+    def retrieve(self, request, *args, **kwargs):
+        if not self.use_fast_reads():
+            return super().retrieve(request, *args, **kwargs)
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.filter_queryset(self.get_queryset()).filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        row = self.fast_serializer_class.rows(queryset).first()
+        if row is None:
+            raise Http404
+        return Response(self.fast_serializer_class.compile(request)(row))
+
+
+class CatalogCacheMixin:
+    """ETag/Last-Modified from the catalog version on list and retrieve, so
+    unchanged catalog reads are answered with 304 before any query runs."""
+
+    def list(self, request, *args, **kwargs):
+        return catalog_conditional(super().list)(request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return catalog_conditional(super().retrieve)(request, *args, **kwargs)
+
+
+class ReplicaReadMixin:
+    """GET/HEAD/OPTIONS requests read from a read replica when one is
+    configured (see store.replicas); writes always use the primary."""
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in permissions.SAFE_METHODS:
+            return super().dispatch(request, *args, **kwargs)
+        with replica_reads():
+            return super().dispatch(request, *args, **kwargs)
+
+
+class BulkWriteMixin:
+    """Shared handling for list-payload write actions: validate every row,
+    write the valid ones with `write`, report the rest per row."""
+
+    def bulk_write(self, serializer_class, write, **context):
+        serializer = serializer_class(
+            data=self.request.data, many=True, context={**self.get_serializer_context(), **context}
+        )
+        serializer.is_valid(raise_exception=True)
+        errors = serializer.row_errors
+        if not serializer.validated_data:
+            return Response({'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({**write(serializer.validated_data), 'errors': errors})
+
+
+class ExportMixin:
+    """Stream an export generator as the negotiated format (?format=csv or
+    ?format=ndjson, CSV by default) without pagination."""
+
+    export_renderer_classes = [exports.CSVExportRenderer, exports.NDJSONExportRenderer]
+
+    def stream_export(self, export, queryset, basename):
+        fmt = self.request.accepted_renderer.format
+        content = export(queryset, fmt)
+        if isinstance(self.request._request, ASGIRequest):
+            content = exports.aiterate(content)
+        response = StreamingHttpResponse(content, content_type=exports.CONTENT_TYPES[fmt])
+        filename = f"{basename}-{timezone.localdate():%Y%m%d}.{fmt}"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
+class CategoryViewSet(ReplicaReadMixin, BulkWriteMixin, CatalogCacheMixin, FastReadMixin, EagerLoadingViewSetMixin, viewsets.ModelViewSet):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
+    fast_serializer_class = FastCategorySerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
-class ProductViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=['post'], permission_classes=[permissions.IsAdminUser])
+    def bulk(self, request):
+        """Create or update many categories, matched by name."""
+        return self.bulk_write(CategoryBulkSerializer, bulk.upsert_categories)
+
+class ProductViewSet(ReplicaReadMixin, ExportMixin, BulkWriteMixin, CatalogCacheMixin, FastReadMixin, EagerLoadingViewSetMixin, viewsets.ModelViewSet):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
+    fast_serializer_class = FastProductSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = CatalogPagination
+    # ?paginate=cursor&ordering=price walks the catalog by (price, id)
+    keyset_orderings = {'id': ('id',), 'price': ('price', 'id'), '-price': ('-price', '-id')}
 
-class CartItemViewSet(viewsets.ModelViewSet):
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        query = self.request.query_params.get('search')
+        if query and self.action == 'list':
+            queryset = search_products(queryset, query)
+        return queryset
+
+    @action(detail=False, methods=['post'], permission_classes=[permissions.IsAdminUser])
+    def bulk(self, request):
+        """Create or update many products, matched by name."""
+        category_ids = set(Category.objects.values_list('id', flat=True))
+        return self.bulk_write(ProductBulkSerializer, bulk.upsert_products, category_ids=category_ids)
+
+    @action(detail=False, methods=['patch'], permission_classes=[permissions.IsAdminUser])
+    def stock(self, request):
+        """Set absolute stock levels: [{"id": 1, "stock": 5}, ...]."""
+        ids = [row.get('id') for row in request.data if isinstance(row, dict)] if isinstance(request.data, list) else []
+        ids = [int(pk) for pk in ids if str(pk).isdigit()]
+        product_ids = set(Product.objects.filter(pk__in=ids).values_list('id', flat=True))
+        return self.bulk_write(StockUpdateSerializer, bulk.set_stock, product_ids=product_ids)
+
+    @action(detail=False, permission_classes=[permissions.IsAdminUser],
+            renderer_classes=ExportMixin.export_renderer_classes)
+    def export(self, request):
+        """The whole catalog as CSV or NDJSON."""
+        return self.stream_export(exports.export_products, Product.objects.all(), 'products')
+
+    @action(detail=True)
+    def recommendations(self, request, pk=None):
+        """Products most often bought together with this one, best first
+        (see store.recommendations)."""
+        return catalog_conditional(self._recommendations)(request, pk)
+
+    def _recommendations(self, request, pk):
+        if not pk.isdigit():
+            raise Http404
+        products = [
+            recommendation.recommended for recommendation in
+            Recommendation.objects.filter(product_id=pk).select_related('recommended__category').order_by('rank')
+        ]
+        if not products:
+            self.get_object()  # 404 for an unknown product
+        return Response(ProductSerializer(products, many=True, context=self.get_serializer_context()).data)
+
+class CartItemViewSet(EagerLoadingViewSetMixin, viewsets.ModelViewSet):
+    queryset = CartItem.objects.all()
     serializer_class = CartItemSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return CartItem.objects.filter(user=self.request.user)
+        return super().get_queryset().filter(user=self.request.user)
 
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        # Same upsert as the web cart: adding a product twice bumps its quantity
+        product = serializer.validated_data['product']
+        DBCart(self.request.user).add(product.pk, serializer.validated_data.get('quantity', 1))
+        serializer.instance = self.get_queryset().get(product=product)
 
-class WishlistItemViewSet(viewsets.ModelViewSet):
+class WishlistItemViewSet(EagerLoadingViewSetMixin, viewsets.ModelViewSet):
+    queryset = WishlistItem.objects.all()
     serializer_class = WishlistItemSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return WishlistItem.objects.filter(user=self.request.user)
+        return super().get_queryset().filter(user=self.request.user)
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
-class OrderViewSet(viewsets.ModelViewSet):
+class OrderViewSet(ExportMixin, EagerLoadingViewSetMixin, viewsets.ModelViewSet):
+    queryset = Order.objects.all()
     serializer_class = OrderSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = CatalogPagination
+    keyset_orderings = {'-id': ('-id',), 'id': ('id',), '-created_at': ('-created_at', '-id')}
 
     def get_queryset(self):
+        queryset = super().get_queryset()
         if self.request.user.is_staff:
-            return Order.objects.all()
-        return Order.objects.filter(user=self.request.user)
+            return queryset
+        return queryset.filter(user=self.request.user)
+
+    @action(detail=False, renderer_classes=ExportMixin.export_renderer_classes)
+    def export(self, request):
+        """Orders with their items as CSV (one line per item) or NDJSON (one
+        order per line), filtered by ?start=, ?end= and ?status=."""
+        filters = OrderExportFilterSerializer(data=request.query_params)
+        filters.is_valid(raise_exception=True)
+        queryset = exports.filter_orders(
+            self.get_queryset(), filters.validated_data.get('start'), filters.validated_data.get('end'),
+            filters.validated_data.get('status'),
+        )
+        return self.stream_export(exports.export_orders, queryset, 'orders')
@@ -0,0 +1,150 @@
+import math
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponse
+from django.shortcuts import aget_object_or_404, render
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from . import api_views
+from .cart import aget_cart
+from .catalog import catalog_conditional, catalog_page
+from .fragments import afragment_context, related_products
+from .models import Product
+from .pagination import InvalidCursor, akeyset_page
+from .replicas import read_from_replica, replica_reads
+from .views import catalog_filters, search_page
+
+# ============================
+# ⚡ ASYNC VIEWS
+# ============================
+
+# Async versions of the busiest reads, routed in place of the sync views when
+# settings.STORE_ASYNC_VIEWS is on (the default under ASGI, see
+# ecommerce_site/asgi.py). Their queries go through the async ORM, so while
+# one request waits on the database or a slow client the worker's event loop
+# keeps serving others. Template rendering may still run lazy queries and
+# cache lookups (navbar counts, fragments), so it happens in one
+# sync_to_async hop per request. Responses match the sync views.
+
+PAGE_SIZE = 12
+
+
+@read_from_replica
+@catalog_page
+async def index(request):
+    products, context = catalog_filters(request)
+    context.update(await afragment_context(request))
+
+    if context['query']:
+        # Search backends (e.g. the in-process index) are sync
+        context.update(await sync_to_async(search_page)(request, products, context['query']))
+    else:
+        try:
+            page, next_cursor, previous_cursor = await akeyset_page(products, ('id',), request.GET.get('cursor'), PAGE_SIZE)
+        except InvalidCursor:
+            page, next_cursor, previous_cursor = await akeyset_page(products, ('id',), None, PAGE_SIZE)
+        context.update(products=page, next_cursor=next_cursor, previous_cursor=previous_cursor)
+
+    return await sync_to_async(render)(request, 'store/index.html', context)
+
+
+@read_from_replica
+@catalog_page
+async def product_detail(request, pk):
+    product = await aget_object_or_404(Product.objects.select_related('category'), pk=pk)
+    context = await afragment_context(request)
+    return await sync_to_async(render)(request, 'store/product_detail.html', {
+        'product': product,
+        # Only evaluated when the related-products fragment is not cached
+        'related_products': lambda: related_products(product, context['catalog_version']),
+        **context,
+    })
+
+
+async def cart(request):
+    cart_items, total = await (await aget_cart(request)).alines()
+
+    return await sync_to_async(render)(request, 'store/cart.html', {
+        'cart_items': cart_items,
+        'total': total
+    })
+
+
+# ============================
+# ⚡ ASYNC CATALOG API READS
+# ============================
+
+# With settings.STORE_FAST_API_READS on, plain JSON page-number list
+# requests (?page= only) are answered here from raw rows with the viewset's
+# fast serializer, over the viewset's queryset and page size, in the same
+# shape, bytes and headers. Anything else (the setting off, writes,
+# ?search=, cursors, the browsable API) goes to the sync viewset.
+
+def _wants_plain_json(request):
+    if not settings.STORE_FAST_API_READS:
+        return False
+    if request.method not in ('GET', 'HEAD') or set(request.GET) - {'page', 'format'}:
+        return False
+    if 'format' in request.GET:
+        return request.GET['format'] == 'json'
+    return 'text/html' not in request.headers.get('Accept', '')
+
+
+async def _page_response(request, rows, to_dict, page_size):
+    count = await rows.acount()
+    num_pages = max(1, math.ceil(count / page_size))
+    page = request.GET.get('page', '1')
+    number = num_pages if page == 'last' else int(page) if page.isdigit() else 0
+    if not 1 <= number <= num_pages:
+        return _json_response({'detail': 'Invalid page.'}, status=404)
+
+    url = request.build_absolute_uri()
+    start = (number - 1) * page_size
+    data = {
+        'count': count,
+        'next': replace_query_param(url, 'page', number + 1) if number < num_pages else None,
+        'previous': (
+            None if number == 1
+            else remove_query_param(url, 'page') if number == 2
+            else replace_query_param(url, 'page', number - 1)
+        ),
+        'results': [to_dict(row) async for row in rows[start:start + page_size]],
+    }
+    return _json_response(data)
+
+
+def _json_response(data, status=200):
+    response = HttpResponse(JSONRenderer().render(data), content_type='application/json', status=status)
+    response['Vary'] = 'Accept'
+    response['Allow'] = 'GET, POST, HEAD, OPTIONS'
+    return response
+
+
+def catalog_list_view(viewset):
+    sync_view = sync_to_async(viewset.as_view({'get': 'list', 'post': 'create'}))
+    fast_serializer_class = viewset.fast_serializer_class
+
+    @catalog_conditional
+    async def async_list(request):
+        # Same rows, in the same order, as FastReadMixin.list
+        rows = fast_serializer_class.rows(viewset.queryset.all())
+        return await _page_response(
+            request, rows, fast_serializer_class.compile(request), viewset.pagination_class.page_size,
+        )
+
+    # The viewset checks CSRF itself for session-authenticated writes, and
+    # reads from a replica itself (ReplicaReadMixin)
+    @csrf_exempt
+    async def view(request):
+        if not _wants_plain_json(request):
+            return await sync_view(request)
+        with replica_reads():
+            return await async_list(request)
+    return view
+
+
+category_list = catalog_list_view(api_views.CategoryViewSet)
+product_list = catalog_list_view(api_views.ProductViewSet)
@@ -0,0 +1,193 @@
+import math
+import os
+import random
+import statistics
+import threading
+import time
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from .models import CartItem, Category, Order, OrderItem, Product, WishlistItem
+
+# ============================
+# ⏱️ BENCHMARK HELPERS
+# ============================
+
+WORDS = [
+    'classic', 'leather', 'running', 'black', 'red', 'blue', 'grey', 'casual', 'premium', 'sport',
+    'jordan', 'boots', 'sandals', 'hoodie', 'jacket', 'jeans', 'skirt', 'shirt', 'polo', 'loafers',
+    'heels', 'shorts', 'sweatshirt', 'dress', 'cotton', 'denim', 'vintage', 'summer', 'winter', 'slim',
+]
+
+
+class Rollback(Exception):
+    pass
+
+
+@contextmanager
+def rolled_back():
+    """Run a benchmark inside a transaction that is always rolled back, so
+    seeded data never leaks into the real database."""
+    try:
+        with transaction.atomic():
+            yield
+            raise Rollback
+    except Rollback:
+        pass
+
+
+def seed_catalog(size, categories=10, seed=42, batch_size=5000):
+    """Bulk-create `size` deterministic products spread over `categories`."""
+    rng = random.Random(seed)
+    cats = Category.objects.bulk_create(
+        [Category(name=f'Bench Category {i}') for i in range(categories)]
+    )
+    batch = []
+    for i in range(size):
+        words = rng.sample(WORDS, 3)
+        batch.append(Product(
+            name=f'{" ".join(words).title()} {i}',
+            description=' '.join(rng.choices(WORDS, k=12)),
+            price=Decimal(rng.randint(100, 50000)) / 100,
+            category=cats[i % categories],
+            stock=rng.randint(0, 100),
+        ))
+        if len(batch) >= batch_size:
+            Product.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        Product.objects.bulk_create(batch)
+    return cats
+
+
+def seed_customers(count, orders_per_customer=5, seed=42, batch_size=5000, orders=None, password=None):
+    """Bulk-create `count` users with orders, wishlist and cart rows over the
+    existing products. Orders (`orders` in total, else `orders_per_customer`
+    each) get random statuses and up to three items. `password` is hashed
+    once and shared by every user."""
+    rng = random.Random(seed)
+    products = list(Product.objects.values_list('pk', 'price'))
+    statuses = [status for status, _ in Order.STATUS_CHOICES]
+    hashed = make_password(password)  # None: unusable password
+    users = User.objects.bulk_create(
+        [User(username=f'bench_customer_{i}', email=f'bench_customer_{i}@example.com', password=hashed)
+         for i in range(count)],
+        batch_size=batch_size,
+    )
+
+    total = count * orders_per_customer if orders is None else orders
+    lines = [
+        [(pk, price, rng.randint(1, 3)) for pk, price in rng.sample(products, min(3, len(products)))]
+        for _ in range(total)
+    ]
+    orders = Order.objects.bulk_create([
+        Order(user=users[i % count], first_name=users[i % count].username, email=users[i % count].email,
+              address='Street 1', city='Phnom Penh', phone='012000000',
+              total_amount=sum(price * quantity for _, price, quantity in lines[i]),
+              payment_method='khqr', status=rng.choice(statuses))
+        for i in range(total)
+    ], batch_size=batch_size) if users else []
+    items = [
+        OrderItem(order=order, product_id=pk, quantity=quantity, price=price)
+        for order, order_lines in zip(orders, lines) for pk, price, quantity in order_lines
+    ]
+    OrderItem.objects.bulk_create(items, batch_size=batch_size)
+
+    wishlist, cart = [], []
+    for user in users:
+        picks = rng.sample(products, min(6, len(products)))
+        wishlist += [WishlistItem(user=user, product_id=pk) for pk, _ in picks[:3]]
+        cart += [CartItem(user=user, product_id=pk, quantity=1) for pk, _ in picks[3:]]
+    WishlistItem.objects.bulk_create(wishlist, batch_size=batch_size)
+    CartItem.objects.bulk_create(cart, batch_size=batch_size)
+    return users
+
+
+def percentiles(samples_ms):
+    """p50/p95/p99/max of a list of millisecond timings (nearest rank)."""
+    ordered = sorted(samples_ms)
+    if not ordered:
+        return {'p50_ms': None, 'p95_ms': None, 'p99_ms': None, 'max_ms': None}
+
+    def rank(fraction):
+        return round(ordered[max(0, math.ceil(len(ordered) * fraction) - 1)], 3)
+    return {'p50_ms': rank(0.50), 'p95_ms': rank(0.95), 'p99_ms': rank(0.99), 'max_ms': round(ordered[-1], 3)}
+
+
+def measure(func, repeat=5):
+    """Call `func` `repeat` times and return timings in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        'min_ms': round(min(timings), 3),
+        'median_ms': round(statistics.median(timings), 3),
+        'max_ms': round(max(timings), 3),
+    }
+
+
+def seed_order_items(total, items_per_order=3, seed=42, batch_size=5000):
+    """Bulk-create orders for one bench customer until there are `total`
+    order items, a batch at a time so seeding millions of rows stays flat."""
+    rng = random.Random(seed)
+    products = list(Product.objects.values_list('pk', 'price'))
+    statuses = [status for status, _ in Order.STATUS_CHOICES]
+    user = User.objects.create(username='bench_exporter')
+    orders_per_batch = max(batch_size // items_per_order, 1)
+    created = 0
+    while created < total:
+        orders = Order.objects.bulk_create([
+            Order(user=user, first_name='Bench', email='bench@example.com', address='Street 1',
+                  city='Phnom Penh', phone='012000000', total_amount=0, payment_method='khqr',
+                  status=rng.choice(statuses))
+            for _ in range(min(orders_per_batch, -(-(total - created) // items_per_order)))
+        ])
+        items = [
+            OrderItem(order=order, product_id=pk, quantity=rng.randint(1, 3), price=price)
+            for order in orders for pk, price in rng.sample(products, min(items_per_order, len(products)))
+        ][:total - created]
+        OrderItem.objects.bulk_create(items)
+        created += len(items)
+    return created
+
+
+def current_rss():
+    """Resident set size of this process in bytes (Linux), else None."""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def peak_rss(func, interval=0.01):
+    """Run `func`, sampling RSS from a thread. Returns (seconds, peak RSS
+    growth over the starting RSS in bytes, or None where unsupported)."""
+    baseline = current_rss()
+    peak = [baseline]
+    done = threading.Event()
+
+    def sample():
+        while not done.wait(interval):
+            peak[0] = max(peak[0], current_rss())
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    if baseline is not None:
+        sampler.start()
+    start = time.perf_counter()
+    try:
+        func()
+    finally:
+        elapsed = time.perf_counter() - start
+        done.set()
+        if baseline is not None:
+            sampler.join()
+    if baseline is None:
+        return elapsed, None
+    return elapsed, max(peak[0], current_rss()) - baseline
@@ -0,0 +1,81 @@
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db import transaction
+
+from . import search
+from .catalog import bump_catalog_version
+from .context_processors import CATEGORIES_CACHE_KEY
+from .models import Category, Product
+
+# ============================
+# 📥 BULK CATALOG WRITES
+# ============================
+
+# Supplier syncs send thousands of rows per request. Rows are written with a
+# handful of batched INSERT ... ON CONFLICT / UPDATE ... CASE statements in
+# one transaction. bulk_create/bulk_update send no model signals, so the
+# side effects the signals would have triggered (catalog version, search
+# index, navbar cache) are applied here once per request.
+
+BATCH_SIZE = 1000
+
+
+def _chunks(items, size=BATCH_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def upsert(model, rows, unique_field, batch_size=BATCH_SIZE):
+    """Insert or update `rows` (dicts of model field values) matched on
+    `unique_field`. Fields a row leaves out keep their stored value, so rows
+    are written in groups sharing the same set of fields.
+    Returns (created, updated)."""
+    keys = [row[unique_field] for row in rows]
+    existing = 0
+    for chunk in _chunks(keys, batch_size):
+        existing += model.objects.filter(**{f'{unique_field}__in': chunk}).count()
+
+    groups = defaultdict(list)
+    for row in rows:
+        groups[tuple(sorted(row))].append(model(**row))
+    with transaction.atomic():
+        for fields, objs in groups.items():
+            update_fields = [field for field in fields if field != unique_field]
+            if update_fields:
+                model.objects.bulk_create(
+                    objs, batch_size=batch_size, update_conflicts=True,
+                    unique_fields=[unique_field], update_fields=update_fields,
+                )
+            else:
+                model.objects.bulk_create(objs, batch_size=batch_size, ignore_conflicts=True)
+    return len(keys) - existing, existing
+
+
+def upsert_products(rows):
+    with transaction.atomic():
+        created, updated = upsert(Product, rows, 'name')
+        bump_catalog_version()
+    names = [row['name'] for row in rows]
+    transaction.on_commit(lambda: [
+        search.get_backend().index_products(Product.objects.filter(name__in=chunk))
+        for chunk in _chunks(names)
+    ])
+    return {'created': created, 'updated': updated}
+
+
+def upsert_categories(rows):
+    with transaction.atomic():
+        created, updated = upsert(Category, rows, 'name')
+        bump_catalog_version()
+    transaction.on_commit(lambda: cache.delete(CATEGORIES_CACHE_KEY))
+    return {'created': created, 'updated': updated}
+
+
+def set_stock(rows):
+    """Absolute stock levels for existing products: [{'id': .., 'stock': ..}]."""
+    products = [Product(pk=row['id'], stock=row['stock']) for row in rows]
+    with transaction.atomic():
+        updated = Product.objects.bulk_update(products, ['stock'], batch_size=BATCH_SIZE)
+        bump_catalog_version()
+    return {'updated': updated}
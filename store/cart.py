@@ -0,0 +1,233 @@
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+
+from .models import CartItem, Product
+
+# ============================
+# 🛒 CART SERVICE
+# ============================
+
+# Logged-in users keep their cart in CartItem (shared with the REST API).
+# Anonymous visitors get a small session cart ({product_id: {'quantity': n}})
+# that is merged into CartItem when they log in.
+
+SESSION_KEY = 'cart'
+COUNT_CACHE_TIMEOUT = 60 * 60
+
+
+def cart_count_cache_key(user_id):
+    return f'store:cart_count:{user_id}'
+
+
+def _line(product, quantity):
+    return {
+        'product': product,
+        'quantity': quantity,
+        'price': product.price,
+        'total': product.price * quantity,
+    }
+
+
+def _cart_keys(cart, product_ids):
+    keys = [str(pk) for pk in product_ids] if product_ids is not None else list(cart)
+    return [key for key in dict.fromkeys(keys) if key in cart and key.isdigit()]
+
+
+def _cart_lines(cart, keys, products):
+    lines = []
+    total = Decimal('0')
+    for key in keys:
+        product = products.get(int(key))
+        if product is None:
+            continue
+        line = _line(product, cart[key].get('quantity', 1))
+        total += line['total']
+        lines.append(line)
+    return lines, total
+
+
+def build_cart(cart, product_ids=None):
+    """Hydrate a session cart ({product_id: {'quantity': n}}) into template-ready lines.
+
+    All products are loaded with a single query; entries whose product no
+    longer exists are dropped. Pass `product_ids` to restrict the result to a
+    subset of the cart (e.g. the items selected for checkout).
+
+    Returns (lines, total) where each line is a dict with 'product',
+    'quantity', 'price' (current product price) and 'total'.
+    """
+    keys = _cart_keys(cart, product_ids)
+    products = Product.objects.select_related('category').in_bulk([int(key) for key in keys])
+    return _cart_lines(cart, keys, products)
+
+
+async def abuild_cart(cart, product_ids=None):
+    """Async build_cart()."""
+    keys = _cart_keys(cart, product_ids)
+    products = await Product.objects.select_related('category').ain_bulk([int(key) for key in keys])
+    return _cart_lines(cart, keys, products)
+
+
+class SessionCart:
+    def __init__(self, session):
+        self.session = session
+
+    @property
+    def items(self):
+        return self.session.get(SESSION_KEY, {})
+
+    def _save(self, items):
+        self.session[SESSION_KEY] = items
+        self.session.modified = True
+
+    def add(self, product_id, quantity=1):
+        items = self.items
+        key = str(product_id)
+        items.setdefault(key, {'quantity': 0})['quantity'] += quantity
+        self._save(items)
+
+    def decrement(self, product_id):
+        items = self.items
+        key = str(product_id)
+        if key in items:
+            items[key]['quantity'] -= 1
+            if items[key]['quantity'] <= 0:
+                del items[key]
+            self._save(items)
+
+    def remove(self, product_ids):
+        items = self.items
+        keys = [str(pk) for pk in product_ids if str(pk) in items]
+        if keys:
+            for key in keys:
+                del items[key]
+            self._save(items)
+
+    def clear(self):
+        self.session.pop(SESSION_KEY, None)
+
+    def __contains__(self, product_id):
+        return str(product_id) in self.items
+
+    def count(self):
+        return sum(item['quantity'] for item in self.items.values())
+
+    def lines(self, product_ids=None):
+        return build_cart(self.items, product_ids)
+
+    async def alines(self, product_ids=None):
+        return await abuild_cart(await self.session.aget(SESSION_KEY, {}), product_ids)
+
+
+class DBCart:
+    def __init__(self, user):
+        self.user = user
+
+    @property
+    def items(self):
+        return CartItem.objects.filter(user=self.user)
+
+    def _changed(self):
+        cache.delete(cart_count_cache_key(self.user.pk))
+
+    def add(self, product_id, quantity=1):
+        # Upsert: increment in place, insert only when the row does not exist yet
+        if not self.items.filter(product_id=product_id).update(quantity=F('quantity') + quantity):
+            try:
+                with transaction.atomic():
+                    CartItem.objects.create(user=self.user, product_id=product_id, quantity=quantity)
+            except IntegrityError:
+                # A concurrent request inserted the row first
+                self.items.filter(product_id=product_id).update(quantity=F('quantity') + quantity)
+        self._changed()
+
+    def decrement(self, product_id):
+        item = self.items.filter(product_id=product_id)
+        if not item.filter(quantity__gt=1).update(quantity=F('quantity') - 1):
+            item.delete()
+        self._changed()
+
+    def remove(self, product_ids):
+        self.items.filter(product_id__in=product_ids).delete()
+        self._changed()
+
+    def clear(self):
+        self.items.delete()
+        self._changed()
+
+    def __contains__(self, product_id):
+        return self.items.filter(product_id=product_id).exists()
+
+    def count(self):
+        key = cart_count_cache_key(self.user.pk)
+        count = cache.get(key)
+        if count is None:
+            count = self.items.aggregate(total=Sum('quantity'))['total'] or 0
+            cache.set(key, count, COUNT_CACHE_TIMEOUT)
+        return count
+
+    def _line_items(self, product_ids):
+        items = self.items.select_related('product__category').order_by('created_at', 'id')
+        if product_ids is not None:
+            items = items.filter(product_id__in=[pk for pk in product_ids if str(pk).isdigit()])
+        return items
+
+    def lines(self, product_ids=None):
+        """Same (lines, total) shape as build_cart, from one joined query."""
+        lines = [_line(item.product, item.quantity) for item in self._line_items(product_ids)]
+        return lines, sum((line['total'] for line in lines), Decimal('0'))
+
+    async def alines(self, product_ids=None):
+        lines = [_line(item.product, item.quantity) async for item in self._line_items(product_ids)]
+        return lines, sum((line['total'] for line in lines), Decimal('0'))
+
+    def merge(self, session_items):
+        """Fold a session cart into this user's CartItem rows in bulk."""
+        quantities = {int(key): item.get('quantity', 1) for key, item in session_items.items() if key.isdigit()}
+        if not quantities:
+            return
+        with transaction.atomic():
+            valid = set(Product.objects.filter(pk__in=quantities).values_list('pk', flat=True))
+            existing = list(self.items.select_for_update().filter(product_id__in=valid))
+            for item in existing:
+                item.quantity += quantities[item.product_id]
+            CartItem.objects.bulk_update(existing, ['quantity'])
+
+            known = {item.product_id for item in existing}
+            CartItem.objects.bulk_create([
+                CartItem(user=self.user, product_id=pk, quantity=quantities[pk])
+                for pk in valid - known
+            ])
+        self._changed()
+
+
+def get_cart(request):
+    if request.user.is_authenticated:
+        cart = DBCart(request.user)
+        # Carts added before login (or before carts moved to the database)
+        if request.session.get(SESSION_KEY):
+            merge_session_cart(request.user, request.session)
+        return cart
+    return SessionCart(request.session)
+
+
+async def aget_cart(request):
+    """get_cart() for async views."""
+    user = await request.auser()
+    if user.is_authenticated:
+        if await request.session.aget(SESSION_KEY):
+            # Merging locks rows in a transaction, which needs the sync ORM
+            await sync_to_async(merge_session_cart)(user, request.session)
+        return DBCart(user)
+    return SessionCart(request.session)
+
+
+def merge_session_cart(user, session):
+    items = session.get(SESSION_KEY)
+    if items:
+        DBCart(user).merge(items)
+    session.pop(SESSION_KEY, None)
@@ -0,0 +1,148 @@
+import hashlib
+from datetime import timedelta
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from .context_processors import cart_and_wishlist_counts
+from .models import CatalogVersion
+
+# ============================
+# 🏷️ CATALOG VERSION & HTTP CACHING
+# ============================
+
+# Every Product/Category change bumps one CatalogVersion row (see signals).
+# Catalog pages and API reads derive a strong ETag and Last-Modified from it,
+# so a conditional GET is answered with 304 after a single primary-key lookup.
+# Changes that happen at order rate (stock sold at checkout, recommendation
+# refreshes) bump it at most once per STORE_CATALOG_MIN_BUMP_SECONDS, so
+# caches stay useful while orders come in.
+
+CATALOG_VERSION_PK = 1
+
+
+def get_catalog_version(request=None):
+    """Current CatalogVersion, memoized on the request when one is given."""
+    if request is not None and hasattr(request, '_catalog_version'):
+        return request._catalog_version
+    version = CatalogVersion.objects.filter(pk=CATALOG_VERSION_PK).first()
+    if version is None:
+        version, _ = CatalogVersion.objects.get_or_create(pk=CATALOG_VERSION_PK)
+    if request is not None:
+        request._catalog_version = version
+    return version
+
+
+async def aget_catalog_version(request=None):
+    """Async get_catalog_version(), sharing its memo on the request."""
+    if request is not None and hasattr(request, '_catalog_version'):
+        return request._catalog_version
+    version = await CatalogVersion.objects.filter(pk=CATALOG_VERSION_PK).afirst()
+    if version is None:
+        version, _ = await CatalogVersion.objects.aget_or_create(pk=CATALOG_VERSION_PK)
+    if request is not None:
+        request._catalog_version = version
+    return version
+
+
+def _bump(min_interval):
+    now = timezone.now()
+    versions = CatalogVersion.objects.filter(pk=CATALOG_VERSION_PK)
+    if min_interval:
+        versions = versions.filter(updated_at__lte=now - timedelta(seconds=min_interval))
+    updated = versions.update(version=F('version') + 1, updated_at=now)
+    if not updated and not min_interval:
+        CatalogVersion.objects.get_or_create(pk=CATALOG_VERSION_PK)
+
+
+def bump_catalog_version(min_interval=0):
+    """Invalidate every catalog ETag. Runs after commit so the hot row is only
+    locked for a moment, never for the length of the caller's transaction; a
+    failed bump is logged rather than failing the already-committed write.
+
+    With `min_interval` (seconds) the bump is skipped if the version already
+    changed that recently."""
+    transaction.on_commit(lambda: _bump(min_interval), robust=True)
+
+
+def _etag(request, personal):
+    version = get_catalog_version(request)
+    parts = [str(version.version), request.get_full_path(), request.META.get('HTTP_ACCEPT', '')]
+    if personal:
+        # HTML pages show the navbar: user, cart and wishlist badges
+        counts = cart_and_wishlist_counts(request)
+        parts += [str(request.user.pk), str(counts['cart_item_count']()), str(counts['wishlist_item_count']())]
+    return hashlib.md5('|'.join(parts).encode()).hexdigest()
+
+
+def _cache_control(response, private):
+    if private:
+        patch_cache_control(response, private=True, max_age=0)
+    else:
+        # Browsers revalidate every time (cheap 304s); shared caches may reuse
+        patch_cache_control(response, public=True, max_age=0, s_maxage=settings.STORE_CATALOG_CACHE_SECONDS)
+
+
+def catalog_conditional(view, personal=False):
+    """Add catalog ETag/Last-Modified handling and Cache-Control to `view`.
+
+    `personal` views render user-specific chrome (HTML pages); their ETag also
+    covers the user and navbar counts and their responses are private.
+    Async views get the same handling, with the (sync) session, cart and
+    version lookups done in one thread hop before the view runs.
+    """
+    def skip(request):
+        if request.method not in ('GET', 'HEAD'):
+            return True
+        # A flash message must be shown, never answered with 304
+        return personal and len(get_messages(request)) > 0
+
+    def validators(request):
+        """(etag, last_modified, private), or None when caching is skipped;
+        computed once per request."""
+        if not hasattr(request, '_catalog_validators'):
+            request._catalog_validators = None if skip(request) else (
+                _etag(request, personal),
+                get_catalog_version(request).updated_at,
+                personal and request.user.is_authenticated,
+            )
+        return request._catalog_validators
+
+    def etag_func(request, *args, **kwargs):
+        return validators(request) and validators(request)[0]
+
+    def last_modified_func(request, *args, **kwargs):
+        return validators(request) and validators(request)[1]
+
+    conditional_view = condition(etag_func=etag_func, last_modified_func=last_modified_func)(view)
+
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapped(request, *args, **kwargs):
+            cached = await sync_to_async(validators)(request)
+            response = await conditional_view(request, *args, **kwargs)
+            if cached:
+                _cache_control(response, private=cached[2])
+            return response
+        return async_wrapped
+
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        response = conditional_view(request, *args, **kwargs)
+        cached = validators(request)
+        if cached:
+            _cache_control(response, private=cached[2])
+        return response
+    return wrapped
+
+
+def catalog_page(view):
+    """Decorator for storefront catalog pages."""
+    return catalog_conditional(view, personal=True)
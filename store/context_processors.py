@@ -1,14 +1,49 @@
+from functools import cache as memoize
+
+from django.core.cache import cache
+
+from .cart import get_cart
 from .models import Category
-from .models import CartItem, WishlistItem
+from .models import WishlistItem
+
+# Navbar data is cached and handed to templates as memoized callables: the
+# template engine only calls them when a page actually renders the navbar.
+
+CATEGORIES_CACHE_KEY = 'store:nav_categories'
+NAV_CACHE_TIMEOUT = 60 * 60
+
+
+def wishlist_count_cache_key(user_id):
+    return f'store:wishlist_count:{user_id}'
 
 
 def categories(request):
+    @memoize
+    def get_categories():
+        items = cache.get(CATEGORIES_CACHE_KEY)
+        if items is None:
+            items = list(Category.objects.all())
+            cache.set(CATEGORIES_CACHE_KEY, items, NAV_CACHE_TIMEOUT)
+        return items
+
     return {
-        'categories': Category.objects.all()
+        'categories': get_categories
     }
 
 def cart_and_wishlist_counts(request):
-    cart = request.session.get('cart', {})
-    wishlist_count = WishlistItem.objects.filter(user=request.user).count() if request.user.is_authenticated else 0
-    cart_count = sum(item['quantity'] for item in cart.values()) if cart else 0
-    return {'cart_item_count': cart_count, 'wishlist_item_count': wishlist_count}
\ No newline at end of file
+    @memoize
+    def get_wishlist_count():
+        if not request.user.is_authenticated:
+            return 0
+        key = wishlist_count_cache_key(request.user.pk)
+        count = cache.get(key)
+        if count is None:
+            count = WishlistItem.objects.filter(user=request.user).count()
+            cache.set(key, count, NAV_CACHE_TIMEOUT)
+        return count
+
+    @memoize
+    def get_cart_count():
+        return get_cart(request).count()
+
+    return {'cart_item_count': get_cart_count, 'wishlist_item_count': get_wishlist_count}
@@ -0,0 +1,91 @@
+import logging
+import os
+import socket
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+# ============================
+# 🔌 DATABASE CONNECTION POOL STATS
+# ============================
+
+# With DB_POOL on, every worker process has its own psycopg pool, so no
+# single process can see them all. Each worker publishes its pool counters
+# to the shared cache (at most every STORE_POOL_STATS_SECONDS, when a
+# request finishes) and the db_pool_report command reads them back next to
+# what PostgreSQL reports in pg_stat_activity.
+
+logger = logging.getLogger(__name__)
+
+KEY_TTL = 120
+WORKERS_KEY = 'dbpool:workers'
+WORKERS_TTL = 60 * 60 * 24
+
+
+def _key(worker):
+    return f'dbpool:{worker}'
+
+
+def pool_stats(alias='default'):
+    """psycopg_pool stats of this process's pool, None when not pooled."""
+    if not connections[alias].settings_dict.get('OPTIONS', {}).get('pool'):
+        return None
+    return connections[alias].pool.get_stats()
+
+
+class Publisher:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.last_publish = 0.0
+
+    def maybe_publish(self):
+        with self.lock:
+            if time.monotonic() - self.last_publish < settings.STORE_POOL_STATS_SECONDS:
+                return
+            self.last_publish = time.monotonic()
+        self.publish()
+
+    def publish(self):
+        stats = pool_stats()
+        if stats is None:
+            return
+        # Looked up every time: gunicorn forks workers after import
+        worker = f'{socket.gethostname()}:{os.getpid()}'
+        try:
+            cache.set(_key(worker), {**stats, 'updated': time.time()}, KEY_TTL)
+            workers = cache.get(WORKERS_KEY, set())
+            if worker not in workers:
+                cache.set(WORKERS_KEY, workers | {worker}, WORKERS_TTL)
+        except Exception:
+            logger.warning("Could not publish connection pool stats", exc_info=True)
+
+
+publisher = Publisher()
+
+
+def worker_stats():
+    """{worker: stats} for workers that published in the last KEY_TTL seconds."""
+    workers = sorted(cache.get(WORKERS_KEY, set()))
+    found = cache.get_many([_key(worker) for worker in workers])
+    return {worker: found[_key(worker)] for worker in workers if _key(worker) in found}
+
+
+def server_connections(connection):
+    """PostgreSQL's view of connections: max_connections and this database's
+    connections by state. None on other databases."""
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT current_setting('max_connections')::int")
+        max_connections = cursor.fetchone()[0]
+        cursor.execute(
+            "SELECT coalesce(state, 'unknown'), count(*) FROM pg_stat_activity "
+            "WHERE datname = current_database() AND backend_type = 'client backend' GROUP BY 1 ORDER BY 1"
+        )
+        by_state = dict(cursor.fetchall())
+        cursor.execute("SELECT count(*) FROM pg_stat_activity WHERE backend_type = 'client backend'")
+        total = cursor.fetchone()[0]
+    return {'max_connections': max_connections, 'total': total, 'by_state': by_state}
@@ -0,0 +1,153 @@
+import csv
+import json
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from itertools import groupby
+
+from asgiref.sync import sync_to_async
+from django.utils import timezone
+from rest_framework.renderers import BaseRenderer
+
+from .models import Order, Product
+
+# ============================
+# 📤 STREAMING EXPORTS
+# ============================
+
+# Orders and products are exported as CSV or NDJSON in constant memory: rows
+# come from .values_list().iterator(chunk_size), which uses a server-side
+# cursor on PostgreSQL, and are encoded and yielded in ~64 KiB pieces for
+# StreamingHttpResponse or a file. Nothing holds more than one chunk of rows.
+
+CHUNK_SIZE = 2000
+BUFFER_SIZE = 64 * 1024
+
+ORDER_FIELDS = (
+    'id', 'user_id', 'first_name', 'email', 'address', 'city', 'phone',
+    'total_amount', 'payment_method', 'status', 'created_at',
+)
+ITEM_FIELDS = ('items__id', 'items__product_id', 'items__product__name', 'items__quantity', 'items__price')
+ITEM_KEYS = ('id', 'product_id', 'product_name', 'quantity', 'price')
+ORDER_HEADER = ('order_id',) + ORDER_FIELDS[1:] + ('item_id', 'product_id', 'product_name', 'quantity', 'price')
+
+PRODUCT_FIELDS = ('id', 'name', 'description', 'price', 'category_id', 'category__name', 'stock', 'image')
+PRODUCT_HEADER = PRODUCT_FIELDS[:5] + ('category_name', 'stock', 'image')
+
+FORMATS = ('csv', 'ndjson')
+CONTENT_TYPES = {'csv': 'text/csv; charset=utf-8', 'ndjson': 'application/x-ndjson; charset=utf-8'}
+
+
+def filter_orders(queryset, start=None, end=None, statuses=None):
+    """Orders created on dates start..end (inclusive, local time) in `statuses`.
+    Bounds are compared as datetimes so the created_at index can be used."""
+    if start:
+        queryset = queryset.filter(created_at__gte=timezone.make_aware(datetime.combine(start, time.min)))
+    if end:
+        queryset = queryset.filter(created_at__lt=timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min)))
+    if statuses:
+        queryset = queryset.filter(status__in=statuses)
+    return queryset
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)  # as DRF renders decimals
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+class _Echo:
+    """File-like object whose write() hands back what it was given, so
+    csv.writer can encode one row at a time."""
+
+    def write(self, value):
+        return value
+
+
+def _buffered(lines, size=BUFFER_SIZE):
+    """Join small strings into pieces of about `size` characters; one yield
+    per row would dominate the cost of streaming."""
+    buffer, length = [], 0
+    for line in lines:
+        buffer.append(line)
+        length += len(line)
+        if length >= size:
+            yield ''.join(buffer)
+            buffer, length = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+async def aiterate(chunks):
+    """Async view of a chunk generator, for ASGI responses: Django would read
+    a sync one to the end before sending anything. Each chunk is produced in
+    the request's sync thread, where its database cursor lives."""
+    chunks, done = iter(chunks), object()
+    while (chunk := await sync_to_async(next)(chunks, done)) is not done:
+        yield chunk
+
+
+def _csv_lines(header, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow([value.isoformat() if isinstance(value, datetime) else value for value in row])
+
+
+def order_rows(queryset, chunk_size=CHUNK_SIZE):
+    """One tuple per order item (ORDER_FIELDS + ITEM_FIELDS), grouped by order.
+    Orders without items appear once with empty item fields."""
+    return (
+        queryset.prefetch_related(None).order_by('id', 'items__id')
+        .values_list(*ORDER_FIELDS, *ITEM_FIELDS).iterator(chunk_size=chunk_size)
+    )
+
+
+def _order_documents(rows):
+    width = len(ORDER_FIELDS)
+    for _, lines in groupby(rows, key=lambda row: row[0]):
+        first = next(lines)
+        document = dict(zip(ORDER_FIELDS, first))
+        document['items'] = [dict(zip(ITEM_KEYS, row[width:])) for row in (first, *lines) if row[width] is not None]
+        yield json.dumps(document, default=_json_default) + '\n'
+
+
+def export_orders(queryset=None, fmt='csv', chunk_size=CHUNK_SIZE):
+    """Yield the orders in `queryset` as CSV (one line per item) or NDJSON
+    (one order per line with its items nested)."""
+    rows = order_rows(Order.objects.all() if queryset is None else queryset, chunk_size)
+    if fmt == 'ndjson':
+        return _buffered(_order_documents(rows))
+    return _buffered(_csv_lines(ORDER_HEADER, rows))
+
+
+def export_products(queryset=None, fmt='csv', chunk_size=CHUNK_SIZE):
+    queryset = Product.objects.all() if queryset is None else queryset
+    rows = queryset.prefetch_related(None).order_by('id').values_list(*PRODUCT_FIELDS).iterator(chunk_size=chunk_size)
+    if fmt == 'ndjson':
+        return _buffered(
+            json.dumps(dict(zip(PRODUCT_HEADER, row)), default=_json_default) + '\n' for row in rows
+        )
+    return _buffered(_csv_lines(PRODUCT_HEADER, rows))
+
+
+class ExportRenderer(BaseRenderer):
+    """Lets DRF negotiate ?format=csv / ?format=ndjson (or an .csv / .ndjson
+    suffix) for export actions. Exports stream their own response, so this
+    only ever renders error payloads, as JSON."""
+
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data).encode() if data is not None else b''
+
+
+class CSVExportRenderer(ExportRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class NDJSONExportRenderer(ExportRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
@@ -0,0 +1,73 @@
+from decimal import Decimal
+
+from .models import Product
+
+# ============================
+# ⚡ FAST READ-ONLY SERIALIZATION
+# ============================
+
+# Hot catalog endpoints can skip ModelSerializer field introspection: rows are
+# fetched with .values_list() and turned into dicts by a function built once
+# per request. The output must stay identical to ProductSerializer /
+# CategorySerializer (same keys, order and formatting), which the tests check.
+
+PRICE_PLACES = Decimal('0.01')
+
+
+def _absolute_url_builder(request):
+    """Return a function mapping a storage URL to the URL DRF would render."""
+    if request is None:
+        return lambda url: url
+    origin = request.build_absolute_uri('/')[:-1]
+
+    def build(url):
+        if url.startswith('/') and not url.startswith('//'):
+            return origin + url
+        return request.build_absolute_uri(url)
+    return build
+
+
+class FastProductSerializer:
+    """Read-only equivalent of ProductSerializer working on raw rows."""
+
+    columns = ('id', 'name', 'description', 'price', 'category_id', 'category__name', 'image', 'stock')
+
+    @classmethod
+    def rows(cls, queryset):
+        return queryset.values_list(*cls.columns, named=True)
+
+    @classmethod
+    def compile(cls, request=None):
+        storage = Product._meta.get_field('image').storage
+        absolute = _absolute_url_builder(request)
+
+        def to_dict(row):
+            pk, name, description, price, category_id, category_name, image, stock = row
+            return {
+                'id': pk,
+                'name': name,
+                'description': description,
+                'price': f'{price.quantize(PRICE_PLACES):f}' if price is not None else '',
+                'category': category_id,
+                'category_name': category_name,
+                'image': absolute(storage.url(image)) if image else None,
+                'stock': stock,
+            }
+        return to_dict
+
+
+class FastCategorySerializer:
+    """Read-only equivalent of CategorySerializer working on raw rows."""
+
+    columns = ('id', 'name', 'description')
+
+    @classmethod
+    def rows(cls, queryset):
+        return queryset.values_list(*cls.columns, named=True)
+
+    @classmethod
+    def compile(cls, request=None):
+        def to_dict(row):
+            pk, name, description = row
+            return {'id': pk, 'name': name, 'description': description}
+        return to_dict
@@ -1,4 +1,5 @@
 from django import forms
+from .imports import format_for
 from .models import Product, Category
 
 class CategoryForm(forms.ModelForm):
@@ -30,4 +31,15 @@ class ProductForm(forms.ModelForm):
                 'rows': 4
             }),
             'image': forms.ClearableFileInput(attrs={'class': 'absolute inset-0 opacity-0 cursor-pointer'}),
-        }
\ No newline at end of file
+        }
+
+class ProductImportForm(forms.Form):
+    """Admin upload for store.imports (plain admin styling, no Tailwind)."""
+    file = forms.FileField(help_text="CSV with a header row, or JSON Lines (.jsonl): name, price, category, description, stock.")
+    create_categories = forms.BooleanField(required=False, initial=True, help_text="Create categories that do not exist yet.")
+
+    def clean_file(self):
+        upload = self.cleaned_data['file']
+        if format_for(upload.name) not in ('csv', 'jsonl'):
+            raise forms.ValidationError("Upload a .csv or .jsonl file.")
+        return upload
@@ -0,0 +1,65 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from .catalog import aget_catalog_version, get_catalog_version
+from .models import Product, Recommendation
+
+# ============================
+# 🧩 TEMPLATE FRAGMENT CACHE
+# ============================
+
+# Product cards, the product detail body and the related-products strip are
+# cached with {% cache %}, keyed by product id and the catalog version. Any
+# Product/Category change (or new recommendations) bumps the version, so
+# stale fragments are never served again and simply expire.
+
+RELATED_PRODUCTS_LIMIT = 4
+
+
+def fragment_context(request):
+    """Context a template needs to use the catalog fragment cache."""
+    return {
+        'catalog_version': get_catalog_version(request).version,
+        'fragment_timeout': settings.STORE_FRAGMENT_CACHE_SECONDS,
+    }
+
+
+async def afragment_context(request):
+    """fragment_context() for async views."""
+    await aget_catalog_version(request)  # memoized on the request
+    return fragment_context(request)
+
+
+def related_product_ids(category_id, version):
+    """First products of a category, computed once per catalog version.
+
+    Twice RELATED_PRODUCTS_LIMIT ids are kept, so the strip can still be
+    filled after leaving out the product being viewed and its
+    recommendations."""
+    key = f'store:related:{category_id}:{version}'
+    ids = cache.get(key)
+    if ids is None:
+        ids = list(
+            Product.objects.filter(category_id=category_id)
+            .order_by('id')
+            .values_list('id', flat=True)[:RELATED_PRODUCTS_LIMIT * 2]
+        )
+        cache.set(key, ids, settings.STORE_FRAGMENT_CACHE_SECONDS)
+    return ids
+
+
+def related_products(product, version):
+    """Products shown under `product`: those most often bought with it (see
+    store.recommendations), topped up from its category."""
+    related = [
+        recommendation.recommended for recommendation in
+        Recommendation.objects.filter(product=product).select_related('recommended').order_by('rank')
+        [:RELATED_PRODUCTS_LIMIT]
+    ]
+    if len(related) < RELATED_PRODUCTS_LIMIT:
+        seen = {product.pk, *(other.pk for other in related)}
+        ids = [pk for pk in related_product_ids(product.category_id, version) if pk not in seen]
+        ids = ids[:RELATED_PRODUCTS_LIMIT - len(related)]
+        found = Product.objects.in_bulk(ids)
+        related += [found[pk] for pk in ids if pk in found]
+    return related
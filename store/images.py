@@ -0,0 +1,198 @@
+import hashlib
+import io
+import json
+import logging
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, features
+
+from . import jobs
+from .catalog import bump_catalog_version
+from .models import Product
+
+logger = logging.getLogger(__name__)
+
+# ============================
+# 🖼️ IMAGE DERIVATIVES
+# ============================
+
+# Product images are uploaded as-is (often several MB). Resized AVIF/WebP/JPEG
+# variants are generated once per image by a background job, enqueued after
+# upload or on the first render that finds no manifest (that render serves
+# the original), and stored as derivatives/<hash[:2]>/<hash>-<width>w.<ext>
+# where <hash> is the original's content hash, so identical uploads share
+# files and a replaced image never reuses a stale URL. Once every variant
+# exists, the image's manifest is written to derivatives/manifests/ in the
+# same storage, so it survives cache eviction and restarts; the cache only
+# saves reading it. Templates get srcset-ready URLs through the store_images
+# tags. Pages rendered before the build may have cached the fallback markup,
+# so a job that completes a build bumps the catalog version.
+
+WIDTHS = (160, 320, 640, 1024)
+DERIVATIVE_DIR = 'derivatives'
+MANIFEST_DIR = f'{DERIVATIVE_DIR}/manifests'
+MANIFEST_CACHE_PREFIX = 'store:image:'
+MANIFEST_CACHE_TIMEOUT = 60 * 60 * 24
+# How long a pending or failed build serves the original before it is retried
+FAILED_CACHE_TIMEOUT = 300
+
+# (format, mime type, file extension, save options), best compression first.
+# AVIF needs a Pillow build with libavif.
+FORMATS = [
+    ('avif', 'image/avif', 'avif', {'quality': 50}),
+    ('webp', 'image/webp', 'webp', {'quality': 75, 'method': 4}),
+    ('jpeg', 'image/jpeg', 'jpg', {'quality': 80, 'optimize': True, 'progressive': True}),
+]
+FORMATS = [entry for entry in FORMATS if entry[0] == 'jpeg' or features.check(entry[0])]
+FALLBACK_FORMAT = 'jpeg'
+
+
+def content_hash(fileobj, chunk_size=1 << 16):
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: fileobj.read(chunk_size), b''):
+        digest.update(chunk)
+    return digest.hexdigest()[:20]
+
+
+def variant_widths(original_width):
+    """WIDTHS narrower than the original, plus one at (at most) full size;
+    images are never upscaled."""
+    widths = [width for width in WIDTHS if width < original_width]
+    return widths + [min(original_width, WIDTHS[-1])]
+
+
+def derivative_name(digest, width, extension):
+    return f'{DERIVATIVE_DIR}/{digest[:2]}/{digest}-{width}w.{extension}'
+
+
+def _encode(image, width, fmt, options):
+    height = max(1, round(image.height * width / image.width))
+    resized = image.resize((width, height), Image.Resampling.LANCZOS) if width != image.width else image
+    if fmt == 'jpeg' and resized.mode != 'RGB':
+        resized = resized.convert('RGB')
+    buffer = io.BytesIO()
+    resized.save(buffer, format=fmt.upper(), **options)
+    return buffer.getvalue()
+
+
+def _manifest_key(name):
+    return MANIFEST_CACHE_PREFIX + hashlib.md5(name.encode()).hexdigest()
+
+
+def _manifest_name(name):
+    return f'{MANIFEST_DIR}/{hashlib.md5(name.encode()).hexdigest()}.json'
+
+
+def read_manifest(name, storage=default_storage):
+    """The stored manifest of image `name`, or None if it was never built."""
+    try:
+        with storage.open(_manifest_name(name), 'rb') as fileobj:
+            return json.load(fileobj)
+    except (FileNotFoundError, ValueError):
+        return None  # never built, or a corrupt file to be rewritten
+
+
+def _write_manifest(name, manifest, storage):
+    target = _manifest_name(name)
+    if storage.exists(target):
+        storage.delete(target)
+    storage.save(target, ContentFile(json.dumps(manifest).encode()))
+
+
+def build_variants(name, storage=default_storage, force=False):
+    """Generate any missing derivatives of the stored image `name` and return
+    its manifest: {'width', 'height', 'sources': {format: [[width, name]]}}.
+    The manifest is only stored once every variant exists."""
+    with storage.open(name, 'rb') as original:
+        digest = content_hash(original)
+        original.seek(0)
+        with Image.open(original) as image:
+            image = ImageOps.exif_transpose(image)
+            if image.mode not in ('RGB', 'RGBA'):
+                image = image.convert('RGBA' if 'transparency' in image.info or image.mode in ('LA', 'PA') else 'RGB')
+            image.load()
+
+    sources = {}
+    for fmt, _, extension, options in FORMATS:
+        sources[fmt] = []
+        for width in variant_widths(image.width):
+            target = derivative_name(digest, width, extension)
+            if force or not storage.exists(target):
+                if force:
+                    storage.delete(target)
+                storage.save(target, ContentFile(_encode(image, width, fmt, options)))
+            sources[fmt].append([width, target])
+
+    manifest = {'width': image.width, 'height': image.height, 'sources': sources}
+    _write_manifest(name, manifest, storage)
+    cache.set(_manifest_key(name), manifest, MANIFEST_CACHE_TIMEOUT)
+    return manifest
+
+
+def build_image_variants(name):
+    """Background job (store.jobs): build_variants() of the stored product
+    image `name` unless its manifest exists. An unreadable original is
+    logged and retried after FAILED_CACHE_TIMEOUT."""
+    storage = Product._meta.get_field('image').storage
+    if read_manifest(name, storage) is not None:
+        return
+    try:
+        build_variants(name, storage)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        logger.warning("Could not build variants for %s", name, exc_info=True)
+        cache.set(_manifest_key(name), {}, FAILED_CACHE_TIMEOUT)
+        return
+    bump_catalog_version()  # drop fragments cached with the original image
+
+
+def build_product_variants(product_id):
+    """Background job (store.jobs): variants of a product's current image."""
+    product = Product.objects.filter(pk=product_id).only('image').first()
+    if product is not None and product.image:
+        build_image_variants(product.image.name)
+
+
+def get_variants(image):
+    """Manifest for an ImageField value, or None while its variants are not
+    built (or the original is missing or unreadable). The first miss
+    enqueues the build; rendering never waits for it."""
+    if not image:
+        return None
+    key = _manifest_key(image.name)
+    manifest = cache.get(key)
+    if manifest is None:
+        manifest = read_manifest(image.name, image.storage)
+        if manifest is not None:
+            cache.set(key, manifest, MANIFEST_CACHE_TIMEOUT)
+        # The placeholder keeps other renders from enqueueing the same build
+        elif cache.add(key, {}, FAILED_CACHE_TIMEOUT):
+            jobs.enqueue(build_image_variants, name=image.name)
+            manifest = cache.get(key)  # already built when jobs run inline
+    return manifest or None
+
+
+def srcset(image, fmt):
+    manifest = get_variants(image)
+    if manifest is None or not manifest['sources'].get(fmt):
+        return ''
+    return ', '.join(f'{image.storage.url(name)} {width}w' for width, name in manifest['sources'][fmt])
+
+
+def variant_url(image, width, fmt=FALLBACK_FORMAT):
+    """URL of the smallest `fmt` variant at least `width` wide (or the widest
+    one), falling back to the original."""
+    if not image:
+        return ''
+    manifest = get_variants(image)
+    if manifest is None or not manifest['sources'].get(fmt):
+        return image.url
+    variants = manifest['sources'][fmt]
+    name = next((name for w, name in variants if w >= width), variants[-1][1])
+    return image.storage.url(name)
+
+
+def picture_sources(image):
+    """[(mime type, srcset)] for a <picture>, best format first."""
+    return [(mime, srcset(image, fmt)) for fmt, mime, _, _ in FORMATS if fmt != FALLBACK_FORMAT]
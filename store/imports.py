@@ -0,0 +1,176 @@
+import csv
+import io
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from django.core.files import File
+from PIL import Image
+
+from . import bulk, images
+from .models import Category, Product
+from .serializers import ProductBulkSerializer
+
+# ============================
+# 📦 BULK PRODUCT IMPORT
+# ============================
+
+# Reads a CSV (header row) or JSON Lines file of products a chunk at a time:
+# category names are resolved through a name -> id map (creating missing
+# categories in one statement per chunk), each chunk is validated in one
+# ProductBulkSerializer pass and upserted by name with store.bulk, so memory
+# depends on the chunk size, not the file. Blank description / stock cells
+# keep the stored value. With `image_dir`, the `image` column names a file
+# in that directory; files are stored (content-hashed) and their variants
+# encoded in a thread pool.
+
+CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 100
+OPTIONAL_FIELDS = ('description', 'stock')
+
+
+class ImportFileError(ValueError):
+    """Unreadable import file (unknown format, broken header)."""
+
+
+def read_rows(fileobj, fmt):
+    """Yield (row number, dict or None) from a text file; None marks a line
+    that is not valid JSON. Row numbers count records from 1."""
+    if fmt == 'csv':
+        reader = csv.DictReader(fileobj)
+        if not reader.fieldnames or 'name' not in reader.fieldnames:
+            raise ImportFileError("CSV header must include a 'name' column.")
+        yield from enumerate(reader, 1)
+    elif fmt == 'jsonl':
+        number = 0
+        for line in fileobj:
+            if not line.strip():
+                continue
+            number += 1
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            yield number, row if isinstance(row, dict) else None
+    else:
+        raise ImportFileError(f"Unsupported format {fmt!r}; use csv or jsonl.")
+
+
+def format_for(filename):
+    extension = os.path.splitext(filename)[1].lower().lstrip('.')
+    return {'ndjson': 'jsonl', 'json': 'jsonl'}.get(extension, extension)
+
+
+def text_stream(binary):
+    """Text view of an uploaded (binary) file; tolerates a UTF-8 BOM."""
+    return io.TextIOWrapper(binary, encoding='utf-8-sig', newline='')
+
+
+class ProductImporter:
+    """Import products from rows of {'name', 'price', 'category' (a name),
+    'description', 'stock', 'image'}. Call run(rows) with read_rows() output.
+    `progress`, if given, is called with the running totals after each chunk."""
+
+    def __init__(self, chunk_size=CHUNK_SIZE, create_categories=True, image_dir=None,
+                 build_variants=True, workers=4, progress=None):
+        self.chunk_size = chunk_size
+        self.create_categories = create_categories
+        self.image_dir = image_dir
+        self.build_variants = build_variants
+        self.workers = workers
+        self.progress = progress
+        self.categories = dict(Category.objects.values_list('name', 'id'))
+        self.stored_images = {}  # file name -> stored name, shared by rows using the same file
+        self.totals = {'rows': 0, 'created': 0, 'updated': 0, 'failed': 0, 'errors': []}
+
+    def run(self, rows):
+        rows = iter(rows)
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            self.pool = pool
+            while chunk := list(islice(rows, self.chunk_size)):
+                self._import_chunk(chunk)
+                if self.progress:
+                    self.progress(self.totals)
+        return self.totals
+
+    def _fail(self, number, errors):
+        self.totals['failed'] += 1
+        if len(self.totals['errors']) < MAX_REPORTED_ERRORS:
+            self.totals['errors'].append({'row': number, 'errors': errors})
+
+    def _resolve_categories(self, chunk):
+        missing = {
+            str(row.get('category') or '').strip() for _, row in chunk if row
+        } - self.categories.keys() - {''}
+        if missing and self.create_categories:
+            bulk.upsert_categories([{'name': name} for name in sorted(missing)])
+            self.categories.update(Category.objects.filter(name__in=missing).values_list('name', 'id'))
+
+    def _store_image(self, filename):
+        path = os.path.join(self.image_dir, os.path.basename(filename))
+        storage = Product._meta.get_field('image').storage
+        with open(path, 'rb') as fileobj:
+            name = storage.save(f'products/{os.path.basename(filename)}', File(fileobj))
+        if self.build_variants:
+            images.build_variants(name, storage)
+        return name
+
+    def _ingest_images(self, rows):
+        """Store the image files named by (row number, filename, data) rows and
+        return the data of the rows whose file could be stored."""
+        pending = {
+            filename: self.pool.submit(self._store_image, filename)
+            for filename in {filename for _, filename, _ in rows if filename} - self.stored_images.keys()
+        }
+        failures = {}
+        for filename, future in pending.items():
+            try:
+                self.stored_images[filename] = future.result()
+            except (OSError, ValueError, Image.DecompressionBombError) as exc:
+                failures[filename] = getattr(exc, 'strerror', None) or str(exc)
+
+        kept = []
+        for number, filename, data in rows:
+            if filename in failures:
+                self._fail(number, {'image': [f'{filename}: {failures[filename]}']})
+            elif filename:
+                kept.append({**data, 'image': self.stored_images[filename]})
+            else:
+                kept.append(data)
+        return kept
+
+    def _import_chunk(self, chunk):
+        self.totals['rows'] += len(chunk)
+        self._resolve_categories(chunk)
+
+        numbered, payload = [], []  # (row number, image file name), serializer input
+        for number, row in chunk:
+            if row is None:
+                self._fail(number, {'non_field_errors': ['Not a JSON object.']})
+                continue
+            category = str(row.get('category') or '').strip()
+            if category not in self.categories:
+                self._fail(number, {'category': [f'Unknown category "{category}".']})
+                continue
+            data = {'name': row.get('name'), 'price': row.get('price'), 'category': self.categories[category]}
+            data.update((field, row[field]) for field in OPTIONAL_FIELDS if row.get(field) not in (None, ''))
+            numbered.append((number, row.get('image') if self.image_dir else None))
+            payload.append(data)
+        if not payload:
+            return
+
+        serializer = ProductBulkSerializer(data=payload, many=True, context={'category_ids': set(self.categories.values())})
+        serializer.is_valid()
+        failed = {error['index']: error['errors'] for error in serializer.row_errors}
+        for index, errors in failed.items():
+            self._fail(numbered[index][0], errors)
+        # validated_data holds the remaining rows in payload order
+        validated = iter(serializer.validated_data)
+        rows = [(number, image, next(validated)) for index, (number, image) in enumerate(numbered) if index not in failed]
+
+        valid = self._ingest_images(rows) if self.image_dir else [data for _, _, data in rows]
+        if valid:
+            result = bulk.upsert_products(valid)
+            self.totals['created'] += result['created']
+            self.totals['updated'] += result['updated']
@@ -0,0 +1,165 @@
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+from contextlib import nullcontext
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job
+
+# ============================
+# ⚙️ BACKGROUND JOBS
+# ============================
+
+# Work that does not have to finish before the response (confirmation
+# emails, sales rollups, image variants) is enqueued with enqueue(). With
+# settings.STORE_JOB_QUEUE on it becomes a Job row, written in the caller's
+# transaction (so a rolled-back checkout never emails anyone), and
+# `manage.py run_store_worker` runs it: worker threads claim due jobs with
+# SELECT ... FOR UPDATE SKIP LOCKED, so any number of them share the queue
+# without waiting on each other. A job runs in one transaction with its own
+# deletion, so database-only work happens exactly once; anything external
+# (email) happens at least once. Failures are retried with exponential
+# backoff, then kept as 'failed' with the error. Without the queue (the
+# default, for development), jobs run in the web process right after the
+# caller's transaction commits. A queue nobody works on is logged, at most
+# once a minute per process, from enqueue().
+
+logger = logging.getLogger(__name__)
+
+BACKLOG_CHECK_INTERVAL = 60
+_backlog_checked = None  # time.monotonic() of this process's last check
+
+
+def _warn_if_backlogged():
+    global _backlog_checked
+    now = time.monotonic()
+    if _backlog_checked is not None and now - _backlog_checked < BACKLOG_CHECK_INTERVAL:
+        return
+    _backlog_checked = now
+    cutoff = timezone.now() - timedelta(seconds=settings.STORE_JOB_BACKLOG_WARNING)
+    oldest = (
+        Job.objects.filter(status=Job.QUEUED, run_at__lt=cutoff)
+        .order_by('run_at').values_list('run_at', flat=True).first()
+    )
+    if oldest is not None:
+        logger.warning("Background jobs have been waiting since %s; is `manage.py run_store_worker` running?", oldest)
+
+
+def enqueue(func, **kwargs):
+    """Run func(**kwargs) after the current transaction commits, in a
+    worker when the queue is on. kwargs must be JSON-serializable."""
+    name = f'{func.__module__}.{func.__qualname__}'
+    if not settings.STORE_JOB_QUEUE:
+        transaction.on_commit(lambda: func(**kwargs), robust=True)
+        return None
+    _warn_if_backlogged()
+    return Job.objects.create(
+        name=name, kwargs=kwargs, run_at=timezone.now(), max_attempts=settings.STORE_JOB_MAX_ATTEMPTS,
+    )
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}'
+
+
+def claim(worker):
+    """Mark the oldest due job as running and return it, None when idle."""
+    # Without row locks (SQLite) the conditional UPDATE below does the
+    # claiming, and work() runs one claim at a time
+    row_locks = connection.features.has_select_for_update_skip_locked
+    while True:
+        now = timezone.now()
+        with transaction.atomic() if row_locks else nullcontext():
+            job = (
+                Job.objects.select_for_update(skip_locked=True)
+                .filter(status=Job.QUEUED, run_at__lte=now)
+                .order_by('run_at', 'id')
+                .first()
+            )
+            if job is None:
+                return None
+            claimed = Job.objects.filter(pk=job.pk, status=Job.QUEUED).update(
+                status=Job.RUNNING, attempts=F('attempts') + 1, locked_by=worker, locked_at=now,
+            )
+        if claimed:
+            job.status, job.attempts, job.locked_by, job.locked_at = Job.RUNNING, job.attempts + 1, worker, now
+            return job
+
+
+def run(job):
+    """Run a claimed job. Returns True when it succeeded."""
+    try:
+        with transaction.atomic():
+            import_string(job.name)(**job.kwargs)
+            Job.objects.filter(pk=job.pk).delete()
+    except Exception:
+        error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            delay = settings.STORE_JOB_RETRY_DELAY * 2 ** (job.attempts - 1)
+            Job.objects.filter(pk=job.pk).update(
+                status=Job.QUEUED, run_at=timezone.now() + timedelta(seconds=delay), last_error=error,
+            )
+            logger.warning("Job %s (%s) failed, retrying in %ss", job.pk, job.name, delay, exc_info=True)
+        else:
+            Job.objects.filter(pk=job.pk).update(status=Job.FAILED, last_error=error)
+            logger.error("Job %s (%s) failed after %s attempts", job.pk, job.name, job.attempts, exc_info=True)
+        return False
+    logger.info("Job %s (%s) done", job.pk, job.name)
+    return True
+
+
+def requeue_stale():
+    """Jobs left running past STORE_JOB_TIMEOUT belong to a worker that died:
+    queue them again, or fail them when out of attempts."""
+    cutoff = timezone.now() - timedelta(seconds=settings.STORE_JOB_TIMEOUT)
+    stale = Job.objects.filter(status=Job.RUNNING, locked_at__lt=cutoff)
+    error = f"Still running after {settings.STORE_JOB_TIMEOUT}s; worker presumed dead."
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(status=Job.FAILED, last_error=error)
+    queued = stale.update(status=Job.QUEUED, run_at=timezone.now(), last_error=error)
+    return queued + failed
+
+
+# SQLite has a single writer, and a transaction that reads and then writes
+# fails at once rather than waiting when another connection is writing: the
+# threads of a worker take turns there
+_serial = threading.Lock()
+
+
+def work(stop=None, burst=False, poll_seconds=None):
+    """Claim and run jobs until `stop` is set, or until no job is due when
+    `burst`. Returns (succeeded, failed) counts."""
+    stop = stop or threading.Event()
+    poll_seconds = settings.STORE_JOB_POLL_SECONDS if poll_seconds is None else poll_seconds
+    worker = worker_name()
+    turns = nullcontext() if connection.features.has_select_for_update_skip_locked else _serial
+    succeeded = failed = 0
+    while not stop.is_set():
+        try:
+            with turns:
+                job = claim(worker)
+                done = job is not None and run(job)
+            if job is None:
+                if burst:
+                    break
+                close_old_connections()
+                stop.wait(poll_seconds)
+            elif done:
+                succeeded += 1
+            else:
+                failed += 1
+        except DatabaseError:
+            # e.g. the server restarting; a job left running is requeued
+            # by requeue_stale()
+            logger.warning("Job queue unavailable", exc_info=True)
+            close_old_connections()
+            stop.wait(poll_seconds)
+    return succeeded, failed
@@ -0,0 +1,194 @@
+import http.cookiejar
+import json
+import re
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .bench import WORDS, percentiles
+from .models import Category, Order, Product
+
+# ============================
+# 🏋️ LOAD TEST SCENARIOS
+# ============================
+
+# Each scenario is a list of requests built for iteration `i` from a context
+# of ids in the seeded store (see the seed_store command), so the same run
+# can be replayed in-process through the Django test client (with per
+# request query counts) or over HTTP against a running server, where query
+# counts come from the Server-Timing header when the server samples
+# requests (STORE_PERF_SAMPLE_RATE=1).
+
+PASSWORD = 'bench-password'
+CUSTOMER = 'bench_customer_0'
+STAFF = 'bench_admin'
+SERVER_TIMING_QUERIES_RE = re.compile(r'db;[^,]*desc="(\d+) queries')
+
+
+def scenario_context():
+    products = list(Product.objects.order_by('id').values_list('id', flat=True)[:500])
+    return {
+        'products': products,
+        'in_stock': list(Product.objects.filter(stock__gte=50).order_by('id').values_list('id', flat=True)[:500]),
+        'categories': list(Category.objects.order_by('id').values_list('id', flat=True)),
+        'orders': list(Order.objects.filter(user__username=CUSTOMER).order_by('id').values_list('id', flat=True)),
+    }
+
+
+def _pick(items, i):
+    return items[i % len(items)]
+
+
+def _checkout(ctx, i):
+    pk = _pick(ctx['in_stock'], i)
+    return [
+        ('get', reverse('store:add_to_cart', args=[pk]), None),
+        ('get', reverse('store:checkout'), None),
+        ('post', reverse('store:checkout'), {
+            'name': 'Bench', 'location': 'Street 1', 'city': 'Phnom Penh', 'phone': '012000000',
+            'payment_method': 'cash',
+        }),
+    ]
+
+
+# name: (user to log in as, requests for iteration i)
+SCENARIOS = {
+    'index': (None, lambda ctx, i: [('get', reverse('store:index'), None)]),
+    'index_search': (None, lambda ctx, i: [('get', reverse('store:index'), {'q': _pick(WORDS, i)})]),
+    'index_filters': (None, lambda ctx, i: [('get', reverse('store:index'), {
+        'category': _pick(ctx['categories'], i), 'min_price': '20', 'max_price': '300',
+    })]),
+    'product_detail': (None, lambda ctx, i: [('get', reverse('store:product_detail', args=[_pick(ctx['products'], i)]), None)]),
+    'cart_cycle': (CUSTOMER, lambda ctx, i: [
+        ('get', reverse('store:add_to_cart', args=[_pick(ctx['products'], i)]), None),
+        ('post', reverse('store:update_cart', args=[_pick(ctx['products'], i)]), {'action': 'increase'}),
+        ('post', reverse('store:update_cart', args=[_pick(ctx['products'], i)]), {'action': 'decrease'}),
+        ('get', reverse('store:remove_from_cart', args=[_pick(ctx['products'], i)]), None),
+    ]),
+    'checkout': (CUSTOMER, _checkout),
+    'dashboard': (STAFF, lambda ctx, i: [('get', reverse('store:admin_dashboard'), None)]),
+    'api_categories': (None, lambda ctx, i: [
+        ('get', reverse('store:category-list'), None),
+        ('get', reverse('store:category-detail', args=[_pick(ctx['categories'], i)]), None),
+    ]),
+    'api_products': (None, lambda ctx, i: [
+        ('get', reverse('store:product-list'), {'page': i % 20 + 1}),
+        ('get', reverse('store:product-list'), {'search': _pick(WORDS, i)}),
+        ('get', reverse('store:product-detail', args=[_pick(ctx['products'], i)]), None),
+    ]),
+    'api_cart': (CUSTOMER, lambda ctx, i: [
+        ('post', reverse('store:cart-item-list'), {'product': _pick(ctx['products'], i), 'quantity': 1}),
+        ('get', reverse('store:cart-item-list'), None),
+    ]),
+    'api_wishlist': (CUSTOMER, lambda ctx, i: [('get', reverse('store:wishlist-item-list'), None)]),
+    'api_orders': (CUSTOMER, lambda ctx, i: [
+        ('get', reverse('store:order-list'), None),
+        ('get', reverse('store:order-detail', args=[_pick(ctx['orders'], i)]), None),
+    ]),
+}
+
+
+class ClientSession:
+    """Runs requests in-process with the Django test client."""
+
+    def __init__(self, username=None):
+        self.client = Client()
+        if username:
+            self.client.force_login(User.objects.get(username=username))
+
+    def request(self, method, path, data):
+        kwargs = {}
+        if method != 'get' and path.startswith('/api/'):
+            kwargs['content_type'] = 'application/json'
+        with CaptureQueriesContext(connection) as ctx:
+            start = time.perf_counter()
+            response = getattr(self.client, method)(path, data, **kwargs)
+            elapsed = time.perf_counter() - start
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response.status_code, elapsed, len(ctx.captured_queries)
+
+
+class HttpSession:
+    """Runs requests against a live server with urllib, logging in through
+    the login form. Redirects are not followed, as with the test client."""
+
+    class _NoRedirect(urllib.request.HTTPRedirectHandler):
+        def redirect_request(self, *args, **kwargs):
+            return None
+
+    def __init__(self, base_url, username=None):
+        self.base_url = base_url.rstrip('/')
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(self.cookies), self._NoRedirect,
+        )
+        self.request('get', reverse('store:login'), None)  # sets the CSRF cookie
+        if username:
+            status, _, _ = self.request('post', reverse('store:login'), {'username': username, 'password': PASSWORD})
+            if status != 302:
+                raise ValueError(f"Could not log in as {username} (HTTP {status}).")
+
+    def _csrf_token(self):
+        return next((cookie.value for cookie in self.cookies if cookie.name == 'csrftoken'), '')
+
+    def request(self, method, path, data):
+        url, body, headers = self.base_url + path, None, {'Referer': self.base_url + '/'}
+        if method == 'get':
+            if data:
+                url += '?' + urllib.parse.urlencode(data)
+        else:
+            headers['X-CSRFToken'] = self._csrf_token()
+            if path.startswith('/api/'):
+                body = json.dumps(data).encode()
+                headers['Content-Type'] = 'application/json'
+            else:
+                body = urllib.parse.urlencode(data or {}).encode()
+        request = urllib.request.Request(url, data=body, headers=headers, method=method.upper())
+        start = time.perf_counter()
+        try:
+            with self.opener.open(request) as response:
+                response.read()
+                status, timing = response.status, response.headers.get('Server-Timing', '')
+        except urllib.error.HTTPError as exc:
+            exc.read()
+            status, timing = exc.code, exc.headers.get('Server-Timing', '')
+        elapsed = time.perf_counter() - start
+        match = SERVER_TIMING_QUERIES_RE.search(timing)
+        return status, elapsed, int(match.group(1)) if match else None
+
+
+def run_scenario(name, session_factory, ctx, iterations, warmup=0):
+    """Run `iterations` of a scenario and summarize per-request timings."""
+    username, build = SCENARIOS[name]
+    session = session_factory(username)
+    timings, queries, errors = [], [], 0
+    started = None
+    for i in range(-warmup, iterations):
+        if i == 0:
+            started = time.perf_counter()
+        for method, path, data in build(ctx, i):
+            status, elapsed, count = session.request(method, path, data)
+            if i < 0:
+                continue
+            timings.append(elapsed * 1000)
+            errors += status >= 400
+            if count is not None:
+                queries.append(count)
+    duration = time.perf_counter() - started if started is not None else 0
+    return {
+        'iterations': iterations,
+        'requests': len(timings),
+        'errors': errors,
+        'requests_per_s': round(len(timings) / duration, 1) if duration else None,
+        **percentiles(timings),
+        'mean_queries': round(sum(queries) / len(queries), 2) if queries else None,
+        'max_queries': max(queries) if queries else None,
+    }
@@ -0,0 +1,187 @@
+import asyncio
+import importlib.util
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from store.bench import percentiles
+from store.models import Product
+
+DEPLOYMENTS = {
+    'wsgi': ['ecommerce_site.wsgi'],
+    'wsgi-gthread': ['ecommerce_site.wsgi', '-k', 'gthread', '--threads', '8'],
+    'asgi': ['ecommerce_site.asgi:application', '-k', 'uvicorn_worker.UvicornWorker'],
+}
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _tree_rss(pid):
+    """Resident memory (bytes) of a process and all its descendants."""
+    children = {}
+    for entry in os.listdir('/proc'):
+        if entry.isdigit():
+            try:
+                with open(f'/proc/{entry}/stat') as fileobj:
+                    ppid = int(fileobj.read().rsplit(')', 1)[1].split()[1])
+            except (OSError, IndexError, ValueError):
+                continue
+            children.setdefault(ppid, []).append(int(entry))
+    total, pending = 0, [pid]
+    while pending:
+        current = pending.pop()
+        pending.extend(children.get(current, ()))
+        try:
+            with open(f'/proc/{current}/status') as fileobj:
+                total += next(int(line.split()[1]) * 1024 for line in fileobj if line.startswith('VmRSS:'))
+        except (OSError, StopIteration):
+            pass
+    return total
+
+
+async def _get(port, path, timeout):
+    start = time.perf_counter()
+    reader, writer = await asyncio.wait_for(asyncio.open_connection('127.0.0.1', port), timeout)
+    try:
+        writer.write(f'GET {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n'.encode())
+        await writer.drain()
+        response = await asyncio.wait_for(reader.read(), timeout)
+    finally:
+        writer.close()
+    status = int(response.split(b' ', 2)[1]) if response.startswith(b'HTTP/') else 0
+    return status, (time.perf_counter() - start) * 1000
+
+
+async def _trickle(port, path, until):
+    """A slow client: sends its request a byte at a time and never finishes
+    it, holding a connection (and, with sync workers, a worker) open."""
+    try:
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        request = f'GET {path} HTTP/1.1\r\nHost: localhost\r\n'.encode()
+        for byte in request:
+            if time.monotonic() >= until:
+                break
+            writer.write(bytes([byte]))
+            await writer.drain()
+            await asyncio.sleep(0.5)
+        writer.close()
+    except OSError:
+        pass
+
+
+async def _load(port, paths, connections, slow_clients, duration, pid, timeout):
+    until = time.monotonic() + duration
+    timings, errors, peak = [], 0, 0
+
+    async def client(index):
+        nonlocal errors
+        i = index
+        while time.monotonic() < until:
+            try:
+                status, elapsed = await _get(port, paths[i % len(paths)], timeout)
+            except (OSError, asyncio.TimeoutError):
+                errors += 1
+                continue
+            finally:
+                i += 1
+            if status != 200:
+                errors += 1
+            timings.append(elapsed)
+
+    async def sample_memory():
+        nonlocal peak
+        while time.monotonic() < until:
+            peak = max(peak, _tree_rss(pid))
+            await asyncio.sleep(0.25)
+
+    start = time.perf_counter()
+    await asyncio.gather(
+        sample_memory(),
+        *(_trickle(port, paths[0], until) for _ in range(slow_clients)),
+        *(client(index) for index in range(connections)),
+    )
+    return timings, errors, time.perf_counter() - start, peak
+
+
+class Command(BaseCommand):
+    help = ("Start the site under gunicorn with sync WSGI workers and with uvicorn (ASGI) workers and compare "
+            "throughput, latency and memory per connection at increasing numbers of concurrent connections. "
+            "Needs gunicorn and uvicorn-worker, and a seeded database (see seed_store).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--deployments', default='wsgi,asgi', help=f"Comma-separated: {', '.join(DEPLOYMENTS)}.")
+        parser.add_argument('--connections', default='10,100,500', help="Comma-separated concurrency levels.")
+        parser.add_argument('--slow-clients', type=int, default=0,
+                            help="Extra connections that trickle in an unfinished request during each level.")
+        parser.add_argument('--duration', type=float, default=10, help="Seconds per concurrency level.")
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument('--paths', default='/,/api/products/')
+        parser.add_argument('--timeout', type=float, default=30, help="Per-request client timeout (seconds).")
+
+    def _start(self, name, workers):
+        port = _free_port()
+        env = {
+            **os.environ, 'DEBUG': 'False', 'STORE_PERF_SAMPLE_RATE': '0',
+            'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'ecommerce_site.settings'),
+        }
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', *DEPLOYMENTS[name], '--workers', str(workers),
+             '--bind', f'127.0.0.1:{port}', '--log-level', 'warning', '--backlog', '2048'],
+            cwd=settings.BASE_DIR, env=env,
+        )
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            try:
+                if asyncio.run(_get(port, '/', 5))[0] == 200:
+                    return server, port
+            except (OSError, asyncio.TimeoutError, IndexError, ValueError):
+                time.sleep(0.2)
+        server.terminate()
+        raise CommandError(f"{name} server did not answer on port {port}.")
+
+    def handle(self, *args, **options):
+        for module in ('gunicorn', 'uvicorn_worker'):
+            if importlib.util.find_spec(module) is None:
+                raise CommandError(f"{module} is not installed (pip install -r requirements.txt).")
+        if not Product.objects.exists():
+            raise CommandError("No products found; run seed_store first.")
+        names = [name for name in options['deployments'].split(',') if name]
+        if set(names) - DEPLOYMENTS.keys():
+            raise CommandError(f"Unknown deployments; choose from {', '.join(DEPLOYMENTS)}.")
+        levels = [int(level) for level in options['connections'].split(',')]
+        paths = options['paths'].split(',')
+
+        slow = f", {options['slow_clients']} slow clients" if options['slow_clients'] else ''
+        self.stdout.write(
+            f"{options['workers']} workers, {options['duration']:g}s per level, paths {', '.join(paths)}{slow}"
+        )
+        self.stdout.write(f"  {'deployment':<14} {'conns':>6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} "
+                          f"{'errors':>7} {'idle MiB':>9} {'peak MiB':>9} {'KiB/conn':>9}")
+        for name in names:
+            server, port = self._start(name, options['workers'])
+            try:
+                for level in levels:
+                    asyncio.run(_load(port, paths, min(level, 10), 0, 1, server.pid, options['timeout']))  # warm up
+                    idle = _tree_rss(server.pid)
+                    timings, errors, elapsed, peak = asyncio.run(_load(
+                        port, paths, level, options['slow_clients'], options['duration'], server.pid, options['timeout'],
+                    ))
+                    stats = percentiles(timings)
+                    per_connection = max(peak - idle, 0) / 1024 / (level + options['slow_clients'])
+                    self.stdout.write(
+                        f"  {name:<14} {level:>6} {len(timings) / elapsed:>8.1f} {stats['p50_ms'] or 0:>8.1f} "
+                        f"{stats['p95_ms'] or 0:>8.1f} {errors:>7} {idle / 2**20:>9.1f} {peak / 2**20:>9.1f} "
+                        f"{per_connection:>9.1f}"
+                    )
+            finally:
+                server.terminate()
+                server.wait(10)
@@ -0,0 +1,58 @@
+import json
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.urls import reverse
+
+from store.bench import rolled_back, seed_catalog
+from store.models import Category, Product
+
+
+class Command(BaseCommand):
+    help = ("Rows/second for supplier syncs: the bulk product and stock endpoints vs one POST per row "
+            "(seeded data is rolled back).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument('--sample', type=int, default=200, help="Rows sent one request at a time.")
+
+    def _send(self, client, method, url, payload):
+        start = time.perf_counter()
+        response = getattr(client, method)(url, json.dumps(payload), content_type='application/json')
+        elapsed = time.perf_counter() - start
+        if response.status_code >= 400:
+            self.stderr.write(f"{method.upper()} {url}: {response.status_code} {response.content[:200]!r}")
+        return elapsed
+
+    def _report(self, label, rows, elapsed):
+        self.stdout.write(f"  {label:<24} {rows:>7} rows {elapsed:>8.2f}s {rows / elapsed:>10,.0f} rows/s")
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        with rolled_back():
+            seed_catalog(0)
+            staff = User.objects.create_user(username='bench_bulk', is_staff=True)
+            client = Client()
+            client.force_login(staff)
+            category_ids = list(Category.objects.values_list('pk', flat=True))
+            payload = [
+                {'name': f'Bulk Product {i}', 'description': 'Imported', 'price': f'{10 + i % 90}.00',
+                 'category': category_ids[i % len(category_ids)], 'stock': i % 50}
+                for i in range(rows)
+            ]
+
+            self.stdout.write(f"{rows} rows:")
+            self._report('bulk create', rows, self._send(client, 'post', reverse('store:product-bulk'), payload))
+            for row in payload:
+                row['price'] = '99.00'
+            self._report('bulk update', rows, self._send(client, 'post', reverse('store:product-bulk'), payload))
+
+            stock = [{'id': pk, 'stock': 5} for pk in Product.objects.values_list('pk', flat=True)]
+            self._report('stock patch', len(stock), self._send(client, 'patch', reverse('store:product-stock'), stock))
+
+            sample = [dict(row, name=f'Single {row["name"]}') for row in payload[:options['sample']]]
+            elapsed = sum(self._send(client, 'post', reverse('store:product-list'), row) for row in sample)
+            self._report('one POST per row', len(sample), elapsed)
+            self.stdout.write(f"  (one POST per row would take ~{elapsed / len(sample) * rows:.1f}s for {rows} rows)")
@@ -0,0 +1,59 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection
+
+from store.models import Category, Order, Product
+from store.orders import OutOfStock, place_order
+
+
+class Command(BaseCommand):
+    help = "Hammer one product with concurrent checkouts, verify it is never oversold and report orders/second."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument('--attempts', type=int, default=500, help="Total checkout attempts across all workers.")
+        parser.add_argument('--stock', type=int, default=300)
+
+    def handle(self, *args, **options):
+        # Worker threads use their own connections, so the fixture is committed and removed afterwards
+        user, _ = User.objects.get_or_create(username='bench_checkout')
+        category = Category.objects.create(name='Bench Checkout')
+        product = Product.objects.create(name='Bench Checkout Product', price=10, category=category, stock=options['stock'])
+        line = [{'product': product, 'quantity': 1}]
+
+        def attempt(_):
+            try:
+                place_order(user, line, 'cash', first_name='Bench', email='bench@example.com',
+                            address='-', city='-', phone='-')
+                return 'placed'
+            except OutOfStock:
+                return 'out_of_stock'
+            except OperationalError:
+                return 'db_error'  # e.g. "database is locked" on SQLite
+            finally:
+                connection.close()
+
+        try:
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+                results = list(pool.map(attempt, range(options['attempts'])))
+            elapsed = time.perf_counter() - start
+
+            product.refresh_from_db()
+            placed = results.count('placed')
+            self.stdout.write(
+                f"{connection.vendor}, {options['workers']} workers: {placed} placed, "
+                f"{results.count('out_of_stock')} out of stock, {results.count('db_error')} db errors "
+                f"in {elapsed:.2f}s ({placed / elapsed:.1f} orders/s)"
+            )
+            if product.stock != options['stock'] - placed or placed > options['stock']:
+                self.stderr.write(self.style.ERROR(f"OVERSOLD: stock={product.stock} placed={placed}"))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"No oversell: remaining stock {product.stock}"))
+        finally:
+            Order.objects.filter(user=user).delete()
+            category.delete()
+            user.delete()
@@ -0,0 +1,142 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from store.bench import percentiles
+from store.models import CartItem, Order, Product
+
+# Settings for each connection strategy, passed to the child process
+MODES = {
+    'per-request': {'CONN_MAX_AGE': '0', 'DB_POOL': 'False'},
+    'persistent': {'CONN_MAX_AGE': '600', 'DB_POOL': 'False'},
+    'pool': {'CONN_MAX_AGE': '0', 'DB_POOL': 'True'},
+}
+PRODUCTS = 200
+CHECKOUT_FORM = {'name': 'Bench', 'location': 'Street 1', 'city': 'Phnom Penh', 'phone': '012000000', 'payment_method': 'cash'}
+
+
+class Command(BaseCommand):
+    help = ("Web checkout throughput (add to cart + place order) and PostgreSQL connections used at 4/16/64 "
+            "concurrent workers (threads of one process, as with gthread or ASGI workers), with per-request "
+            "connections, persistent connections and a connection pool. "
+            "Each run is a separate process configured like production through CONN_MAX_AGE / DB_POOL. Needs "
+            "PostgreSQL and a seeded database (seed_store); the bench customers' carts are emptied, stock is restored "
+            "and bench orders are deleted afterwards.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', default='4,16,64', help="Comma-separated numbers of concurrent workers.")
+        parser.add_argument('--modes', default=','.join(MODES), help=f"Comma-separated: {', '.join(MODES)}.")
+        parser.add_argument('--duration', type=float, default=10, help="Seconds per run.")
+        parser.add_argument('--pool-size', type=int, default=8, help="DB_POOL_MAX_SIZE for the pool mode.")
+        parser.add_argument('--child', type=int, help="Internal: run the load with this many workers and print JSON.")
+
+    def handle(self, *args, **options):
+        if options['child']:
+            return self._child(options['child'], options['duration'])
+        if connection.vendor != 'postgresql':
+            raise CommandError("Connection pooling is PostgreSQL-only; set DATABASE_URL to a PostgreSQL database.")
+        modes = [mode for mode in options['modes'].split(',') if mode]
+        if set(modes) - MODES.keys():
+            raise CommandError(f"Unknown modes; choose from {', '.join(MODES)}.")
+        levels = [int(level) for level in options['workers'].split(',')]
+        if User.objects.filter(username__startswith='bench_customer_').count() < max(levels):
+            raise CommandError(f"Need at least {max(levels)} bench customers; run seed_store first.")
+
+        products = list(Product.objects.order_by('id')[:PRODUCTS])
+        stock = {product.pk: product.stock for product in products}
+        started = timezone.now()
+        Product.objects.filter(pk__in=stock).update(stock=10 ** 6)
+        self.stdout.write(f"{options['duration']:g}s per run, pool size {options['pool_size']} per process")
+        self.stdout.write(f"  {'mode':<12} {'workers':>7} {'orders/s':>9} {'p50 ms':>8} {'p95 ms':>8} "
+                          f"{'errors':>7} {'peak conns':>11}")
+        try:
+            for mode in modes:
+                for level in levels:
+                    result, peak = self._run(mode, level, options)
+                    self.stdout.write(
+                        f"  {mode:<12} {level:>7} {result['orders'] / result['elapsed']:>9.1f} "
+                        f"{result['p50_ms'] or 0:>8.1f} {result['p95_ms'] or 0:>8.1f} {result['errors']:>7} {peak:>11}"
+                    )
+        finally:
+            Order.objects.filter(user__username__startswith='bench_customer_', created_at__gte=started).delete()
+            for product in products:
+                product.stock = stock[product.pk]
+            Product.objects.bulk_update(products, ['stock'])
+
+    def _run(self, mode, workers, options):
+        env = {**os.environ, **MODES[mode], 'DB_POOL_MAX_SIZE': str(options['pool_size']),
+               'DB_POOL_MIN_SIZE': str(min(2, options['pool_size'])), 'DEBUG': 'False', 'STORE_PERF_SAMPLE_RATE': '0'}
+        child = subprocess.Popen(
+            [sys.executable, 'manage.py', 'bench_db_pool', '--child', str(workers), '--duration', str(options['duration'])],
+            cwd=settings.BASE_DIR, env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+        )
+        # The server's view: connections to this database other than ours
+        peak = 0
+        with connection.cursor() as cursor:
+            while child.poll() is None:
+                cursor.execute(
+                    "SELECT count(*) FROM pg_stat_activity WHERE datname = current_database() "
+                    "AND pid <> pg_backend_pid() AND backend_type = 'client backend'"
+                )
+                peak = max(peak, cursor.fetchone()[0])
+                time.sleep(0.1)
+        output = child.stdout.read().strip().splitlines()
+        if child.returncode or not output:
+            raise CommandError(f"{mode} run with {workers} workers failed (exit code {child.returncode}).")
+        return json.loads(output[-1]), peak
+
+    def _child(self, workers, duration):
+        users = list(User.objects.filter(username__startswith='bench_customer_').order_by('id')[:workers])
+        products = list(Product.objects.order_by('id').values_list('id', flat=True)[:PRODUCTS])
+        # Seeded carts may hold sold-out products; every checkout buys one item
+        CartItem.objects.filter(user__in=users).delete()
+        close_old_connections()
+        timings, errors = [], []
+        window = {}
+
+        def start_window():
+            window.update(start=time.perf_counter(), until=time.monotonic() + duration)
+        barrier = threading.Barrier(workers, action=start_window)
+
+        def worker(index):
+            client = Client()
+            client.force_login(users[index])
+            # The test client skips the end-of-request cleanup a server does
+            # (closing or returning the connection); do it after each request
+            close_old_connections()
+            barrier.wait()
+            i = index
+            while time.monotonic() < window['until']:
+                start = time.perf_counter()
+                try:
+                    client.get(reverse('store:add_to_cart', args=[products[i % len(products)]]))
+                    close_old_connections()
+                    response = client.post(reverse('store:checkout'), CHECKOUT_FORM)
+                    if response.status_code != 302 or 'order-success' not in response['Location']:
+                        errors.append(response.status_code)
+                    else:
+                        timings.append((time.perf_counter() - start) * 1000)
+                except Exception as exc:  # e.g. pool timeout, too many connections
+                    errors.append(repr(exc))
+                finally:
+                    close_old_connections()
+                i += workers
+
+        threads = [threading.Thread(target=worker, args=(index,)) for index in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - window['start']
+        self.stdout.write(json.dumps({'orders': len(timings), 'errors': len(errors), 'elapsed': elapsed, **percentiles(timings)}))
@@ -0,0 +1,38 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from store.bench import peak_rss, rolled_back, seed_catalog, seed_order_items
+from store.exports import FORMATS, export_orders
+
+
+class Command(BaseCommand):
+    help = ("Export seeded order items as CSV and NDJSON, reporting rows/second and peak RSS growth, "
+            "streamed vs built in memory (seeded data is rolled back).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=1_000_000, help="Order items to seed and export.")
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument('--in-memory', action='store_true',
+                            help="Also time joining the whole export into one string, as a non-streaming response would.")
+
+    def _report(self, label, items, elapsed, growth):
+        memory = f"{growth / 2 ** 20:>8.1f} MiB" if growth is not None else "     n/a"
+        self.stdout.write(f"  {label:<18} {elapsed:>7.2f}s {items / elapsed:>10,.0f} items/s   peak RSS +{memory}")
+
+    def handle(self, *args, **options):
+        items, chunk_size = options['items'], options['chunk_size']
+        with rolled_back():
+            seed_catalog(1000)
+            seed_order_items(items)
+            self.stdout.write(f"{items:,} order items:")
+            for fmt in FORMATS:
+                def stream():
+                    with open(os.devnull, 'w') as sink:
+                        for chunk in export_orders(fmt=fmt, chunk_size=chunk_size):
+                            sink.write(chunk)
+
+                self._report(f'{fmt} streamed', items, *peak_rss(stream))
+                if options['in_memory']:
+                    self._report(f'{fmt} in memory', items,
+                                 *peak_rss(lambda: ''.join(export_orders(fmt=fmt, chunk_size=chunk_size))))
@@ -0,0 +1,51 @@
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+
+from store.bench import rolled_back, seed_catalog
+from store.images import FORMATS, build_variants
+from store.models import Product
+
+
+class Command(BaseCommand):
+    help = ("Bytes of product images a catalog page downloads: originals vs the variant a browser "
+            "picks from srcset (seeded products reuse files from media/products; rolled back).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-size', type=int, default=12)
+        parser.add_argument('--slot', type=int, default=400, help="Rendered card width in CSS pixels.")
+        parser.add_argument('--dpr', default='1,2', help="Comma-separated device pixel ratios.")
+
+    def _pick(self, variants, needed):
+        # Browsers take the smallest candidate covering the slot, else the largest
+        return next((name for width, name in variants if width >= needed), variants[-1][1])
+
+    def handle(self, *args, **options):
+        _, files = default_storage.listdir('products')
+        files = sorted(files)
+        if not files:
+            raise CommandError("No images found in media/products.")
+        page_size = options['page_size']
+
+        with rolled_back():
+            seed_catalog(page_size)
+            products = list(Product.objects.order_by('id')[:page_size])
+            for product, name in zip(products, files * (page_size // len(files) + 1)):
+                product.image.name = f'products/{name}'
+
+            totals = {'original': 0}
+            manifests = []
+            for product in products:
+                totals['original'] += product.image.size
+                manifests.append(build_variants(product.image.name))
+            for dpr in (float(d) for d in options['dpr'].split(',')):
+                needed = options['slot'] * dpr
+                for fmt, *_ in FORMATS:
+                    totals[f'{fmt} @{dpr:g}x'] = sum(
+                        default_storage.size(self._pick(manifest['sources'][fmt], needed))
+                        for manifest in manifests
+                    )
+
+        self.stdout.write(f"{page_size} products, {options['slot']}px cards:")
+        for label, size in totals.items():
+            share = f"{size * 100 / totals['original']:5.1f}%" if totals['original'] else ''
+            self.stdout.write(f"  {label:<12} {size / 1024:>10,.0f} KiB  {share}")
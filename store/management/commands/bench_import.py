@@ -0,0 +1,65 @@
+import csv
+import os
+import random
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+
+from store.bench import WORDS, rolled_back
+from store.forms import ProductForm
+from store.imports import ProductImporter, read_rows
+from store.models import Category
+
+
+class Command(BaseCommand):
+    help = ("Rows/second importing a generated CSV with import_products' importer (create, then update) "
+            "vs saving ProductForm one row at a time (everything is rolled back).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100_000)
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--sample', type=int, default=500, help="Rows saved through ProductForm.")
+
+    def _write_csv(self, path, rows, price_offset=0):
+        rng = random.Random(42)
+        with open(path, 'w', newline='', encoding='utf-8') as fileobj:
+            writer = csv.writer(fileobj)
+            writer.writerow(['name', 'description', 'price', 'category', 'stock'])
+            for i in range(rows):
+                writer.writerow([
+                    f'Imported {" ".join(rng.sample(WORDS, 2)).title()} {i}', ' '.join(rng.choices(WORDS, k=12)),
+                    f'{rng.randint(100, 50000) / 100 + price_offset:.2f}', f'Import Category {i % 25}', rng.randint(0, 100),
+                ])
+
+    def _import(self, path, chunk_size):
+        start = time.perf_counter()
+        with open(path, newline='', encoding='utf-8') as fileobj:
+            totals = ProductImporter(chunk_size=chunk_size).run(read_rows(fileobj, 'csv'))
+        return totals, time.perf_counter() - start
+
+    def _report(self, label, rows, elapsed):
+        self.stdout.write(f"  {label:<22} {rows:>8,} rows {elapsed:>8.2f}s {rows / elapsed:>10,.0f} rows/s")
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        with tempfile.TemporaryDirectory() as directory, rolled_back():
+            path = os.path.join(directory, 'products.csv')
+            self._write_csv(path, rows)
+            self.stdout.write(f"{rows:,} rows, {os.path.getsize(path) / 2 ** 20:.1f} MiB CSV:")
+
+            totals, elapsed = self._import(path, options['chunk_size'])
+            self._report(f"import (created {totals['created']:,})", rows, elapsed)
+            self._write_csv(path, rows, price_offset=1)
+            totals, elapsed = self._import(path, options['chunk_size'])
+            self._report(f"import (updated {totals['updated']:,})", rows, elapsed)
+
+            category = Category.objects.first()
+            start = time.perf_counter()
+            for i in range(options['sample']):
+                form = ProductForm({'name': f'Form Product {i}', 'price': '10.00', 'stock': 1, 'category': category.pk,
+                                    'description': 'Entered one at a time'})
+                form.save()
+            elapsed = time.perf_counter() - start
+            self._report("ProductForm per row", options['sample'], elapsed)
+            self.stdout.write(f"  (ProductForm would take ~{elapsed / options['sample'] * rows:.0f}s for {rows:,} rows)")
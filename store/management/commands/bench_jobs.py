@@ -0,0 +1,108 @@
+import logging
+import threading
+import time
+
+from django.contrib.auth.models import User
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from store import jobs
+from store.bench import percentiles
+from store.models import Category, Job, Order, Product
+
+CHECKOUT_FORM = {'name': 'Bench', 'location': 'Street 1', 'city': 'Phnom Penh', 'phone': '012000000', 'payment_method': 'khqr'}
+
+
+class SlowEmailBackend(EmailBackend):
+    """In-memory email that takes as long as a round trip to a mail provider."""
+
+    latency = 0.0
+
+    def send_messages(self, messages):
+        time.sleep(self.latency)
+        return super().send_messages(messages)
+
+
+class Command(BaseCommand):
+    help = ("Checkout latency (POST /checkout/) with post-checkout work (confirmation email, sales rollups) run "
+            "in the request versus queued for run_store_worker, then how fast workers drain the queue. Email "
+            "goes to an in-memory backend with --email-latency added per message.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200, help="Checkouts per mode.")
+        parser.add_argument('--warmup', type=int, default=10)
+        parser.add_argument('--email-latency', type=float, default=200, help="Milliseconds per email sent.")
+        parser.add_argument('--concurrency', type=int, default=4, help="Worker threads draining the queue.")
+
+    def handle(self, *args, **options):
+        SlowEmailBackend.latency = options['email_latency'] / 1000
+        # Requests commit for real (post-commit work must run), so the fixture is removed afterwards
+        user, _ = User.objects.get_or_create(username='bench_jobs', defaults={'email': 'bench@example.com'})
+        category = Category.objects.create(name='Bench Jobs')
+        product = Product.objects.create(name='Bench Jobs Product', price=10, category=category, stock=10 ** 6)
+        client = Client()
+        client.force_login(user)
+
+        self.stdout.write(f"{connection.vendor}, {options['iterations']} checkouts per mode, "
+                          f"email latency {options['email_latency']:g} ms")
+        self.stdout.write(f"  {'mode':<8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'mean ms':>8} {'max ms':>8}")
+        try:
+            for mode in ('inline', 'queue'):
+                with override_settings(STORE_JOB_QUEUE=mode == 'queue', STORE_PERF_SAMPLE_RATE=0,
+                                       EMAIL_BACKEND='store.management.commands.bench_jobs.SlowEmailBackend'):
+                    timings = self._checkouts(client, product, options['warmup'], options['iterations'])
+                    stats = percentiles(timings)
+                    self.stdout.write(
+                        f"  {mode:<8} {stats['p50_ms']:>8.1f} {stats['p95_ms']:>8.1f} {stats['p99_ms']:>8.1f} "
+                        f"{sum(timings) / len(timings):>8.1f} {stats['max_ms']:>8.1f}"
+                    )
+                    if mode == 'queue':
+                        self._drain(options['concurrency'])
+        finally:
+            Job.objects.filter(name__startswith='store.').delete()
+            Order.objects.filter(user=user).delete()
+            category.delete()
+            user.delete()
+
+    def _checkouts(self, client, product, warmup, iterations):
+        timings = []
+        for i in range(warmup + iterations):
+            client.get(reverse('store:add_to_cart', args=[product.pk]))
+            start = time.perf_counter()
+            response = client.post(reverse('store:checkout'), CHECKOUT_FORM)
+            elapsed = (time.perf_counter() - start) * 1000
+            if response.status_code != 302 or 'order-success' not in response['Location']:
+                raise RuntimeError(f"Checkout failed with HTTP {response.status_code}")
+            if i >= warmup:
+                timings.append(elapsed)
+        return timings
+
+    def _drain(self, concurrency):
+        queued = Job.objects.filter(status=Job.QUEUED).count()
+        results = []
+
+        def worker():
+            try:
+                results.append(jobs.work(burst=True))
+            finally:
+                connection.close()
+
+        logger = logging.getLogger('store.jobs')
+        level = logger.level
+        logger.setLevel(logging.WARNING)  # one line per job otherwise
+        start = time.perf_counter()
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        logger.setLevel(level)
+        done = sum(succeeded for succeeded, _ in results)
+        self.stdout.write(
+            f"  queue: {queued} jobs drained by {concurrency} worker threads in {elapsed:.2f}s "
+            f"({done / elapsed:.1f} jobs/s, {sum(failed for _, failed in results)} failed)"
+        )
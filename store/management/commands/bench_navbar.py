@@ -0,0 +1,40 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from store.bench import rolled_back, seed_catalog
+from store.models import Product, WishlistItem
+
+
+class Command(BaseCommand):
+    help = "Report per-request query counts with a cold vs warm navbar cache (seeded data is rolled back)."
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            seed_catalog(100)
+            user = User.objects.create_user(username='bench_navbar')
+            WishlistItem.objects.bulk_create([WishlistItem(user=user, product=p) for p in Product.objects.all()[:5]])
+            product = Product.objects.first()
+
+            pages = {
+                'index': reverse('store:index'),
+                'product_detail': reverse('store:product_detail', args=[product.pk]),
+                'cart': reverse('store:cart'),
+            }
+            for who in ('anonymous', 'logged in'):
+                client = Client()
+                if who == 'logged in':
+                    client.force_login(user)
+                for name, url in pages.items():
+                    counts = []
+                    for _ in ('cold', 'warm'):
+                        if not counts:
+                            cache.clear()
+                        with CaptureQueriesContext(connection) as ctx:
+                            client.get(url)
+                        counts.append(len(ctx))
+                    self.stdout.write(f"{who:>10} | {name:<15} | cold {counts[0]:>3} queries | warm {counts[1]:>3} queries")
@@ -0,0 +1,60 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.paginator import Paginator
+
+from store.bench import measure, rolled_back, seed_catalog
+from store.models import Product
+from store.pagination import encode_cursor, keyset_page
+
+
+class Command(BaseCommand):
+    help = "Compare OFFSET (Paginator) and keyset pagination at increasing page depth on a seeded catalog (rolled back)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=1_000_000)
+        parser.add_argument('--page-size', type=int, default=12)
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument('--walk', action='store_true', help="Also time walking every page from first to last.")
+
+    def handle(self, *args, **options):
+        size, page_size = options['size'], options['page_size']
+        with rolled_back():
+            start = time.perf_counter()
+            seed_catalog(size)
+            self.stdout.write(f"Seeded {size:,} products in {time.perf_counter() - start:.1f}s")
+
+            queryset = Product.objects.order_by('price', 'id')
+            paginator = Paginator(queryset, page_size)
+            last = paginator.num_pages
+
+            for label, number in (('first', 1), ('middle', max(1, last // 2)), ('last', last)):
+                offset_stats = measure(lambda: list(Paginator(queryset, page_size).page(number)), options['repeat'])
+
+                # The cursor for page N is the boundary row of page N-1
+                cursor = None
+                if number > 1:
+                    boundary = queryset[(number - 1) * page_size - 1]
+                    cursor = encode_cursor([boundary.price, boundary.id])
+                keyset_stats = measure(
+                    lambda: keyset_page(Product.objects.all(), ('price', 'id'), cursor, page_size), options['repeat']
+                )
+                self.stdout.write(
+                    f"{label:>6} page {number:>7}: offset {offset_stats['median_ms']:>9} ms | "
+                    f"keyset {keyset_stats['median_ms']:>9} ms"
+                )
+
+            if options['walk']:
+                start = time.perf_counter()
+                for number in paginator.page_range:
+                    list(paginator.page(number))
+                offset_total = time.perf_counter() - start
+
+                start = time.perf_counter()
+                cursor = None
+                while True:
+                    _, cursor, _ = keyset_page(Product.objects.all(), ('price', 'id'), cursor, page_size)
+                    if cursor is None:
+                        break
+                keyset_total = time.perf_counter() - start
+                self.stdout.write(f"Full walk of {last:,} pages: offset {offset_total:.1f}s | keyset {keyset_total:.1f}s")
@@ -0,0 +1,68 @@
+import random
+import time
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from store.bench import peak_rss, percentiles, rolled_back, seed_catalog, seed_order_items
+from store.fragments import related_products
+from store.models import Order, OrderItem, Product
+from store.recommendations import add_order, rebuild_recommendations
+
+
+class Command(BaseCommand):
+    help = ("Build \"frequently bought together\" recommendations from seeded orders: full rebuild time and "
+            "memory, the incremental update per new order, and the product page lookup (seeded data is "
+            "rolled back).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=2000, help="Catalog size when seed_store has not been run.")
+        parser.add_argument('--items', type=int, default=300_000, help="Order items to add, three per order.")
+        parser.add_argument('--iterations', type=int, default=200, help="New orders / page lookups timed.")
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        with rolled_back():
+            seeded = Product.objects.filter(category__name__startswith='Bench Category ')
+            if not seeded.exists():  # else reuse the catalog of seed_store
+                seed_catalog(options['products'])
+            seed_order_items(options['items'])
+            self.stdout.write(f"{connection.vendor}, {Product.objects.count():,} products, "
+                              f"{OrderItem.objects.count():,} order items")
+
+            elapsed, growth = peak_rss(lambda: self.stdout.write(
+                "  rebuild: {:,} pairs, {:,} recommendations".format(*rebuild_recommendations())
+            ))
+            memory = f"{growth / 2 ** 20:.1f} MiB" if growth is not None else "n/a"
+            self.stdout.write(f"  rebuild: {elapsed:.2f}s, "
+                              f"peak RSS +{memory}")
+
+            products = list(seeded.values_list('pk', 'price'))
+            user = User.objects.get(username='bench_exporter')
+            timings = []
+            for _ in range(options['iterations']):
+                order = Order.objects.create(user=user, first_name='Bench', email='bench@example.com',
+                                             address='Street 1', city='Phnom Penh', phone='012000000',
+                                             total_amount=0, payment_method='khqr')
+                OrderItem.objects.bulk_create([
+                    OrderItem(order=order, product_id=pk, quantity=1, price=price) for pk, price in rng.sample(products, 3)
+                ])
+                start = time.perf_counter()
+                add_order(order.pk)
+                timings.append((time.perf_counter() - start) * 1000)
+            self._report('new order', timings)
+
+            timings = []
+            for product in rng.sample(list(seeded), options['iterations']):
+                cache.clear()  # the category top-up is cached per catalog version
+                start = time.perf_counter()
+                related_products(product, 0)
+                timings.append((time.perf_counter() - start) * 1000)
+            self._report('page lookup', timings)
+
+    def _report(self, label, timings):
+        stats = percentiles(timings)
+        self.stdout.write(f"  {label}: p50 {stats['p50_ms']:.2f} ms, p95 {stats['p95_ms']:.2f} ms, "
+                          f"max {stats['max_ms']:.2f} ms")
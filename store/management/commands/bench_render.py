@@ -0,0 +1,51 @@
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.template.loader import render_to_string
+from django.test import RequestFactory
+
+from store.bench import measure, rolled_back, seed_catalog
+from store.fragments import fragment_context
+from store.models import Product
+
+
+class Command(BaseCommand):
+    help = "Time rendering the storefront grid with cold and warm fragment caches (seeded data is rolled back)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='12,48,96', help="Comma-separated products per page.")
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def _request(self):
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        request.session = import_module(settings.SESSION_ENGINE).SessionStore()
+        return request
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',')]
+        with rolled_back():
+            seed_catalog(max(sizes))
+            for size in sizes:
+                products = list(Product.objects.select_related('category').order_by('-id')[:size])
+
+                def render():
+                    request = self._request()
+                    context = {'products': products, 'query': '', **fragment_context(request)}
+                    return render_to_string('store/index.html', context, request)
+
+                def cold():
+                    cache.clear()
+                    render()
+
+                cold_stats = measure(cold, options['repeat'])
+                render()
+                warm_stats = measure(render, options['repeat'])
+                self.stdout.write(
+                    f"{size:>4} products: cold {cold_stats['median_ms']:>8} ms | "
+                    f"warm {warm_stats['median_ms']:>8} ms"
+                )
+        cache.clear()
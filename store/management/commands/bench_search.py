@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from store import search
+from store.bench import measure, rolled_back, seed_catalog
+from store.models import Product
+
+QUERIES = ['jordan', 'black leather', 'run', 'premium cotton slim', 'nothingmatches']
+
+
+class Command(BaseCommand):
+    help = "Compare product search backends against the icontains scan on a seeded catalog (rolled back afterwards)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[10_000, 100_000, 1_000_000])
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        backends = {'icontains': search.IContainsSearchBackend()}
+        if connection.vendor == 'postgresql':
+            backends['postgres'] = search.PostgresSearchBackend()
+        else:
+            backends['inverted_index'] = search.InvertedIndexSearchBackend()
+
+        for size in options['sizes']:
+            with rolled_back():
+                start = time.perf_counter()
+                seed_catalog(size)
+                self.stdout.write(f"\n== {size:,} products (seeded in {time.perf_counter() - start:.1f}s) ==")
+
+                for name, backend in backends.items():
+                    if isinstance(backend, search.InvertedIndexSearchBackend):
+                        start = time.perf_counter()
+                        backend.build()
+                        self.stdout.write(f"{name}: index build {(time.perf_counter() - start) * 1000:.0f} ms")
+
+                    for query in QUERIES:
+                        # First page of results, as the storefront would render it
+                        def run():
+                            list(backend.search(Product.objects.all(), query)[:12])
+                        stats = measure(run, options['repeat'])
+                        self.stdout.write(
+                            f"{name:>15} | {query:<22} | median {stats['median_ms']:>9} ms | max {stats['max_ms']:>9} ms"
+                        )
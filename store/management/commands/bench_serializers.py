@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from store.bench import measure, rolled_back, seed_catalog
+from store.fast_serializers import FastProductSerializer
+from store.models import Product
+from store.serializers import ProductSerializer
+
+
+class Command(BaseCommand):
+    help = "Compare ProductSerializer with the fast read-only path in products serialized per second (rolled back)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-sizes', nargs='+', type=int, default=[10, 100, 1000])
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        request = Request(RequestFactory().get('/api/products/'))
+        renderer = JSONRenderer()
+
+        with rolled_back():
+            seed_catalog(max(options['page_sizes']))
+            Product.objects.filter(pk__in=list(Product.objects.values_list('pk', flat=True))[::2]).update(image='products/Jordan_1.jpg')
+            base = Product.objects.order_by('id')
+
+            for size in options['page_sizes']:
+                def model_serializer():
+                    queryset = ProductSerializer.setup_eager_loading(base)[:size]
+                    return renderer.render(ProductSerializer(queryset, many=True, context={'request': request}).data)
+
+                def fast_path():
+                    to_dict = FastProductSerializer.compile(request)
+                    return renderer.render([to_dict(row) for row in FastProductSerializer.rows(base)[:size]])
+
+                if model_serializer() != fast_path():
+                    self.stderr.write(self.style.ERROR(f"Output differs at page size {size}"))
+
+                slow = measure(model_serializer, options['repeat'])
+                fast = measure(fast_path, options['repeat'])
+                slow_rate = size / (slow['median_ms'] / 1000)
+                fast_rate = size / (fast['median_ms'] / 1000)
+                self.stdout.write(
+                    f"page {size:>5}: ModelSerializer {slow_rate:>10,.0f} products/s | "
+                    f"fast path {fast_rate:>10,.0f} products/s | x{fast_rate / slow_rate:.1f}"
+                )
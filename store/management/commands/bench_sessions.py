@@ -0,0 +1,81 @@
+import os
+import threading
+import time
+
+from django.core.cache import caches
+from django.db import connection
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from store.bench import rolled_back, seed_catalog
+from store.models import Product
+
+LOCMEM = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'bench-sessions'}}
+
+
+def redis_caches(url):
+    return {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': url}}
+
+
+class Command(BaseCommand):
+    help = ("Anonymous cart requests/second (add to cart + view cart) under each cache/session configuration. "
+            "Uses REDIS_URL if set, else a fakeredis TCP stand-in when fakeredis is installed (seeded data is rolled back).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000)
+
+    def _redis_url(self):
+        if os.environ.get('REDIS_URL'):
+            return os.environ['REDIS_URL'].split(',')[0], None
+        try:
+            from fakeredis import TcpFakeServer
+        except ImportError:
+            return None, None
+        server = TcpFakeServer(('127.0.0.1', 0))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        host, port = server.server_address
+        return f'redis://{host}:{port}/0', server
+
+    def _run(self, products, count):
+        client = Client()
+        start = time.perf_counter()
+        for i in range(count // 2):
+            client.get(reverse('store:add_to_cart', args=[products[i % len(products)]]))
+            client.get(reverse('store:cart'))
+        return count / (time.perf_counter() - start)
+
+    def handle(self, *args, **options):
+        redis_url, stand_in = self._redis_url()
+        configs = [
+            ('db sessions, locmem cache', 'db', LOCMEM),
+            ('cached_db sessions, locmem', 'cached_db', LOCMEM),
+        ]
+        if redis_url:
+            label = 'redis' if stand_in is None else 'fakeredis'
+            configs += [
+                (f'cached_db sessions, {label}', 'cached_db', redis_caches(redis_url)),
+                (f'cache sessions, {label}', 'cache', redis_caches(redis_url)),
+            ]
+        else:
+            self.stderr.write("No REDIS_URL and fakeredis is not installed: skipping the Redis configurations.")
+
+        try:
+            with rolled_back():
+                seed_catalog(50)
+                products = list(Product.objects.values_list('pk', flat=True))
+                for label, engine, cache_settings in configs:
+                    with override_settings(SESSION_ENGINE=f'django.contrib.sessions.backends.{engine}', CACHES=cache_settings):
+                        caches['default'].clear()
+                        with CaptureQueriesContext(connection) as ctx:
+                            self._run(products, 100)  # also warms up templates and fragments
+                        session_queries = sum('django_session' in query['sql'] for query in ctx.captured_queries) / 100
+                        rate = self._run(products, options['requests'])
+                        caches['default'].clear()
+                    self.stdout.write(
+                        f"  {label:<32} {rate:>8,.0f} requests/s  {session_queries:.2f} session queries/request"
+                    )
+        finally:
+            if stand_in is not None:
+                stand_in.shutdown()
@@ -0,0 +1,136 @@
+import io
+import json
+import platform
+import subprocess
+from datetime import datetime, timezone as dt_timezone
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from store.bench import rolled_back
+from store.loadtest import CUSTOMER, SCENARIOS, ClientSession, HttpSession, run_scenario, scenario_context
+from store.models import Order, Product
+
+
+def _git(*args):
+    try:
+        return subprocess.run(['git', *args], capture_output=True, text=True, cwd=settings.BASE_DIR,
+                              timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ''
+
+
+class Command(BaseCommand):
+    help = ("Run the storefront, cart, checkout, dashboard and API scenarios and report requests/second, "
+            "latency percentiles and queries per request, optionally saved as JSON and compared with an "
+            "earlier run. In-process runs are rolled back; --base-url replays them over HTTP instead.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenarios', default=','.join(SCENARIOS), help="Comma-separated scenario names.")
+        parser.add_argument('--iterations', type=int, default=50, help="Iterations per scenario.")
+        parser.add_argument('--warmup', type=int, default=5, help="Untimed iterations first.")
+        parser.add_argument('--base-url', help="Run against a live server (e.g. http://127.0.0.1:8000) instead.")
+        parser.add_argument('--output', help="Write results to this JSON file.")
+        parser.add_argument('--compare', help="Earlier JSON results to diff against.")
+        parser.add_argument('--max-regression', type=float, default=None,
+                            help="Fail if any scenario's p95 grew by more than this many percent vs --compare.")
+        parser.add_argument('--seed-products', type=int, default=2000,
+                            help="Store size seeded (and rolled back) when seed_store has not been run.")
+        parser.add_argument('--seed-users', type=int, default=50)
+        parser.add_argument('--seed-orders', type=int, default=500)
+
+    def handle(self, *args, **options):
+        names = [name.strip() for name in options['scenarios'].split(',') if name.strip()]
+        unknown = set(names) - SCENARIOS.keys()
+        if unknown:
+            raise CommandError(f"Unknown scenarios: {', '.join(sorted(unknown))}. Choose from {', '.join(SCENARIOS)}.")
+        previous = self._load(options['compare']) if options['compare'] else None
+
+        if options['base_url']:
+            ctx = scenario_context()
+            if not ctx['products']:
+                raise CommandError("No products found; run seed_store against the same database first.")
+            results = self._run(names, lambda username: HttpSession(options['base_url'], username), ctx, options)
+            mode = f"http {options['base_url']}"
+            dataset = self._dataset()
+        else:
+            with rolled_back():
+                if not User.objects.filter(username=CUSTOMER).exists():
+                    call_command('seed_store', products=options['seed_products'], users=options['seed_users'],
+                                 orders=options['seed_orders'], stdout=io.StringIO())
+                cache.clear()
+                dataset = self._dataset()
+                results = self._run(names, ClientSession, scenario_context(), options)
+            cache.clear()
+            mode = 'in-process test client'
+
+        report = {
+            'commit': _git('rev-parse', '--short', 'HEAD'),
+            'dirty': bool(_git('status', '--porcelain', '--untracked-files=no')),
+            'timestamp': datetime.now(dt_timezone.utc).isoformat(timespec='seconds'),
+            'mode': mode,
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'dataset': dataset,
+            'iterations': options['iterations'],
+            'scenarios': results,
+        }
+        self._print(report, previous)
+        if options['output']:
+            with open(options['output'], 'w') as fileobj:
+                json.dump(report, fileobj, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+        if previous and options['max_regression'] is not None:
+            self._check_regressions(results, previous, options['max_regression'])
+
+    def _dataset(self):
+        return {'products': Product.objects.count(), 'users': User.objects.count(), 'orders': Order.objects.count()}
+
+    def _run(self, names, session_factory, ctx, options):
+        results = {}
+        for name in names:
+            results[name] = run_scenario(name, session_factory, ctx, options['iterations'], options['warmup'])
+        return results
+
+    def _load(self, path):
+        try:
+            with open(path) as fileobj:
+                return json.load(fileobj)
+        except (OSError, ValueError) as exc:
+            raise CommandError(f"Cannot read {path}: {exc}")
+
+    def _print(self, report, previous):
+        self.stdout.write(
+            f"{report['mode']}, {report['database']}, commit {report['commit'] or '?'}"
+            f"{' (dirty)' if report['dirty'] else ''}, {report['dataset']}"
+        )
+        header = f"  {'scenario':<16} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'queries':>8} {'errors':>6}"
+        if previous:
+            header += f" {'p95 vs':>8}"
+        self.stdout.write(header)
+        for name, result in report['scenarios'].items():
+            line = (
+                f"  {name:<16} {result['requests_per_s'] or 0:>8.1f} {result['p50_ms'] or 0:>8.2f} "
+                f"{result['p95_ms'] or 0:>8.2f} {result['p99_ms'] or 0:>8.2f} "
+                f"{result['mean_queries'] if result['mean_queries'] is not None else '-':>8} {result['errors']:>6}"
+            )
+            before = previous['scenarios'].get(name) if previous else None
+            if before and before.get('p95_ms'):
+                line += f" {(result['p95_ms'] - before['p95_ms']) * 100 / before['p95_ms']:>+7.1f}%"
+            self.stdout.write(line)
+
+    def _check_regressions(self, results, previous, limit):
+        regressed = [
+            f"{name} p95 {previous['scenarios'][name]['p95_ms']} -> {result['p95_ms']} ms"
+            for name, result in results.items()
+            if previous['scenarios'].get(name, {}).get('p95_ms')
+            and result['p95_ms'] > previous['scenarios'][name]['p95_ms'] * (1 + limit / 100)
+        ]
+        if regressed:
+            raise CommandError(f"p95 regressed by more than {limit:g}%: " + '; '.join(regressed))
@@ -0,0 +1,59 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from store.dbpool import server_connections, worker_stats
+
+
+class Command(BaseCommand):
+    help = ("Report database connection use: the configured strategy, PostgreSQL's connections by state against "
+            "max_connections, and the pool of every worker that published stats recently (DB_POOL=True).")
+
+    def handle(self, *args, **options):
+        db = connection.settings_dict
+        pool = db.get('OPTIONS', {}).get('pool')
+        if pool:
+            strategy = f"psycopg pool, {pool['min_size']}-{pool['max_size']} connections per process"
+        elif settings.DB_PGBOUNCER:
+            strategy = "PgBouncer (no persistent connections, no server-side cursors)"
+        else:
+            strategy = f"persistent connections, CONN_MAX_AGE={db['CONN_MAX_AGE']}"
+        self.stdout.write(f"{connection.vendor}: {strategy}, health checks {'on' if db['CONN_HEALTH_CHECKS'] else 'off'}")
+
+        server = server_connections(connection)
+        if server:
+            states = ', '.join(f"{count} {state}" for state, count in server['by_state'].items())
+            self.stdout.write(
+                f"Server: {server['total']}/{server['max_connections']} connections "
+                f"({server['total'] * 100 / server['max_connections']:.0f}%); this database: {states or 'none'}"
+            )
+
+        workers = worker_stats()
+        if not workers:
+            self.stdout.write("No worker pool stats published" + ("." if pool else " (DB_POOL is off)."))
+            return
+        self.stdout.write(
+            f"  {'worker':<28} {'in use':>7} {'size':>5} {'max':>5} {'waiting':>8} {'requests':>9} "
+            f"{'avg wait ms':>12} {'errors':>7} {'lost':>5} {'age s':>6}"
+        )
+        totals = {'in_use': 0, 'size': 0, 'max': 0, 'waiting': 0}
+        for worker, stats in workers.items():
+            in_use = stats['pool_size'] - stats['pool_available']
+            requests = stats.get('requests_num', 0)
+            avg_wait = stats.get('requests_wait_ms', 0) / requests if requests else 0
+            totals['in_use'] += in_use
+            totals['size'] += stats['pool_size']
+            totals['max'] += stats['pool_max']
+            totals['waiting'] += stats['requests_waiting']
+            self.stdout.write(
+                f"  {worker:<28} {in_use:>7} {stats['pool_size']:>5} {stats['pool_max']:>5} "
+                f"{stats['requests_waiting']:>8} {requests:>9} {avg_wait:>12.2f} "
+                f"{stats.get('requests_errors', 0):>7} {stats.get('connections_lost', 0):>5} "
+                f"{time.time() - stats['updated']:>6.0f}"
+            )
+        self.stdout.write(
+            f"  {len(workers)} worker{'s' if len(workers) != 1 else ''}: {totals['in_use']}/{totals['size']} pooled connections in use "
+            f"(up to {totals['max']}), {totals['waiting']} requests waiting"
+        )
@@ -0,0 +1,37 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from store.exports import CHUNK_SIZE, FORMATS, export_orders, filter_orders
+from store.models import Order
+from store.replicas import replica_reads
+
+
+class Command(BaseCommand):
+    help = ("Stream orders with their items as CSV or NDJSON to a file or stdout, "
+            "optionally filtered by creation date (YYYY-MM-DD, inclusive) and status.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=FORMATS, default='csv')
+        parser.add_argument('--start', type=date.fromisoformat)
+        parser.add_argument('--end', type=date.fromisoformat)
+        parser.add_argument('--status', action='append', choices=[status for status, _ in Order.STATUS_CHOICES],
+                            help="Repeat to export several statuses.")
+        parser.add_argument('--output', '-o', default='-', help="File to write, '-' for stdout.")
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="Rows fetched per database round trip.")
+
+    def handle(self, *args, **options):
+        if options['start'] and options['end'] and options['start'] > options['end']:
+            raise CommandError("--end must not be before --start.")
+        queryset = filter_orders(Order.objects.all(), options['start'], options['end'], options['status'])
+        chunks = export_orders(queryset, options['format'], options['chunk_size'])
+
+        # A long read of the whole order history: keep it off the primary
+        with replica_reads():
+            if options['output'] == '-':
+                for chunk in chunks:
+                    self.stdout.write(chunk, ending='')
+                return
+            with open(options['output'], 'w', encoding='utf-8', newline='') as output:
+                for chunk in chunks:
+                    output.write(chunk)
@@ -0,0 +1,54 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from store.imports import CHUNK_SIZE, ImportFileError, ProductImporter, format_for, read_rows
+from store.serializers import BulkListSerializer
+
+
+class Command(BaseCommand):
+    help = ("Create or update products (matched by name) from a CSV or JSON Lines file with "
+            "name, price, category, description, stock and image columns.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=('csv', 'jsonl'), help="Defaults to the file extension.")
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="Rows validated and written together.")
+        parser.add_argument('--images', metavar='DIR', help="Directory holding the files named in the image column.")
+        parser.add_argument('--workers', type=int, default=4, help="Images stored and resized in parallel.")
+        parser.add_argument('--no-variants', action='store_true',
+                            help="Skip encoding image variants now; they are built on first view instead.")
+        parser.add_argument('--no-create-categories', action='store_true',
+                            help="Reject rows whose category does not exist instead of creating it.")
+
+    def handle(self, *args, **options):
+        if not 0 < options['chunk_size'] <= BulkListSerializer.max_rows:
+            raise CommandError(f"--chunk-size must be between 1 and {BulkListSerializer.max_rows}.")
+        start = time.perf_counter()
+
+        def progress(totals):
+            elapsed = time.perf_counter() - start
+            self.stdout.write(
+                f"{totals['rows']:>10,} rows  {totals['created']:,} created  {totals['updated']:,} updated  "
+                f"{totals['failed']:,} failed  ({totals['rows'] / elapsed:,.0f} rows/s)"
+            )
+
+        importer = ProductImporter(
+            chunk_size=options['chunk_size'], create_categories=not options['no_create_categories'],
+            image_dir=options['images'], build_variants=not options['no_variants'],
+            workers=options['workers'], progress=progress if options['verbosity'] else None,
+        )
+        try:
+            with open(options['path'], encoding='utf-8-sig', newline='') as fileobj:
+                totals = importer.run(read_rows(fileobj, options['format'] or format_for(options['path'])))
+        except (OSError, ImportFileError) as exc:
+            raise CommandError(exc)
+
+        for error in totals['errors']:
+            self.stderr.write(f"row {error['row']}: {error['errors']}")
+        if totals['failed'] > len(totals['errors']):
+            self.stderr.write(f"... and {totals['failed'] - len(totals['errors'])} more failed rows")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {totals['created'] + totals['updated']:,} of {totals['rows']:,} rows "
+            f"({totals['created']:,} created, {totals['updated']:,} updated) in {time.perf_counter() - start:.1f}s."
+        ))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from store.recommendations import rebuild_recommendations
+
+
+class Command(BaseCommand):
+    help = ("Recompute \"frequently bought together\" recommendations from every order, e.g. after bulk imports. "
+            "New orders are added as they are placed.")
+
+    def handle(self, *args, **options):
+        pairs, recommendations = rebuild_recommendations()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {pairs} product pairs and {recommendations} recommendations."))
@@ -0,0 +1,17 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from store.reports import rebuild_sales_rollups
+
+
+class Command(BaseCommand):
+    help = "Recompute DailySalesRollup rows from orders, optionally for a date range (YYYY-MM-DD, inclusive)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=date.fromisoformat)
+        parser.add_argument('--end', type=date.fromisoformat)
+
+    def handle(self, *args, **options):
+        count = rebuild_sales_rollups(options['start'], options['end'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} rollup rows."))
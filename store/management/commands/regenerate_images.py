@@ -0,0 +1,35 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+
+from store.images import build_variants
+from store.models import Product
+
+
+class Command(BaseCommand):
+    help = "Build (or with --force rebuild) resized AVIF/WebP/JPEG variants for every product image."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help="Re-encode variants that already exist.")
+        parser.add_argument('--workers', type=int, default=4, help="Images processed in parallel.")
+
+    def handle(self, *args, **options):
+        names = list(
+            Product.objects.exclude(image='').exclude(image=None)
+            .order_by().values_list('image', flat=True).distinct()
+        )
+        start = time.perf_counter()
+        failed = 0
+        # Pillow releases the GIL while resizing and encoding
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            futures = {pool.submit(build_variants, name, force=options['force']): name for name in names}
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as exc:
+                    failed += 1
+                    self.stderr.write(f"{futures[future]}: {exc}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed {len(names) - failed} of {len(names)} images in {time.perf_counter() - start:.1f}s."
+        ))
@@ -0,0 +1,57 @@
+import signal
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from store import jobs
+
+
+class Command(BaseCommand):
+    help = ("Run queued background jobs (see store/jobs.py) in worker threads until stopped with Ctrl+C or "
+            "SIGTERM, which let running jobs finish. Run as many of these processes as needed.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=settings.STORE_JOB_CONCURRENCY,
+                            help="Worker threads (default: STORE_JOB_CONCURRENCY).")
+        parser.add_argument('--poll', type=float, default=settings.STORE_JOB_POLL_SECONDS,
+                            help="Seconds an idle thread waits before looking for due jobs again.")
+        parser.add_argument('--burst', action='store_true', help="Exit once no job is due.")
+
+    def handle(self, *args, **options):
+        stop = threading.Event()
+        if threading.current_thread() is threading.main_thread():
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                signal.signal(signum, lambda *_: stop.set())
+
+        requeued = jobs.requeue_stale()
+        if requeued:
+            self.stdout.write(f"Requeued {requeued} stale job(s)")
+        if not options['burst']:
+            self.stdout.write(f"Worker started with {options['concurrency']} thread(s); Ctrl+C to stop")
+
+        results = []
+
+        def worker():
+            try:
+                results.append(jobs.work(stop, options['burst'], options['poll']))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(options['concurrency'])]
+        for thread in threads:
+            thread.start()
+        last_sweep = time.monotonic()
+        while any(thread.is_alive() for thread in threads):
+            stop.wait(1)
+            if time.monotonic() - last_sweep >= settings.STORE_JOB_TIMEOUT / 2:
+                jobs.requeue_stale()
+                last_sweep = time.monotonic()
+        for thread in threads:
+            thread.join()
+
+        succeeded = sum(done for done, _ in results)
+        failed = sum(failed for _, failed in results)
+        self.stdout.write(f"{succeeded} job(s) done, {failed} failed")
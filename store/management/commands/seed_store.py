@@ -0,0 +1,64 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from store.bench import seed_catalog, seed_customers
+from store.catalog import bump_catalog_version
+from store.loadtest import PASSWORD, STAFF
+from store.models import Category, Order
+from store.recommendations import rebuild_recommendations
+from store.reports import rebuild_sales_rollups
+
+
+class Command(BaseCommand):
+    help = ("Fill the database with a deterministic store for load tests: Bench categories and products, "
+            f"bench_customer_N users (password '{PASSWORD}') with orders, carts and wishlists, and a "
+            f"{STAFF} staff user. Orders are spread over the last --days days.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=10_000)
+        parser.add_argument('--categories', type=int, default=10)
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--orders', type=int, default=5000)
+        parser.add_argument('--days', type=int, default=90)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--reset', action='store_true', help="Delete previously seeded data first.")
+
+    def _reset(self):
+        users = User.objects.filter(username__startswith='bench_')
+        Order.objects.filter(user__in=users).delete()
+        users.delete()
+        Category.objects.filter(name__startswith='Bench Category ').delete()  # cascades to products
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 and options['orders']:
+            raise CommandError("--orders needs at least one user.")
+        with transaction.atomic():
+            if options['reset']:
+                self._reset()
+            elif User.objects.filter(username__startswith='bench_').exists():
+                raise CommandError("Seeded data already exists; pass --reset to replace it.")
+
+            seed_catalog(options['products'], categories=options['categories'], seed=options['seed'])
+            seed_customers(options['users'], orders=options['orders'], seed=options['seed'], password=PASSWORD)
+            User.objects.create_user(username=STAFF, password=PASSWORD, is_staff=True)
+
+            # bulk_create stamps every order "now"; spread them over the last few days
+            order_ids = list(Order.objects.filter(user__username__startswith='bench_').order_by('id').values_list('id', flat=True))
+            now, days = timezone.now(), max(options['days'], 1)
+            for day in range(days):
+                ids = order_ids[day::days]
+                for start in range(0, len(ids), 5000):
+                    Order.objects.filter(id__in=ids[start:start + 5000]).update(created_at=now - timedelta(days=day))
+
+            # bulk writes skip the signals that maintain these
+            rebuild_sales_rollups()
+            rebuild_recommendations()
+            bump_catalog_version()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {options['products']:,} products, {options['users']:,} users and {options['orders']:,} orders."
+        ))
@@ -0,0 +1,85 @@
+import re
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Sum
+from django.utils import timezone
+
+from store.bench import rolled_back, seed_catalog, seed_customers
+from store.models import CartItem, DailySalesRollup, Order, Product, WishlistItem
+
+# "Seq Scan on store_product" (PostgreSQL), "SCAN store_product" (SQLite).
+# Full walks of an index ("SCAN t USING INDEX i") are not table scans.
+SCAN_PATTERNS = [
+    re.compile(r'Seq Scan on (\w+)'),
+    re.compile(r'\bSCAN (\w+)(?!.*\bUSING\b)'),
+]
+
+
+def main_queries():
+    """(label, queryset) pairs mirroring the hot queries of store.views and
+    store.api_views, with parameters taken from the seeded data."""
+    product = Product.objects.order_by('id')[Product.objects.count() // 2]
+    customer = Order.objects.exclude(user=None).order_by('id').first().user
+    since = timezone.localdate() - timedelta(days=30)
+    return [
+        ('storefront: category page',
+         Product.objects.filter(category_id=product.category_id).order_by('id')[:13]),
+        ('storefront: category + price range',
+         Product.objects.filter(category_id=product.category_id, price__gte=50, price__lte=60).order_by('id')[:13]),
+        ('storefront: related products',
+         Product.objects.filter(category_id=product.category_id).order_by('id').values_list('id', flat=True)[:5]),
+        ('api: products by price',
+         Product.objects.filter(price__gt=product.price).order_by('price', 'id')[:11]),
+        ('product detail', Product.objects.select_related('category').filter(pk=product.pk)),
+        ('wishlist: navbar count rows', WishlistItem.objects.filter(user=customer).values('id')),
+        ('wishlist: toggle lookup', WishlistItem.objects.filter(user=customer, product=product)),
+        ('cart: lines',
+         CartItem.objects.filter(user=customer).select_related('product__category').order_by('created_at', 'id')),
+        ('cart: upsert lookup', CartItem.objects.filter(user=customer, product=product)),
+        ('api: my orders, newest first', Order.objects.filter(user=customer).order_by('-created_at', '-id')[:10]),
+        ('dashboard: recent orders', Order.objects.order_by('-created_at')[:5]),
+        ('orders by status', Order.objects.filter(status='Pending').values('id')[:50]),
+        ('dashboard: top products',
+         DailySalesRollup.objects.filter(product__isnull=False, date__gte=since)
+         .values('product_id').annotate(revenue=Sum('revenue')).order_by('-revenue')[:5]),
+    ]
+
+
+def sequential_scans(plan):
+    return sorted({table for pattern in SCAN_PATTERNS for table in pattern.findall(plan)
+                   if table.startswith('store_') or table.startswith('auth_')})
+
+
+class Command(BaseCommand):
+    help = "EXPLAIN the main storefront/API queries against seeded data (rolled back) and flag table scans."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=20000)
+        parser.add_argument('--customers', type=int, default=500)
+        parser.add_argument('--verbose-plans', action='store_true', help="Print every plan, not only flagged ones.")
+        parser.add_argument('--fail-on-scan', action='store_true', help="Exit with an error if any scan is found.")
+
+    def handle(self, *args, **options):
+        flagged = []
+        with rolled_back():
+            seed_catalog(options['products'])
+            seed_customers(options['customers'])
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')  # planner statistics for the seeded rows
+
+            queries = main_queries()
+            for label, queryset in queries:
+                plan = queryset.explain()
+                scans = sequential_scans(plan)
+                status = self.style.ERROR(f"SCAN {', '.join(scans)}") if scans else self.style.SUCCESS('ok')
+                self.stdout.write(f"{label:<40} {status}")
+                if scans or options['verbose_plans']:
+                    self.stdout.write('    ' + plan.replace('\n', '\n    '))
+                if scans:
+                    flagged.append(label)
+
+        self.stdout.write(f"\n{len(flagged)} of {len(queries)} queries flagged")
+        if flagged and options['fail_on_scan']:
+            raise CommandError(f"Table scans in: {', '.join(flagged)}")
@@ -0,0 +1,125 @@
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import require_safe
+
+from .storage import is_immutable
+
+# ============================
+# 📦 MEDIA SERVING
+# ============================
+
+# Serves MEDIA_ROOT without DEBUG. Content-hashed names (see store.storage)
+# get a year-long immutable Cache-Control; other files are revalidated with
+# their ETag. Full responses go out as FileResponse, which WSGI servers hand
+# to sendfile(); with STORE_MEDIA_ACCEL_REDIRECT set, nginx serves the bytes
+# instead. Single byte ranges are answered with 206.
+
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def _etag(name, stat):
+    if is_immutable(name):
+        return quote_etag(os.path.splitext(os.path.basename(name))[0].rsplit('.', 1)[-1])
+    return quote_etag(f'{stat.st_mtime_ns:x}-{stat.st_size:x}')
+
+
+def _cache_headers(response, name, etag, stat):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Accept-Ranges'] = 'bytes'
+    if is_immutable(name):
+        patch_cache_control(response, public=True, max_age=IMMUTABLE_MAX_AGE, immutable=True)
+    else:
+        patch_cache_control(response, public=True, max_age=settings.STORE_MEDIA_CACHE_SECONDS)
+    return response
+
+
+def _byte_range(request, etag, size):
+    """(start, end) inclusive for a satisfiable single range, None to send the
+    whole file, or False if the range cannot be satisfied."""
+    header = request.headers.get('Range', '')
+    match = RANGE_RE.match(header.replace(' ', ''))
+    if not match or match.groups() == ('', ''):
+        return None  # absent, multi-range or malformed: full response
+    if_range = request.headers.get('If-Range')
+    if if_range and if_range != etag:
+        return None
+    first, last = match.groups()
+    if first and last and int(last) < int(first):
+        return None  # invalid range (RFC 9110 14.1.1): ignore it
+    if first:
+        start, end = int(first), min(int(last), size - 1) if last else size - 1
+    else:
+        start, end = max(size - int(last), 0), size - 1
+    if start >= size:
+        return False
+    return start, end
+
+
+class _RangeFile:
+    """Read-only view of bytes [start, end] of an open file."""
+
+    def __init__(self, fileobj, start, end):
+        fileobj.seek(start)
+        self.fileobj = fileobj
+        self.remaining = end - start + 1
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        size = self.remaining if size is None or size < 0 else min(size, self.remaining)
+        data = self.fileobj.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.fileobj.close()
+
+
+@require_safe
+def serve_media(request, path):
+    try:
+        fullpath = safe_join(settings.MEDIA_ROOT, path)
+        stat = os.stat(fullpath)
+    except (OSError, ValueError, SuspiciousFileOperation):
+        raise Http404("Media file not found.")
+    if not os.path.isfile(fullpath):
+        raise Http404("Media file not found.")
+
+    etag = _etag(path, stat)
+    not_modified = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if not_modified is not None:
+        return _cache_headers(not_modified, path, etag, stat)
+
+    content_type = mimetypes.guess_type(fullpath)[0] or 'application/octet-stream'
+    accel_prefix = settings.STORE_MEDIA_ACCEL_REDIRECT
+    if accel_prefix:
+        # nginx "internal" location; it handles ranges and sendfile itself
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = accel_prefix.rstrip('/') + '/' + path.lstrip('/')
+        return _cache_headers(response, path, etag, stat)
+
+    byte_range = _byte_range(request, etag, stat.st_size)
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{stat.st_size}'
+        return _cache_headers(response, path, etag, stat)
+
+    fileobj = open(fullpath, 'rb')
+    if byte_range is None:
+        response = FileResponse(fileobj, content_type=content_type)
+    else:
+        start, end = byte_range
+        response = FileResponse(_RangeFile(fileobj, start, end), content_type=content_type, status=206)
+        response['Content-Length'] = str(end - start + 1)
+        response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+    return _cache_headers(response, path, etag, stat)
@@ -0,0 +1,139 @@
+import random
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from . import perf, replicas
+
+
+class PerfMiddleware:
+    """Measures a sample (settings.STORE_PERF_SAMPLE_RATE) of requests and
+    reports them as a Server-Timing header, a JSON log line on the
+    store.perf logger and the /dashboard/perf/ aggregates. Goes first in
+    MIDDLEWARE so the timings cover the whole stack. Runs natively under
+    both WSGI and ASGI."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        perf.instrument_templates()
+
+    def _sampled(self):
+        rate = settings.STORE_PERF_SAMPLE_RATE
+        return rate > 0 and (rate >= 1 or random.random() < rate)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self._sampled():
+            return self.get_response(request)
+
+        stats = perf.RequestStats()
+        token = perf.current.set(stats)
+        try:
+            perf.track_queries()
+            response = self.get_response(request)
+        finally:
+            perf.current.reset(token)
+        self._finish(request, response, stats)
+        return response
+
+    async def __acall__(self, request):
+        if not self._sampled():
+            return await self.get_response(request)
+
+        stats = perf.RequestStats()
+        token = perf.current.set(stats)
+        try:
+            # Async ORM calls run in the request's sync thread
+            await sync_to_async(perf.track_queries)()
+            response = await self.get_response(request)
+        finally:
+            perf.current.reset(token)
+        # Flushing may talk to the cache server
+        await sync_to_async(self._finish)(request, response, stats)
+        return response
+
+    def _finish(self, request, response, stats):
+        stats.finish()
+        response['Server-Timing'] = stats.server_timing()
+        perf.record(request, response, stats)
+
+
+class ReplicaPinMiddleware:
+    """Keeps read-replica routing state for each request and pins a client
+    that wrote to the primary for settings.REPLICA_PIN_SECONDS (see
+    store.replicas). Goes before SessionMiddleware so session saves count as
+    writes. Does nothing without replicas."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not settings.STORE_READ_REPLICAS:
+            return self.get_response(request)
+
+        state = replicas.ReplicaState(pinned=replicas.PIN_COOKIE in request.COOKIES)
+        token = replicas.current.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            replicas.current.reset(token)
+        replicas.pin_response(response, state)
+        return response
+
+    async def __acall__(self, request):
+        if not settings.STORE_READ_REPLICAS:
+            return await self.get_response(request)
+
+        state = replicas.ReplicaState(pinned=replicas.PIN_COOKIE in request.COOKIES)
+        token = replicas.current.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            replicas.current.reset(token)
+        replicas.pin_response(response, state)
+        return response
+
+
+class AsyncWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    """WhiteNoise that can also run in an async middleware chain. The stock
+    middleware is sync-only, which under ASGI would push every request
+    (not just static files) through a thread."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
@@ -0,0 +1,33 @@
+from django.db import migrations
+
+# Must match the expression built by store.search.PostgresSearchBackend so the
+# planner can use the index for `@@ to_tsquery(...)` lookups.
+SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('english'::regconfig, COALESCE(name, '')), 'A') || "
+    "setweight(to_tsvector('english'::regconfig, COALESCE(description, '')), 'B')"
+)
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS store_product_search_gin ON store_product USING gin (({SEARCH_VECTOR_SQL}))'
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS store_product_search_gin')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0004_order_orderitem'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
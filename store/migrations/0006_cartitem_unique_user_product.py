@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-18 06:19
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def merge_duplicate_cart_items(apps, schema_editor):
+    CartItem = apps.get_model('store', 'CartItem')
+    duplicates = (
+        CartItem.objects.values('user_id', 'product_id')
+        .annotate(rows=Count('id'), quantity=Sum('quantity'))
+        .filter(rows__gt=1)
+    )
+    for dup in duplicates:
+        items = CartItem.objects.filter(user_id=dup['user_id'], product_id=dup['product_id']).order_by('id')
+        keep = items.first()
+        items.exclude(pk=keep.pk).delete()
+        keep.quantity = dup['quantity']
+        keep.save(update_fields=['quantity'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0005_product_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_cart_items, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='cartitem',
+            constraint=models.UniqueConstraint(fields=('user', 'product'), name='unique_cart_item'),
+        ),
+    ]
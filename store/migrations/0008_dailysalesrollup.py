@@ -0,0 +1,60 @@
+# Generated by Django 5.2.7 on 2026-10-18 06:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, F, Sum
+from django.db.models.functions import TruncDate
+
+REVENUE_STATUSES = ('Paid', 'Shipped', 'Completed')
+
+
+def backfill_rollups(apps, schema_editor):
+    Order = apps.get_model('store', 'Order')
+    OrderItem = apps.get_model('store', 'OrderItem')
+    DailySalesRollup = apps.get_model('store', 'DailySalesRollup')
+
+    orders = Order.objects.filter(status__in=REVENUE_STATUSES)
+    items = OrderItem.objects.filter(order__in=orders).annotate(day=TruncDate('order__created_at'))
+    line_revenue = Sum(F('price') * F('quantity'), output_field=DecimalField(max_digits=14, decimal_places=2))
+    units = dict(items.values_list('day').annotate(Sum('quantity')).order_by())
+
+    rows = [
+        DailySalesRollup(date=day, revenue=revenue, orders=count, units=units.get(day, 0))
+        for day, revenue, count in orders.annotate(day=TruncDate('created_at'))
+        .values_list('day').annotate(Sum('total_amount'), Count('id')).order_by()
+    ]
+    for field in ('product__category', 'product'):
+        for day, key, revenue, count, quantity in (
+            items.values_list('day', field)
+            .annotate(revenue=line_revenue, orders=Count('order', distinct=True), units=Sum('quantity')).order_by()
+        ):
+            row = DailySalesRollup(date=day, revenue=revenue, orders=count, units=quantity)
+            setattr(row, 'category_id' if field == 'product__category' else 'product_id', key)
+            rows.append(row)
+    DailySalesRollup.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0007_catalogversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('orders', models.PositiveIntegerField(default=0)),
+                ('units', models.PositiveIntegerField(default=0)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='store.category')),
+                ('product', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='store.product')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(condition=models.Q(('category__isnull', True), ('product__isnull', True)), fields=('date',), name='unique_daily_sales_total'), models.UniqueConstraint(condition=models.Q(('category__isnull', False)), fields=('date', 'category'), name='unique_daily_sales_category'), models.UniqueConstraint(condition=models.Q(('product__isnull', False)), fields=('date', 'product'), name='unique_daily_sales_product')],
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
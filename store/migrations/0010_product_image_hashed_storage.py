@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-18 06:41
+
+import store.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0009_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='product',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=store.storage.hashed_media_storage, upload_to='products/'),
+        ),
+    ]
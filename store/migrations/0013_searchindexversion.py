@@ -0,0 +1,25 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:15
+
+from django.db import migrations, models
+
+
+def create_search_index_version(apps, schema_editor):
+    apps.get_model('store', 'SearchIndexVersion').objects.get_or_create(pk=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0012_product_recommendations'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchIndexVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveBigIntegerField(default=1)),
+            ],
+        ),
+        migrations.RunPython(create_search_index_version, migrations.RunPython.noop),
+    ]
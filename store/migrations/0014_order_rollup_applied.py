@@ -0,0 +1,26 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:18
+
+from django.db import migrations, models
+
+
+def mark_counted_orders(apps, schema_editor):
+    # Rollups were maintained for these orders until now
+    apps.get_model('store', 'Order').objects.filter(
+        status__in=('Paid', 'Shipped', 'Completed'),
+    ).update(rollup_applied=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0013_searchindexversion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='rollup_applied',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.RunPython(mark_counted_orders, migrations.RunPython.noop),
+    ]
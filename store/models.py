@@ -1,6 +1,8 @@
 from django.db import models
 from django.contrib.auth.models import User
 
+from .storage import hashed_media_storage
+
 class Category(models.Model):
     name = models.CharField(max_length=100, unique=True)
     description = models.TextField(blank=True)
@@ -14,9 +16,17 @@ class Product(models.Model):
     description = models.TextField(blank=True)
     price = models.DecimalField(max_digits=10, decimal_places=2, default=0.0)
     category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='products')
-    image = models.ImageField(upload_to='products/', blank=True, null=True)
+    image = models.ImageField(upload_to='products/', storage=hashed_media_storage, blank=True, null=True)
     stock = models.PositiveIntegerField(default=0)
 
+    class Meta:
+        indexes = [
+            # Storefront category + price range filters
+            models.Index(fields=['category', 'price'], name='product_category_price_idx'),
+            # Price-ordered keyset pages (?ordering=price / -price)
+            models.Index(fields=['price', 'id'], name='product_price_id_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -28,6 +38,11 @@ class CartItem(models.Model):
     quantity = models.PositiveIntegerField(default=1)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'product'], name='unique_cart_item'),
+        ]
+
     def total_price(self):
         return self.product.price * self.quantity
 
@@ -39,6 +54,11 @@ class WishlistItem(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     added_at = models.DateTimeField(auto_now_add=True)  # ← this line fixes it
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'product'], name='wishlist_user_product_idx'),
+        ]
+
     def __str__(self):
         return f"{self.user.username} - {self.product.name}"
 
@@ -60,9 +80,30 @@ class Order(models.Model):
     total_amount = models.DecimalField(max_digits=10, decimal_places=2)
     payment_method = models.CharField(max_length=50)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Pending')
+    # Whether DailySalesRollup currently counts this order (store.reports)
+    rollup_applied = models.BooleanField(default=False, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # A customer's orders, newest first
+            models.Index(fields=['user', '-created_at'], name='order_user_created_idx'),
+            models.Index(fields=['status'], name='order_status_idx'),
+            # Dashboard "recent orders"
+            models.Index(fields=['-created_at'], name='order_created_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        # rollup_applied is only set by store.reports with update(); saving a
+        # copy loaded before that must not write the stale value back
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'rollup_applied'
+            ]
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"Order #{self.id} - {self.first_name}"
 
@@ -76,4 +117,121 @@ class OrderItem(models.Model):
         return self.price * self.quantity
 
     def __str__(self):
-        return f"{self.product.name} ({self.quantity})"
\ No newline at end of file
+        return f"{self.product.name} ({self.quantity})"
+
+class CatalogVersion(models.Model):
+    """Single row bumped on every Product/Category change. Drives ETags,
+    Last-Modified and cache keys for catalog pages and API responses."""
+    version = models.PositiveBigIntegerField(default=1)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Catalog v{self.version}"
+
+
+class SearchIndexVersion(models.Model):
+    """Single row bumped whenever products are saved or deleted, i.e. when
+    their indexed name/description may have changed. In-process search
+    indexes rebuild when it moves past the version they were built at."""
+    version = models.PositiveBigIntegerField(default=1)
+
+    def __str__(self):
+        return f"Search index v{self.version}"
+
+
+class DailySalesRollup(models.Model):
+    """Sales of counted orders per day. A row with neither category nor
+    product holds the day's totals; the others break the day down by
+    category or by product. Maintained incrementally by store.reports."""
+    date = models.DateField()
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, null=True, blank=True)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, null=True, blank=True)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    orders = models.PositiveIntegerField(default=0)
+    units = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['date'], condition=models.Q(category__isnull=True, product__isnull=True),
+                name='unique_daily_sales_total',
+            ),
+            models.UniqueConstraint(
+                fields=['date', 'category'], condition=models.Q(category__isnull=False),
+                name='unique_daily_sales_category',
+            ),
+            models.UniqueConstraint(
+                fields=['date', 'product'], condition=models.Q(product__isnull=False),
+                name='unique_daily_sales_product',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.category or self.product or 'total'}: {self.revenue}"
+
+
+class Job(models.Model):
+    """A queued call of `name` (a dotted path) with JSON `kwargs`, run by
+    `manage.py run_store_worker`. Finished jobs are deleted; failed ones
+    stay with their last error. See store.jobs."""
+    QUEUED, RUNNING, FAILED = 'queued', 'running', 'failed'
+    STATUS_CHOICES = [(QUEUED, 'Queued'), (RUNNING, 'Running'), (FAILED, 'Failed')]
+
+    name = models.CharField(max_length=200)
+    kwargs = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    run_at = models.DateTimeField()
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Workers claim the oldest due job of a status
+            models.Index(fields=['status', 'run_at'], name='job_status_run_at_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.status})"
+
+
+class ProductPair(models.Model):
+    """How many orders contained both `product` and `other`: one cell of the
+    sparse co-occurrence matrix, stored in both directions. Maintained by
+    store.recommendations."""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    other = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    orders = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'other'], name='unique_product_pair'),
+        ]
+        indexes = [
+            # A product's strongest pairs, for its top-K
+            models.Index(fields=['product', '-orders'], name='product_pair_orders_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} + {self.other_id}: {self.orders}"
+
+
+class Recommendation(models.Model):
+    """One of a product's top-K "frequently bought together" products, rank
+    1 first, precomputed from ProductPair."""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='recommendations')
+    recommended = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    rank = models.PositiveSmallIntegerField()
+    orders = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            # Also the index a product page reads its recommendations with
+            models.UniqueConstraint(fields=['product', 'rank'], name='unique_recommendation_rank'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} #{self.rank}: {self.recommended_id}"
@@ -0,0 +1,97 @@
+from decimal import Decimal
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.core.mail import send_mail
+from django.db import transaction
+from django.db.models import Case, F, Q, Value, When
+from django.template.loader import render_to_string
+
+from . import jobs, recommendations
+from .catalog import bump_catalog_version
+from .models import Order, OrderItem, Product
+
+# ============================
+# 📦 ORDER PLACEMENT
+# ============================
+
+SHIPPING_FEE = Decimal('2')
+
+# Payment methods treated as paid immediately (simulated gateways)
+PAID_METHODS = ('aba_payway', 'khqr')
+
+
+class OutOfStock(Exception):
+    def __init__(self, products):
+        self.products = products
+        names = ', '.join(product.name for product in products)
+        super().__init__(f"Not enough stock for: {names}")
+
+
+def _reserve_stock(quantities):
+    """Decrement stock for {product_id: qty} with one conditional UPDATE.
+
+    Each row is only touched if it still has enough stock, so concurrent
+    buyers can never oversell; if any row is short the caller's transaction
+    must be rolled back."""
+    enough_stock = reduce(or_, (Q(pk=pk, stock__gte=qty) for pk, qty in quantities.items()))
+    decrement = Case(*[When(pk=pk, then=Value(qty)) for pk, qty in quantities.items()])
+    updated = Product.objects.filter(enough_stock).update(stock=F('stock') - decrement)
+    if updated != len(quantities):
+        products = list(Product.objects.filter(pk__in=quantities).only('name', 'stock'))
+        short = [product for product in products if product.stock < quantities[product.pk]]
+        # Products deleted since they were put in the cart
+        missing = sorted(quantities.keys() - {product.pk for product in products})
+        short += [Product(pk=pk, name='unavailable product') for pk in missing]
+        raise OutOfStock(short)
+
+
+def place_order(user, lines, payment_method, **details):
+    """Create an Order with its items and reserve stock, all in one transaction.
+
+    `lines` is what store.cart.build_cart returns. Extra keyword arguments
+    (first_name, email, address, city, phone) are stored on the order.
+    Raises OutOfStock, leaving the database untouched, if any product is short.
+    """
+    quantities = {}
+    for line in lines:
+        pk = line['product'].pk
+        quantities[pk] = quantities.get(pk, 0) + line['quantity']
+    total = sum((line['product'].price * line['quantity'] for line in lines), Decimal('0'))
+
+    with transaction.atomic():
+        if quantities:
+            _reserve_stock(quantities)
+            # Stock levels are part of the catalog, but only a sell-out changes
+            # the storefront; other counts may trail by the bump interval
+            sold_out = Product.objects.filter(pk__in=quantities, stock=0).exists()
+            bump_catalog_version(0 if sold_out else settings.STORE_CATALOG_MIN_BUMP_SECONDS)
+        order = Order.objects.create(
+            user=user,
+            total_amount=total + SHIPPING_FEE,
+            payment_method=payment_method,
+            status='Paid' if payment_method in PAID_METHODS else 'Pending',
+            **details
+        )
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product=line['product'], quantity=line['quantity'], price=line['product'].price)
+            for line in lines
+        ])
+        jobs.enqueue(send_order_confirmation, order_id=order.pk)
+        if len(quantities) > 1:  # one product alone pairs with nothing
+            jobs.enqueue(recommendations.add_order, order_id=order.pk)
+    return order
+
+
+def send_order_confirmation(order_id):
+    """Background job: email the customer their order summary."""
+    order = Order.objects.filter(pk=order_id).prefetch_related('items__product').first()
+    if order is None or not order.email:
+        return
+    send_mail(
+        f"Your order #{order.pk} is confirmed",
+        render_to_string('store/emails/order_confirmation.txt', {'order': order, 'shipping_fee': SHIPPING_FEE}),
+        None,
+        [order.email],
+    )
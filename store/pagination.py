@@ -0,0 +1,210 @@
+import base64
+import hashlib
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db.models import Q, QuerySet
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+# ============================
+# 📄 KEYSET (CURSOR) PAGINATION
+# ============================
+
+# Pages are located with WHERE (price, id) > (last_price, last_id) instead of
+# OFFSET, so page 1000 costs the same as page 1. Cursors are opaque base64
+# tokens holding the ordering values of the row at the page boundary.
+
+COUNT_CACHE_TIMEOUT = 60
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _jsonable(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def encode_cursor(values, reverse=False):
+    payload = json.dumps({'v': [_jsonable(v) for v in values], 'r': reverse}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        values, reverse = payload['v'], payload.get('r', False)
+    except (ValueError, KeyError, TypeError):
+        raise InvalidCursor(token)
+    if not isinstance(values, list) or not isinstance(reverse, bool):
+        raise InvalidCursor(token)
+    return values, reverse
+
+
+def _keyset_filter(ordering, values, reverse):
+    """WHERE clause selecting the rows strictly after `values` in `ordering`
+    (or strictly before them when paging backwards)."""
+    condition = Q()
+    equal = Q()
+    for field, value in zip(ordering, values):
+        descending = field.startswith('-')
+        name = field.lstrip('-')
+        lookup = 'lt' if descending != reverse else 'gt'
+        condition |= equal & Q(**{f'{name}__{lookup}': value})
+        equal &= Q(**{name: value})
+    return condition
+
+
+def _reversed(ordering):
+    return [field[1:] if field.startswith('-') else f'-{field}' for field in ordering]
+
+
+def _values(obj, ordering):
+    return [getattr(obj, field.lstrip('-')) for field in ordering]
+
+
+def _keyset_queryset(queryset, ordering, cursor):
+    reverse = False
+    if cursor:
+        values, reverse = decode_cursor(cursor)
+        if len(values) != len(ordering):
+            raise InvalidCursor(cursor)
+        # Cursors come from clients: coerce each value to its field's type
+        try:
+            values = [
+                queryset.model._meta.get_field(field.lstrip('-')).to_python(value)
+                for field, value in zip(ordering, values)
+            ]
+            queryset = queryset.filter(_keyset_filter(ordering, values, reverse))
+        except (TypeError, ValueError, ValidationError):
+            raise InvalidCursor(cursor)
+    return queryset.order_by(*(_reversed(ordering) if reverse else ordering)), reverse
+
+
+def _keyset_result(items, ordering, cursor, reverse, page_size):
+    has_more = len(items) > page_size
+    items = items[:page_size]
+    if reverse:
+        items.reverse()
+    if not items:
+        return items, None, None
+
+    has_next = has_more if not reverse else True
+    has_previous = bool(cursor) if not reverse else has_more
+    next_cursor = encode_cursor(_values(items[-1], ordering)) if has_next else None
+    previous_cursor = encode_cursor(_values(items[0], ordering), reverse=True) if has_previous else None
+    return items, next_cursor, previous_cursor
+
+
+def keyset_page(queryset, ordering, cursor, page_size):
+    """Return (items, next_cursor, previous_cursor) for one keyset page.
+
+    `ordering` must end in a unique field (normally 'id') so every row has a
+    distinct position. Raises InvalidCursor for malformed tokens.
+    """
+    queryset, reverse = _keyset_queryset(queryset, ordering, cursor)
+    items = list(queryset[:page_size + 1])
+    return _keyset_result(items, ordering, cursor, reverse, page_size)
+
+
+async def akeyset_page(queryset, ordering, cursor, page_size):
+    """Async keyset_page()."""
+    queryset, reverse = _keyset_queryset(queryset, ordering, cursor)
+    items = [item async for item in queryset[:page_size + 1]]
+    return _keyset_result(items, ordering, cursor, reverse, page_size)
+
+
+def cached_count(queryset, timeout=COUNT_CACHE_TIMEOUT):
+    """COUNT(*) for `queryset`, cached briefly so deep paging does not repeat it."""
+    sql, params = queryset.query.sql_with_params()
+    key = 'store:count:' + hashlib.md5(f'{sql}{params}'.encode()).hexdigest()
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, timeout)
+    return count
+
+
+class KeysetPagination(BasePagination):
+    """DRF keyset pagination. Views set `keyset_orderings` (name -> field
+    tuple); clients pick one with ?ordering=<name>."""
+
+    cursor_query_param = 'cursor'
+    ordering_query_param = 'ordering'
+    page_size = 10
+    default_orderings = {'id': ('id',)}
+
+    def paginate_queryset(self, queryset, request, view=None):
+        orderings = getattr(view, 'keyset_orderings', self.default_orderings)
+        name = request.query_params.get(self.ordering_query_param) or next(iter(orderings))
+        if name not in orderings:
+            name = next(iter(orderings))
+        self.request = request
+        self.count = cached_count(queryset)
+        try:
+            items, self.next_cursor, self.previous_cursor = keyset_page(
+                queryset, orderings[name], request.query_params.get(self.cursor_query_param), self.page_size
+            )
+        except InvalidCursor:
+            raise NotFound("Invalid cursor.")
+        return items
+
+    def _link(self, cursor):
+        if cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'count': self.count,
+            'next': self._link(self.next_cursor),
+            'previous': self._link(self.previous_cursor),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return PageNumberPagination().get_paginated_response_schema(schema)
+
+
+class CatalogPagination(PageNumberPagination):
+    """Page numbers by default (backwards compatible); switches to keyset
+    pagination when the client sends ?cursor= or ?paginate=cursor. Search
+    results cut at the backend's limit add "truncated": true."""
+
+    def _use_keyset(self, queryset, request):
+        if not isinstance(queryset, QuerySet) or queryset.ordered:
+            return False  # e.g. relevance-ranked search results
+        return 'cursor' in request.query_params or request.query_params.get('paginate') == 'cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self._use_keyset(queryset, request):
+            self.keyset = KeysetPagination()
+            self.keyset.page_size = self.get_page_size(request)
+            return self.keyset.paginate_queryset(queryset, request, view)
+        self.keyset = None
+        self.truncated = getattr(queryset, 'truncated', False)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            response = self.keyset.get_paginated_response(data)
+            # Later links carry ?cursor=, so the mode switch is no longer needed
+            for key in ('next', 'previous'):
+                if response.data[key]:
+                    response.data[key] = remove_query_param(response.data[key], 'paginate')
+            return response
+        response = super().get_paginated_response(data)
+        if self.truncated:
+            response.data['truncated'] = True
+        return response
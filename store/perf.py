@@ -0,0 +1,233 @@
+import bisect
+import contextvars
+import json
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+# ============================
+# 📈 REQUEST PERFORMANCE TELEMETRY
+# ============================
+
+# store.middleware.PerfMiddleware fills a RequestStats for each sampled
+# request: wall time, DB time and query count (through an execute_wrapper,
+# so it works with DEBUG off, and found through a context variable, so it
+# follows async views into the threads running their queries), repeated SQL statements (the N+1 signature),
+# template render time and response size. Each process adds them to
+# per-view, per-hour counters and a latency histogram, and every
+# STORE_PERF_FLUSH_SECONDS folds them into the cache with incr(), so all
+# workers feed one set of numbers. summary() turns those into the
+# p50/p95/p99 table of /dashboard/perf/.
+
+logger = logging.getLogger(__name__)
+
+# Histogram bucket upper bounds in ms, growing 25% per bucket (1 ms .. ~56 s)
+BUCKETS = tuple(round(1.25 ** i, 2) for i in range(50))
+TOTALS = ('count', 'wall_us', 'db_us', 'template_us', 'queries', 'duplicates', 'bytes')
+KEY_TTL = 60 * 60 * 26
+MAX_HOURS = 24
+
+current = contextvars.ContextVar('store_perf_stats', default=None)
+
+
+class RequestStats:
+    """Timings of one request. Also the connection execute_wrapper that
+    counts its queries."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.wall = self.db = self.template = 0.0
+        self.queries = self.duplicates = 0
+        self.template_depth = 0
+        self._statements = set()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += time.perf_counter() - start
+            self.queries += 1
+            # Same SQL with different params, e.g. one query per row in a loop
+            if sql in self._statements:
+                self.duplicates += 1
+            else:
+                self._statements.add(sql)
+
+    def finish(self):
+        self.wall = time.perf_counter() - self.start
+
+    def server_timing(self):
+        return (
+            f'total;dur={self.wall * 1000:.1f}, '
+            f'db;dur={self.db * 1000:.1f};desc="{self.queries} queries, {self.duplicates} repeated", '
+            f'tpl;dur={self.template * 1000:.1f}'
+        )
+
+    def as_dict(self):
+        return {
+            'wall_ms': round(self.wall * 1000, 2),
+            'db_ms': round(self.db * 1000, 2),
+            'template_ms': round(self.template * 1000, 2),
+            'queries': self.queries,
+            'duplicates': self.duplicates,
+        }
+
+
+def count_queries(execute, sql, params, many, context):
+    """execute_wrapper handing queries to the RequestStats of the request
+    being measured, if any."""
+    stats = current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    return stats(execute, sql, params, many, context)
+
+
+def track_queries():
+    """Install count_queries on this thread's connections (once each). Async
+    views run their queries in a worker thread, so they call this there."""
+    for connection in connections.all():
+        if count_queries not in connection.execute_wrappers:
+            connection.execute_wrappers.append(count_queries)
+
+
+def instrument_templates():
+    """Time Django template rendering for the request being measured. Wraps
+    the backend Template.render used by render()/render_to_string(); nested
+    renders count once. Includes queries run lazily from templates."""
+    from django.template.backends.django import Template
+
+    if getattr(Template.render, 'store_perf', False):
+        return
+    original = Template.render
+
+    def render(self, context=None, request=None):
+        stats = current.get()
+        if stats is None or stats.template_depth:
+            return original(self, context, request)
+        stats.template_depth += 1
+        start = time.perf_counter()
+        try:
+            return original(self, context, request)
+        finally:
+            stats.template += time.perf_counter() - start
+            stats.template_depth -= 1
+
+    render.store_perf = True
+    Template.render = render
+
+
+def _key(hour, view, metric):
+    return f'perf:{hour}:{view}:{metric}'
+
+
+class Recorder:
+    """Per-process counters flushed to the shared cache."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = defaultdict(Counter)
+        self.last_flush = time.monotonic()
+
+    def add(self, view, stats, size=None):
+        hour = int(time.time() // 3600)
+        with self.lock:
+            counter = self.pending[(hour, view)]
+            counter['count'] += 1
+            counter['wall_us'] += int(stats.wall * 1e6)
+            counter['db_us'] += int(stats.db * 1e6)
+            counter['template_us'] += int(stats.template * 1e6)
+            counter['queries'] += stats.queries
+            counter['duplicates'] += stats.duplicates
+            counter['bytes'] += size or 0
+            counter[f'h{bisect.bisect_left(BUCKETS, stats.wall * 1000)}'] += 1
+        if time.monotonic() - self.last_flush >= settings.STORE_PERF_FLUSH_SECONDS:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            pending, self.pending = self.pending, defaultdict(Counter)
+            self.last_flush = time.monotonic()
+        try:
+            for (hour, view), counter in pending.items():
+                views = cache.get(f'perf:{hour}:views', set())
+                if view not in views:
+                    cache.set(f'perf:{hour}:views', views | {view}, KEY_TTL)
+                for metric, value in counter.items():
+                    key = _key(hour, view, metric)
+                    cache.add(key, 0, KEY_TTL)
+                    try:
+                        cache.incr(key, value)
+                    except ValueError:  # evicted between add() and incr()
+                        cache.set(key, value, KEY_TTL)
+        except Exception:
+            # Telemetry must never break a request (e.g. Redis unreachable)
+            logger.warning("Could not flush request timings", exc_info=True)
+
+
+recorder = Recorder()
+
+
+def record(request, response, stats):
+    """Log and aggregate a finished request; returns the logged record."""
+    match = getattr(request, 'resolver_match', None)
+    view = match.view_name if match else 'unresolved'
+    size = None if response.streaming else len(response.content)
+    entry = {
+        'view': view, 'method': request.method, 'path': request.path,
+        'status': response.status_code, 'bytes': size, **stats.as_dict(),
+    }
+    logger.info(json.dumps(entry, separators=(',', ':')))
+    recorder.add(view, stats, size)
+    return entry
+
+
+def _percentile(histogram, count, fraction):
+    """Upper bound (ms) of the bucket holding the `fraction` quantile, None
+    past the last bucket."""
+    target, seen = fraction * count, 0
+    for index, hits in enumerate(histogram):
+        seen += hits
+        if seen >= target:
+            return BUCKETS[index] if index < len(BUCKETS) else None
+    return None
+
+
+def summary(hours=1):
+    """Per-view rows for the last `hours` hours (this one included), slowest
+    p95 first. Percentiles are histogram bucket bounds, within 25%."""
+    hours = max(1, min(hours, MAX_HOURS))
+    now = int(time.time() // 3600)
+    span = range(now - hours + 1, now + 1)
+    views = set().union(*cache.get_many([f'perf:{hour}:views' for hour in span]).values())
+    metrics = TOTALS + tuple(f'h{i}' for i in range(len(BUCKETS) + 1))
+    values = cache.get_many([_key(hour, view, metric) for hour in span for view in views for metric in metrics])
+
+    rows = []
+    for view in views:
+        totals = {
+            metric: sum(values.get(_key(hour, view, metric), 0) for hour in span) for metric in metrics
+        }
+        count = totals['count']
+        if not count:
+            continue
+        histogram = [totals[f'h{i}'] for i in range(len(BUCKETS) + 1)]
+        rows.append({
+            'view': view,
+            'count': count,
+            'p50': _percentile(histogram, count, 0.50),
+            'p95': _percentile(histogram, count, 0.95),
+            'p99': _percentile(histogram, count, 0.99),
+            'avg_ms': totals['wall_us'] / count / 1000,
+            'db_ms': totals['db_us'] / count / 1000,
+            'template_ms': totals['template_us'] / count / 1000,
+            'queries': totals['queries'] / count,
+            'duplicates': totals['duplicates'] / count,
+            'kib': totals['bytes'] / count / 1024,
+        })
+    return sorted(rows, key=lambda row: (row['p95'] is not None, -(row['p95'] or 0)))
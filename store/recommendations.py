@@ -0,0 +1,135 @@
+from collections import Counter, defaultdict
+from functools import reduce
+from heapq import nsmallest
+from itertools import groupby, islice, permutations
+from operator import itemgetter, or_
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Q, Window
+from django.db.models.functions import RowNumber
+
+from .catalog import bump_catalog_version
+from .models import OrderItem, Product, ProductPair, Recommendation
+
+# ============================
+# 🤝 FREQUENTLY BOUGHT TOGETHER
+# ============================
+
+# ProductPair is a sparse product x product matrix counting the orders that
+# contained both products. Each product's STORE_RECOMMENDATIONS_TOP_K
+# strongest pairs are copied to Recommendation, which product pages and
+# /api/products/{id}/recommendations/ read in one indexed lookup. Every new
+# order adds its pairs through add_order(), a job enqueued at checkout;
+# rebuild_recommendations() recomputes everything in one streaming pass over
+# OrderItem, e.g. after bulk imports or to forget deleted orders. Pages are
+# cached by catalog version, so a changed top-K bumps it, at most once per
+# STORE_CATALOG_MIN_BUMP_SECONDS.
+
+STREAM_CHUNK_SIZE = 5000
+WRITE_BATCH_SIZE = 1000
+
+
+def _ranked(others, top_k):
+    """[(other_id, orders)] for the top_k strongest pairs, ties by id."""
+    return nsmallest(top_k, others.items(), key=lambda item: (-item[1], item[0]))
+
+
+def _bulk_create(model, objs):
+    """bulk_create() a generator in batches; returns the number of rows."""
+    objs, count = iter(objs), 0
+    while batch := list(islice(objs, WRITE_BATCH_SIZE)):
+        model.objects.bulk_create(batch)
+        count += len(batch)
+    return count
+
+
+def _add_pairs(product_ids):
+    """Count one more order containing every pair of product_ids, with one
+    INSERT ... ON CONFLICT DO UPDATE per batch (PostgreSQL and SQLite);
+    bulk_create() cannot increment on conflict."""
+    quote = connection.ops.quote_name
+    table = quote(ProductPair._meta.db_table)
+    product, other, orders = (quote(ProductPair._meta.get_field(name).column) for name in ('product', 'other', 'orders'))
+    pairs = iter(permutations(product_ids, 2))
+    with connection.cursor() as cursor:
+        while batch := list(islice(pairs, WRITE_BATCH_SIZE)):
+            cursor.execute(
+                f'INSERT INTO {table} ({product}, {other}, {orders}) VALUES {", ".join(["(%s, %s, 1)"] * len(batch))} '
+                f'ON CONFLICT ({product}, {other}) DO UPDATE SET {orders} = {table}.{orders} + 1',
+                [value for pair in batch for value in pair],
+            )
+
+
+def refresh(product_ids):
+    """Recompute the Recommendation rows of product_ids from ProductPair."""
+    ranked = (
+        ProductPair.objects.filter(product_id__in=product_ids)
+        .annotate(rank=Window(RowNumber(), partition_by=F('product_id'), order_by=[F('orders').desc(), 'other_id']))
+        .filter(rank__lte=settings.STORE_RECOMMENDATIONS_TOP_K)
+        .values_list('product_id', 'rank', 'other_id', 'orders')
+    )
+    rows = [
+        Recommendation(product_id=product_id, rank=rank, recommended_id=other_id, orders=orders)
+        for product_id, rank, other_id, orders in ranked
+    ]
+    lengths = Counter(row.product_id for row in rows)
+    current = Recommendation.objects.filter(product_id__in=product_ids)
+    before = set(current.values_list('product_id', 'rank', 'recommended_id'))
+    Recommendation.objects.bulk_create(
+        rows, update_conflicts=True, unique_fields=['product', 'rank'], update_fields=['recommended', 'orders'],
+    )
+    # Ranks past the new list, e.g. after partners were deleted
+    current.filter(reduce(or_, (Q(product_id=product_id, rank__gt=lengths[product_id]) for product_id in product_ids))).delete()
+    if {(row.product_id, row.rank, row.recommended_id) for row in rows} != before:
+        bump_catalog_version(settings.STORE_CATALOG_MIN_BUMP_SECONDS)
+
+
+def add_order(order_id):
+    """Background job: count a new order's product pairs and refresh the
+    recommendations of its products."""
+    product_ids = sorted(set(OrderItem.objects.filter(order_id=order_id).values_list('product_id', flat=True)))
+    if len(product_ids) < 2:
+        return
+    with transaction.atomic():
+        # Pairs in id order, so concurrent orders lock them in one order
+        _add_pairs(product_ids)
+        refresh(product_ids)
+
+
+def rebuild_recommendations():
+    """Recompute ProductPair and Recommendation from every order, streaming
+    OrderItem ordered by order. Memory grows with the number of distinct
+    pairs, not of orders. Returns (pairs, recommendations) written."""
+    matrix = defaultdict(Counter)
+    items = (
+        OrderItem.objects.order_by('order_id')
+        .values_list('order_id', 'product_id')
+        .iterator(chunk_size=STREAM_CHUNK_SIZE)
+    )
+    for _, rows in groupby(items, key=itemgetter(0)):
+        for product_id, other_id in permutations(sorted({product_id for _, product_id in rows}), 2):
+            matrix[product_id][other_id] += 1
+
+    top_k = settings.STORE_RECOMMENDATIONS_TOP_K
+    with transaction.atomic():
+        # Products deleted since their orders were read get no rows
+        live = set(Product.objects.values_list('id', flat=True))
+        for product_id in matrix.keys() - live:
+            del matrix[product_id]
+        for others in matrix.values():
+            for other_id in others.keys() - live:
+                del others[other_id]
+        ProductPair.objects.all().delete()
+        Recommendation.objects.all().delete()
+        pairs = _bulk_create(ProductPair, (
+            ProductPair(product_id=product_id, other_id=other_id, orders=orders)
+            for product_id, others in matrix.items() for other_id, orders in others.items()
+        ))
+        recommendations = _bulk_create(Recommendation, (
+            Recommendation(product_id=product_id, rank=rank, recommended_id=other_id, orders=orders)
+            for product_id, others in matrix.items()
+            for rank, (other_id, orders) in enumerate(_ranked(others, top_k), 1)
+        ))
+        bump_catalog_version()
+    return pairs, recommendations
@@ -0,0 +1,118 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# ============================
+# 📚 READ REPLICAS
+# ============================
+
+# With REPLICA_DATABASE_URLS set, catalog pages, catalog API reads and the
+# dashboard read from a replica (settings.STORE_READ_REPLICAS, one picked per
+# request) inside `replica_reads()`; everything else, every write and every
+# read in a transaction stays on the primary. Replicas lag, so a client that
+# writes anything (cart, checkout, wishlist, login...) gets a cookie pinning
+# its requests to the primary for REPLICA_PIN_SECONDS and reads its own
+# writes (see store.middleware.ReplicaPinMiddleware).
+
+PIN_COOKIE = 'store_primary'
+
+
+class ReplicaState:
+    """Routing state of one request (or one replica_reads() block)."""
+
+    __slots__ = ('alias', 'pinned', 'wrote')
+
+    def __init__(self, pinned=False):
+        self.alias = None
+        self.pinned = pinned
+        self.wrote = False
+
+    @property
+    def use_replica(self):
+        return self.alias is not None and not (self.pinned or self.wrote)
+
+
+# A mutable state rather than separate variables, so writes recorded in
+# sync_to_async threads are seen by the async request that started them
+current = ContextVar('store_replica_state', default=None)
+
+
+@contextmanager
+def replica_reads():
+    """Send reads in this block to a replica, unless the client is pinned to
+    the primary or the block has written already."""
+    state, token = current.get(), None
+    if state is None:
+        state = ReplicaState()
+        token = current.set(state)
+    previous = state.alias
+    if previous is None and settings.STORE_READ_REPLICAS:
+        state.alias = random.choice(settings.STORE_READ_REPLICAS)
+    try:
+        yield state
+    finally:
+        state.alias = previous
+        if token is not None:
+            current.reset(token)
+
+
+def read_from_replica(view):
+    """View decorator (sync or async) running the view in replica_reads()."""
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            with replica_reads():
+                return await view(request, *args, **kwargs)
+    else:
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            with replica_reads():
+                return view(request, *args, **kwargs)
+    return wrapper
+
+
+def pin_response(response, state):
+    """Pin a client that wrote during this request to the primary."""
+    if state.wrote and settings.REPLICA_PIN_SECONDS > 0:
+        response.set_cookie(PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS, httponly=True, samesite='Lax')
+
+
+class ReplicaRouter:
+    """Routes reads inside replica_reads() to the request's replica and
+    everything else to the primary. Does nothing without replicas."""
+
+    def db_for_read(self, model, **hints):
+        if not settings.STORE_READ_REPLICAS:
+            return None
+        state = current.get()
+        # A transaction on the primary must see its own reads
+        if state is None or not state.use_replica or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return state.alias
+
+    def db_for_write(self, model, **hints):
+        if not settings.STORE_READ_REPLICAS:
+            return None
+        state = current.get()
+        if state is not None:
+            state.wrote = True
+        # Also for instances loaded from a replica
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the primary's rows
+        aliases = {DEFAULT_DB_ALIAS, *settings.STORE_READ_REPLICAS}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema from the primary
+        if db in settings.STORE_READ_REPLICAS:
+            return False
+        return None
@@ -0,0 +1,178 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DecimalField, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from . import jobs
+from .models import DailySalesRollup, Order, OrderItem
+
+# ============================
+# 📊 SALES REPORTING
+# ============================
+
+# The dashboard never scans orders. Sales are rolled up per day (totals, per
+# category and per product) in DailySalesRollup, and each order adds or
+# removes its share when it enters or leaves a counted status. Widgets then
+# aggregate O(days) rollup rows. rebuild_sales_rollups() recomputes a range
+# from scratch, e.g. after editing order items by hand. Order.rollup_applied
+# records whether an order's share is in the rollups, so queued updates and
+# deletions can land in any order without counting it twice or subtracting
+# what was never added.
+
+# Orders in these statuses have been paid for
+REVENUE_STATUSES = ('Paid', 'Shipped', 'Completed')
+
+LINE_REVENUE = Sum(F('price') * F('quantity'), output_field=DecimalField(max_digits=14, decimal_places=2))
+
+
+def _rollup_rows(orders):
+    """(date, category_id, product_id, revenue, orders, units) for `orders`,
+    aggregated in SQL."""
+    items = OrderItem.objects.filter(order__in=orders).annotate(day=TruncDate('order__created_at'))
+    units = dict(items.values_list('day').annotate(Sum('quantity')).order_by())
+    rows = [
+        (day, None, None, revenue, count, units.get(day, 0))
+        for day, revenue, count in orders.annotate(day=TruncDate('created_at'))
+        .values_list('day').annotate(Sum('total_amount'), Count('id')).order_by()
+    ]
+    for field in ('product__category', 'product'):
+        for day, key, revenue, count, quantity in (
+            items.values_list('day', field)
+            .annotate(revenue=LINE_REVENUE, orders=Count('order', distinct=True), units=Sum('quantity')).order_by()
+        ):
+            category_id, product_id = (key, None) if field == 'product__category' else (None, key)
+            rows.append((day, category_id, product_id, revenue, count, quantity))
+    return rows
+
+
+def _apply(row, sign):
+    day, category_id, product_id, revenue, orders, units = row
+    lookup = {'date': day, 'category_id': category_id, 'product_id': product_id}
+    changes = {
+        'revenue': F('revenue') + sign * revenue,
+        'orders': F('orders') + sign * orders,
+        'units': F('units') + sign * units,
+    }
+    if DailySalesRollup.objects.filter(**lookup).update(**changes) or sign < 0:
+        return
+    try:
+        with transaction.atomic():
+            DailySalesRollup.objects.create(**lookup, revenue=revenue, orders=orders, units=units)
+    except IntegrityError:
+        # Another order created the row first
+        DailySalesRollup.objects.filter(**lookup).update(**changes)
+
+
+def _apply_rows(rows, sign):
+    with transaction.atomic():
+        for row in rows:
+            _apply(row, sign)
+
+
+def track_order(order, created):
+    """Called on Order save: add or remove the order's share of the rollups
+    when it enters or leaves a counted status."""
+    was_counted = not created and getattr(order, '_rollup_status', None) in REVENUE_STATUSES
+    is_counted = order.status in REVENUE_STATUSES
+    order._rollup_status = order.status
+    if was_counted == is_counted:
+        return
+    # After commit, so items bulk-created after the order are included
+    jobs.enqueue(apply_order, order_id=order.pk)
+
+
+def apply_order(order_id):
+    """Background job: add or remove an order's rollup rows so that they
+    match its current status. Does nothing if they already do, or if the
+    order was deleted meanwhile (untrack_order settled it)."""
+    with transaction.atomic():
+        order = Order.objects.select_for_update().filter(pk=order_id).values_list('status', 'rollup_applied').first()
+        if order is None:
+            return
+        status, applied = order
+        counted = status in REVENUE_STATUSES
+        if counted == applied:
+            return
+        _apply_rows(_rollup_rows(Order.objects.filter(pk=order_id)), 1 if counted else -1)
+        Order.objects.filter(pk=order_id).update(rollup_applied=counted)
+
+
+def untrack_order(order):
+    """Called before an Order is deleted: its items are still readable now.
+    Only rows apply_order() has added are removed; the row lock waits for
+    an apply_order() running meanwhile."""
+    applied = Order.objects.select_for_update().filter(pk=order.pk).values_list('rollup_applied', flat=True).first()
+    if not applied:
+        return
+    rows = _rollup_rows(Order.objects.filter(pk=order.pk))
+    transaction.on_commit(lambda: _apply_rows(rows, -1), robust=True)
+
+
+def rebuild_sales_rollups(start=None, end=None):
+    """Recompute rollups for [start, end] (dates, inclusive) from orders."""
+    in_range = Order.objects.all()
+    rollups = DailySalesRollup.objects.all()
+    if start:
+        in_range = in_range.filter(created_at__date__gte=start)
+        rollups = rollups.filter(date__gte=start)
+    if end:
+        in_range = in_range.filter(created_at__date__lte=end)
+        rollups = rollups.filter(date__lte=end)
+    orders = in_range.filter(status__in=REVENUE_STATUSES)
+    with transaction.atomic():
+        rollups.delete()
+        rows = DailySalesRollup.objects.bulk_create([
+            DailySalesRollup(date=day, category_id=category_id, product_id=product_id,
+                             revenue=revenue, orders=count, units=units)
+            for day, category_id, product_id, revenue, count, units in _rollup_rows(orders)
+        ], batch_size=1000)
+        orders.update(rollup_applied=True)
+        in_range.exclude(status__in=REVENUE_STATUSES).update(rollup_applied=False)
+    return len(rows)
+
+
+# ============================
+# 📈 DASHBOARD WIDGETS
+# ============================
+
+def _totals():
+    return DailySalesRollup.objects.filter(category__isnull=True, product__isnull=True)
+
+
+def sales_summary():
+    """All-time and today's revenue, orders and units."""
+    zero = {'revenue': Decimal('0'), 'orders': 0, 'units': 0}
+    overall = _totals().aggregate(revenue=Sum('revenue'), orders=Sum('orders'), units=Sum('units'))
+    today = _totals().filter(date=timezone.localdate()).values('revenue', 'orders', 'units').first()
+    return {
+        'total': {key: value if value is not None else zero[key] for key, value in overall.items()},
+        'today': today or zero,
+    }
+
+
+def revenue_over_time(days=14):
+    """One entry per day for the last `days` days, including empty days.
+    `percent` scales each day against the best one for bar charts."""
+    end = timezone.localdate()
+    start = end - timedelta(days=days - 1)
+    revenue = dict(_totals().filter(date__gte=start).values_list('date', 'revenue'))
+    best = max(revenue.values(), default=0)
+    series = []
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        amount = revenue.get(day, Decimal('0'))
+        series.append({'date': day, 'revenue': amount, 'percent': int(amount * 100 / best) if best else 0})
+    return series
+
+
+def top_products(days=30, limit=5):
+    start = timezone.localdate() - timedelta(days=days - 1)
+    return list(
+        DailySalesRollup.objects.filter(product__isnull=False, date__gte=start)
+        .values('product_id', 'product__name')
+        .annotate(revenue=Sum('revenue'), units=Sum('units'))
+        .order_by('-revenue')[:limit]
+    )
@@ -0,0 +1,295 @@
+import re
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils.module_loading import import_string
+
+from .models import Product, SearchIndexVersion
+
+# ============================
+# 🔎 PRODUCT SEARCH BACKENDS
+# ============================
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# Matches in the product name count more than matches in the description
+NAME_WEIGHT = 2
+DESCRIPTION_WEIGHT = 1
+
+# Prefix matches ("jor" -> "jordan") score lower than exact token matches
+PREFIX_FACTOR = 0.5
+
+SEARCH_INDEX_VERSION_PK = 1
+
+
+def tokenize(text):
+    return TOKEN_RE.findall((text or '').lower())
+
+
+class BaseSearchBackend:
+    """Filters and ranks a Product queryset for a free-text query."""
+
+    def search(self, queryset, query):
+        raise NotImplementedError
+
+    # Backends that keep their own index override these (called from signals)
+    def index_product(self, product):
+        pass
+
+    def remove_product(self, product_id):
+        pass
+
+    def index_products(self, queryset):
+        """Re-index many products at once (bulk writes skip the signals)."""
+        pass
+
+
+class IContainsSearchBackend(BaseSearchBackend):
+    """The original LIKE '%q%' scan, kept for comparison and as a fallback."""
+
+    def search(self, queryset, query):
+        return queryset.filter(Q(name__icontains=query) | Q(description__icontains=query))
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """Full-text search using to_tsvector/to_tsquery, served by the GIN index
+    created in migration 0005. Every query token is matched as a prefix."""
+
+    config = 'english'
+
+    def search(self, queryset, query):
+        from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+
+        tokens = tokenize(query)
+        if not tokens:
+            return queryset.none()
+
+        vector = (
+            SearchVector('name', weight='A', config=self.config)
+            + SearchVector('description', weight='B', config=self.config)
+        )
+        ts_query = SearchQuery(' & '.join(f'{token}:*' for token in tokens), search_type='raw', config=self.config)
+        return (
+            queryset.annotate(search=vector, rank=SearchRank(vector, ts_query))
+            .filter(search=ts_query)
+            .order_by('-rank', 'id')
+        )
+
+
+def index_version():
+    return SearchIndexVersion.objects.filter(pk=SEARCH_INDEX_VERSION_PK).values_list('version', flat=True).first() or 0
+
+
+def bump_index_version():
+    """Advance the shared SearchIndexVersion and return the new value."""
+    with transaction.atomic():
+        row, _ = SearchIndexVersion.objects.select_for_update().get_or_create(pk=SEARCH_INDEX_VERSION_PK)
+        row.version += 1
+        row.save(update_fields=['version'])
+    return row.version
+
+
+class InvertedIndexSearchBackend(BaseSearchBackend):
+    """In-process inverted index (token -> {product_id: weight}) for databases
+    without full-text search. Built lazily on first query and kept up to date
+    from the Product post_save/post_delete signals. Those only run in the
+    process that saved, so they also bump the shared SearchIndexVersion, and
+    every other process rebuilds its index on its next search once that has
+    moved past the version it holds. Stock and other catalog changes leave it
+    alone. Only the max_results best matches are returned."""
+
+    max_results = 1000
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._version = None  # SearchIndexVersion the index matches; None until built
+        self._postings = defaultdict(dict)
+        self._doc_tokens = {}
+        self._sorted_tokens = None
+
+    # ---------- index maintenance ----------
+
+    def _add(self, product_id, name, description):
+        weights = defaultdict(int)
+        for token in tokenize(name):
+            weights[token] += NAME_WEIGHT
+        for token in tokenize(description):
+            weights[token] += DESCRIPTION_WEIGHT
+
+        for token, weight in weights.items():
+            if token not in self._postings:
+                self._sorted_tokens = None
+            self._postings[token][product_id] = weight
+        self._doc_tokens[product_id] = set(weights)
+
+    def _remove(self, product_id):
+        for token in self._doc_tokens.pop(product_id, ()):
+            postings = self._postings.get(token)
+            if postings is None:
+                continue
+            postings.pop(product_id, None)
+            if not postings:
+                del self._postings[token]
+                self._sorted_tokens = None
+
+    def build(self, version=None):
+        """(Re)build the whole index; `version` is the index version read
+        before the products, so a change committed meanwhile rebuilds again."""
+        if version is None:
+            version = index_version()
+        with self._lock:
+            self._postings = defaultdict(dict)
+            self._doc_tokens = {}
+            self._sorted_tokens = None
+            rows = Product.objects.values_list('id', 'name', 'description').iterator(chunk_size=2000)
+            for product_id, name, description in rows:
+                self._add(product_id, name, description)
+            self._version = version
+
+    def _update(self, apply):
+        """Bump the shared index version and apply() a committed change. The
+        index moves to the new version only if it was current just before;
+        otherwise another process changed products too, and (like an index
+        never built) it is rebuilt on the next search."""
+        version = bump_index_version()
+        with self._lock:
+            if self._version == version - 1:
+                apply()
+                self._version = version
+
+    def index_product(self, product):
+        def apply():
+            self._remove(product.pk)
+            self._add(product.pk, product.name, product.description)
+        self._update(apply)
+
+    def remove_product(self, product_id):
+        self._update(lambda: self._remove(product_id))
+
+    def index_products(self, queryset):
+        rows = list(queryset.values_list('id', 'name', 'description'))
+
+        def apply():
+            for product_id, name, description in rows:
+                self._remove(product_id)
+                self._add(product_id, name, description)
+        self._update(apply)
+
+    # ---------- querying ----------
+
+    def _prefix_tokens(self, prefix):
+        if self._sorted_tokens is None:
+            self._sorted_tokens = sorted(self._postings)
+        tokens = self._sorted_tokens
+        i = bisect_left(tokens, prefix)
+        while i < len(tokens) and tokens[i].startswith(prefix):
+            yield tokens[i]
+            i += 1
+
+    def _score_token(self, token):
+        scores = defaultdict(float)
+        for candidate in self._prefix_tokens(token):
+            factor = 1.0 if candidate == token else PREFIX_FACTOR
+            for product_id, weight in self._postings[candidate].items():
+                scores[product_id] = max(scores[product_id], weight * factor)
+        return scores
+
+    def _rank(self, query):
+        """Every matching product id, best first."""
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+
+        version = index_version()
+        with self._lock:
+            if version != self._version:
+                self.build(version)
+
+            totals = None
+            # Score the rarest token first so the intersection shrinks fast
+            for token in sorted(set(tokens), key=lambda t: len(self._postings.get(t, ()))):
+                scores = self._score_token(token)
+                if totals is None:
+                    totals = scores
+                else:
+                    totals = {pid: totals[pid] + score for pid, score in scores.items() if pid in totals}
+                if not totals:
+                    return []
+
+        ranked = sorted(totals.items(), key=lambda item: (-item[1], item[0]))
+        return [product_id for product_id, _ in ranked]
+
+    def ranked_ids(self, query):
+        return self._rank(query)[:self.max_results]
+
+    def search(self, queryset, query):
+        ranked_ids = self._rank(query)
+        return RankedResults(queryset, ranked_ids[:self.max_results], truncated=len(ranked_ids) > self.max_results)
+
+
+class RankedResults:
+    """Products for a ranked id list, restricted to `queryset`. Supports len()
+    and slicing so Paginator can page it with one small query per page instead
+    of sorting the whole result set in SQL. `truncated` is set when the
+    backend dropped matches beyond its max_results."""
+
+    def __init__(self, queryset, ranked_ids, truncated=False):
+        self.queryset = queryset
+        self.truncated = truncated
+        self._ranked_ids = ranked_ids
+        self._ids = None
+
+    @property
+    def ids(self):
+        if self._ids is None:
+            if not self._ranked_ids or not self.queryset.query.has_filters():
+                self._ids = self._ranked_ids
+            else:
+                # Apply the caller's other filters (category, price, ...)
+                allowed = set(self.queryset.filter(pk__in=self._ranked_ids).values_list('pk', flat=True))
+                self._ids = [pk for pk in self._ranked_ids if pk in allowed]
+        return self._ids
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            page_ids = self.ids[index]
+            if not page_ids:
+                return []
+            products = self.queryset.in_bulk(page_ids)
+            return [products[pk] for pk in page_ids if pk in products]
+        return self[index:index + 1][0] if index >= 0 else self[len(self) + index]
+
+    def __iter__(self):
+        return iter(self[:])
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """Return the configured search backend (STORE_SEARCH_BACKEND), picking
+    Postgres full-text search or the inverted index when left unset."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                path = getattr(settings, 'STORE_SEARCH_BACKEND', '')
+                if path:
+                    _backend = import_string(path)()
+                elif connection.vendor == 'postgresql':
+                    _backend = PostgresSearchBackend()
+                else:
+                    _backend = InvertedIndexSearchBackend()
+    return _backend
+
+
+def search_products(queryset, query):
+    return get_backend().search(queryset, query)
@@ -1,49 +1,178 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
+from django.db.models import Prefetch
 from .models import Category, Product, CartItem, WishlistItem, Order, OrderItem
 
+
+class EagerLoadingMixin:
+    """Serializers declare the joins they read so views can load them up front.
+
+    `select_related_fields` / `prefetch_related_fields` cover the simple cases;
+    override `setup_eager_loading` to compose the plans of nested serializers.
+    """
+    select_related_fields = ()
+    prefetch_related_fields = ()
+
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        if cls.select_related_fields:
+            queryset = queryset.select_related(*cls.select_related_fields)
+        if cls.prefetch_related_fields:
+            queryset = queryset.prefetch_related(*cls.prefetch_related_fields)
+        return queryset
+
+
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['id', 'username', 'email']
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(EagerLoadingMixin, serializers.ModelSerializer):
     class Meta:
         model = Category
         fields = '__all__'
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     category_name = serializers.ReadOnlyField(source='category.name')
+    select_related_fields = ('category',)
 
     class Meta:
         model = Product
         fields = ['id', 'name', 'description', 'price', 'category', 'category_name', 'image', 'stock']
 
-class CartItemSerializer(serializers.ModelSerializer):
+class CartItemSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     product_details = ProductSerializer(source='product', read_only=True)
     total_price = serializers.ReadOnlyField()
+    select_related_fields = ('product__category',)
 
     class Meta:
         model = CartItem
         fields = ['id', 'user', 'product', 'product_details', 'quantity', 'total_price', 'created_at']
+        read_only_fields = ['user']
+        # (user, product) is unique; creating an existing pair increments it instead
+        validators = []
 
-class WishlistItemSerializer(serializers.ModelSerializer):
+class WishlistItemSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     product_details = ProductSerializer(source='product', read_only=True)
+    select_related_fields = ('product__category',)
 
     class Meta:
         model = WishlistItem
         fields = ['id', 'user', 'product', 'product_details', 'added_at']
 
-class OrderItemSerializer(serializers.ModelSerializer):
+class OrderItemSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     product_details = ProductSerializer(source='product', read_only=True)
+    select_related_fields = ('product__category',)
 
     class Meta:
         model = OrderItem
         fields = ['id', 'product', 'product_details', 'quantity', 'price']
 
-class OrderSerializer(serializers.ModelSerializer):
-    items = OrderItemSerializer(many=True, read_only=True, source='orderitem_set')
+class OrderSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    items = OrderItemSerializer(many=True, read_only=True)
 
     class Meta:
         model = Order
         fields = ['id', 'user', 'first_name', 'email', 'address', 'city', 'phone', 'total_amount', 'payment_method', 'status', 'created_at', 'items']
+
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        items = OrderItemSerializer.setup_eager_loading(OrderItem.objects.all())
+        return queryset.prefetch_related(Prefetch('items', queryset=items))
+
+
+# ============================
+# 📥 BULK WRITE SERIALIZERS
+# ============================
+
+# Plain serializers: the ModelSerializer versions would run a uniqueness
+# query and a related-object lookup per row. Foreign keys and ids are checked
+# against sets the view loads once (`category_ids`, `product_ids` in context).
+
+class BulkListSerializer(serializers.ListSerializer):
+    """Validates every row in one pass and keeps going past bad rows: valid
+    rows end up in validated_data, failures in `row_errors` as
+    {'index': <position in the payload>, 'errors': {...}}. The child's
+    Meta.bulk_key field must be unique within the payload."""
+
+    max_rows = 20000
+
+    def to_internal_value(self, data):
+        if not isinstance(data, list):
+            raise serializers.ValidationError({'non_field_errors': ["Expected a list of items."]})
+        if not data:
+            raise serializers.ValidationError({'non_field_errors': ["This list may not be empty."]})
+        if len(data) > self.max_rows:
+            raise serializers.ValidationError({'non_field_errors': [f"At most {self.max_rows} items per request."]})
+
+        key = self.child.Meta.bulk_key
+        rows, seen, self.row_errors = [], set(), []
+        for index, item in enumerate(data):
+            try:
+                row = self.child.run_validation(item)
+            except serializers.ValidationError as exc:
+                self.row_errors.append({'index': index, 'errors': exc.detail})
+                continue
+            value = row[self.child.fields[key].source]
+            if value in seen:
+                self.row_errors.append({'index': index, 'errors': {key: ["Duplicate in this request."]}})
+                continue
+            seen.add(value)
+            rows.append(row)
+        return rows
+
+
+class CategoryBulkSerializer(serializers.Serializer):
+    name = serializers.CharField(max_length=100)
+    description = serializers.CharField(allow_blank=True, required=False)
+
+    class Meta:
+        list_serializer_class = BulkListSerializer
+        bulk_key = 'name'
+
+
+class ProductBulkSerializer(serializers.Serializer):
+    name = serializers.CharField(max_length=200)
+    description = serializers.CharField(allow_blank=True, required=False)
+    price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0)
+    category = serializers.IntegerField(source='category_id')
+    stock = serializers.IntegerField(min_value=0, required=False)
+
+    class Meta:
+        list_serializer_class = BulkListSerializer
+        bulk_key = 'name'
+
+    def validate_category(self, value):
+        if value not in self.context['category_ids']:
+            raise serializers.ValidationError(f'Invalid pk "{value}" - object does not exist.')
+        return value
+
+
+class StockUpdateSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    stock = serializers.IntegerField(min_value=0)
+
+    class Meta:
+        list_serializer_class = BulkListSerializer
+        bulk_key = 'id'
+
+    def validate_id(self, value):
+        if value not in self.context['product_ids']:
+            raise serializers.ValidationError(f'Invalid pk "{value}" - object does not exist.')
+        return value
+
+
+# ============================
+# 📤 EXPORT FILTERS
+# ============================
+
+class OrderExportFilterSerializer(serializers.Serializer):
+    """Query parameters of /api/orders/export/: ?start=2025-01-01&end=2025-01-31&status=Paid&status=Shipped"""
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    status = serializers.ListField(child=serializers.ChoiceField(choices=Order.STATUS_CHOICES), required=False)
+
+    def validate(self, attrs):
+        if attrs.get('start') and attrs.get('end') and attrs['start'] > attrs['end']:
+            raise serializers.ValidationError({'end': 'Must not be before start.'})
+        return attrs
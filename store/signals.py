@@ -0,0 +1,124 @@
+from django.conf import settings
+from django.contrib.auth.signals import user_logged_in
+from django.core.signals import request_finished
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import dbpool, images, jobs, reports, search
+from .catalog import bump_catalog_version
+from .cart import cart_count_cache_key, merge_session_cart
+from .context_processors import CATEGORIES_CACHE_KEY, wishlist_count_cache_key
+from .models import CartItem, Category, Order, Product, WishlistItem
+
+
+# ============================
+# 🔎 SEARCH INDEX
+# ============================
+
+# Index only once the write is committed, so a rolled-back save never leaves
+# a phantom entry in the in-process index.
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, **kwargs):
+    transaction.on_commit(lambda: search.get_backend().index_product(instance))
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product(sender, instance, **kwargs):
+    product_id = instance.pk
+    transaction.on_commit(lambda: search.get_backend().remove_product(product_id))
+
+
+# ============================
+# 🖼️ IMAGE DERIVATIVES
+# ============================
+
+# Build resized variants once an upload is committed (in a worker with the
+# job queue on), so shoppers never pay for generation and the first render
+# already has them.
+
+@receiver(post_save, sender=Product)
+def build_image_variants(sender, instance, **kwargs):
+    if instance.image:
+        jobs.enqueue(images.build_product_variants, product_id=instance.pk)
+
+
+# ============================
+# 🏷️ CATALOG VERSION
+# ============================
+
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=Category)
+def catalog_changed(sender, **kwargs):
+    bump_catalog_version()
+
+
+# ============================
+# 🧭 NAVBAR CACHE
+# ============================
+
+def _invalidate(key):
+    # Drop now, and again after commit so a concurrent request cannot
+    # re-cache the pre-commit rows in between.
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+@receiver([post_save, post_delete], sender=Category)
+def invalidate_nav_categories(sender, **kwargs):
+    _invalidate(CATEGORIES_CACHE_KEY)
+
+
+@receiver([post_save, post_delete], sender=WishlistItem)
+def invalidate_wishlist_count(sender, instance, **kwargs):
+    _invalidate(wishlist_count_cache_key(instance.user_id))
+
+
+@receiver([post_save, post_delete], sender=CartItem)
+def invalidate_cart_count(sender, instance, **kwargs):
+    _invalidate(cart_count_cache_key(instance.user_id))
+
+
+# ============================
+# 📊 SALES ROLLUPS
+# ============================
+
+# Remember the status an order was loaded with, so a save can tell whether
+# it entered or left a counted status. QuerySet.update() bypasses this;
+# use rebuild_sales_rollups after bulk status changes.
+
+@receiver(post_init, sender=Order)
+def remember_order_status(sender, instance, **kwargs):
+    instance._rollup_status = instance.status
+
+
+@receiver(post_save, sender=Order)
+def update_sales_rollups(sender, instance, created, **kwargs):
+    reports.track_order(instance, created)
+
+
+@receiver(pre_delete, sender=Order)
+def remove_from_sales_rollups(sender, instance, **kwargs):
+    reports.untrack_order(instance)
+
+
+# ============================
+# 🛒 CART MERGE ON LOGIN
+# ============================
+
+@receiver(user_logged_in)
+def merge_cart_on_login(sender, request, user, **kwargs):
+    if request is not None and hasattr(request, 'session'):
+        merge_session_cart(user, request.session)
+
+
+# ============================
+# 🔌 CONNECTION POOL STATS
+# ============================
+
+@receiver(request_finished)
+def publish_pool_stats(sender, **kwargs):
+    if settings.DB_POOL:
+        dbpool.publisher.maybe_publish()
@@ -0,0 +1,62 @@
+import hashlib
+import os
+import re
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+# ============================
+# 🗄️ CONTENT-HASHED MEDIA STORAGE
+# ============================
+
+# Uploads are saved as <name>.<hash><ext>, so a URL always points at the same
+# bytes and can be cached forever (see store.media). Re-uploading identical
+# content reuses the existing file instead of writing a copy.
+
+HASH_LENGTH = 12
+
+# products/boots.3f9a0c1d2e4b.png, and image variants (store.images)
+IMMUTABLE_NAME_RE = re.compile(
+    rf'(\.[0-9a-f]{{{HASH_LENGTH}}}\.\w+$)|(^derivatives/[0-9a-f]{{2}}/[0-9a-f]+-\d+w\.\w+$)'
+)
+
+
+def file_hash(content):
+    """Short sha256 of a django.core.files.File, leaving it rewound."""
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()[:HASH_LENGTH]
+
+
+def is_immutable(name):
+    """True if `name` embeds a content hash, i.e. its bytes never change."""
+    return bool(IMMUTABLE_NAME_RE.search(name.replace(os.sep, '/')))
+
+
+class HashedMediaStorage(FileSystemStorage):
+    """FileSystemStorage that puts a content hash in the names of files saved
+    under `hashed_prefixes`; everything else is stored unchanged."""
+
+    def __init__(self, *args, hashed_prefixes=('products/',), **kwargs):
+        self.hashed_prefixes = tuple(hashed_prefixes)
+        super().__init__(*args, **kwargs)
+
+    def save(self, name, content, max_length=None):
+        name = name.replace(os.sep, '/')
+        if name.startswith(self.hashed_prefixes) and not is_immutable(name):
+            if not hasattr(content, 'chunks'):
+                content = File(content, name)
+            root, ext = os.path.splitext(name)
+            if max_length:
+                # Trim the original name, never the hash
+                root = root[:max_length - len(ext) - HASH_LENGTH - 1]
+            name = f'{root}.{file_hash(content)}{ext.lower()}'
+            if self.exists(name):
+                return name  # identical bytes already stored
+        return super().save(name, content, max_length=max_length)
+
+
+def hashed_media_storage():
+    return HashedMediaStorage()
@@ -0,0 +1,33 @@
+from django import template
+
+from store import images
+
+register = template.Library()
+
+
+@register.simple_tag
+def image_srcset(image, fmt='webp'):
+    """`srcset` value for one format, e.g. "…-320w.webp 320w, …-640w.webp 640w"."""
+    return images.srcset(image, fmt)
+
+
+@register.simple_tag
+def image_url(image, width, fmt=images.FALLBACK_FORMAT):
+    return images.variant_url(image, int(width), fmt)
+
+
+@register.inclusion_tag('store/includes/picture.html')
+def picture(image, sizes='100vw', css_class='', alt='', loading='lazy', fallback_width=640):
+    """Responsive <picture>: AVIF/WebP sources plus a JPEG <img> fallback."""
+    manifest = images.get_variants(image)
+    return {
+        'sources': images.picture_sources(image) if manifest else [],
+        'src': images.variant_url(image, fallback_width) if image else '',
+        'srcset': images.srcset(image, images.FALLBACK_FORMAT) if manifest else '',
+        'width': manifest['width'] if manifest else None,
+        'height': manifest['height'] if manifest else None,
+        'sizes': sizes,
+        'css_class': css_class,
+        'alt': alt,
+        'loading': loading,
+    }
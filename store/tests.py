@@ -1,3 +1,1548 @@
-from django.test import TestCase
+import asyncio
+import base64
+import csv
+import importlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+from datetime import timedelta
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.http import Http404, HttpResponse
+from django.db import OperationalError, connection, connections, transaction
+from django.test import Client, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.template import Context, Template
+from django.urls import clear_url_caches, resolve, reverse
+from django.utils import timezone
+from PIL import Image
+
+try:
+    import fakeredis
+except ImportError:  # only needed for the Redis session test
+    fakeredis = None
+
+from . import dbpool, images, jobs, perf, replicas, reports, search, urls as store_urls
+from .bench import percentiles
+from .cart import DBCart, build_cart
+from .fast_serializers import FastProductSerializer
+from .management.commands.store_index_report import sequential_scans
+from .models import (
+    CartItem, CatalogVersion, Category, DailySalesRollup, Job, Order, OrderItem, Product, ProductPair, Recommendation,
+    WishlistItem,
+)
+from .orders import OutOfStock, place_order
+from .media import serve_media
+from .loadtest import SCENARIOS, ClientSession, run_scenario, scenario_context
+from .middleware import PerfMiddleware
+from .pagination import InvalidCursor, keyset_page
+from .recommendations import rebuild_recommendations
+from .reports import rebuild_sales_rollups, top_products
+from .storage import HashedMediaStorage
+
+
+class InvertedIndexSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.shoes = Category.objects.create(name='Shoes')
+        cls.jordan = Product.objects.create(name='Jordan 1 High', description='Black leather sneaker', price=180, category=cls.shoes)
+        cls.boots = Product.objects.create(name='Black Boots', description='Leather boots for winter', price=120, category=cls.shoes)
+        cls.sandals = Product.objects.create(name='Sandals', description='Summer sandals', price=30, category=cls.shoes)
+
+    def setUp(self):
+        search._backend = None
+        self.addCleanup(setattr, search, '_backend', None)
+        self.backend = search.InvertedIndexSearchBackend()
+
+    def test_all_tokens_must_match(self):
+        self.assertEqual(self.backend.ranked_ids('black leather'), [self.boots.pk, self.jordan.pk])
+        self.assertEqual(self.backend.ranked_ids('black summer'), [])
+
+    def test_name_matches_rank_above_description_matches(self):
+        self.assertEqual(self.backend.ranked_ids('boots'), [self.boots.pk])
+        self.assertEqual(self.backend.ranked_ids('black'), [self.boots.pk, self.jordan.pk])
+
+    def test_prefix_matching(self):
+        self.assertEqual(self.backend.ranked_ids('jor'), [self.jordan.pk])
+        self.assertEqual(self.backend.ranked_ids('sand'), [self.sandals.pk])
+
+    def test_index_updates_on_save_and_delete(self):
+        self.backend.build()
+        with self.captureOnCommitCallbacks(execute=True):
+            search._backend = self.backend
+            self.sandals.name = 'Flip-Flops'
+            self.sandals.save()
+        self.assertEqual(self.backend.ranked_ids('flip'), [self.sandals.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.jordan.delete()
+        self.assertEqual(self.backend.ranked_ids('jordan'), [])
+
+    def test_index_follows_changes_saved_by_other_processes(self):
+        self.assertEqual(self.backend.ranked_ids('flip'), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            # A queryset update skips this process's signals, like a save elsewhere
+            Product.objects.filter(pk=self.sandals.pk).update(name='Flip-Flops')
+            search.bump_index_version()
+        self.assertEqual(self.backend.ranked_ids('flip'), [self.sandals.pk])
+
+    def test_local_changes_and_checkouts_do_not_rebuild(self):
+        self.backend.ranked_ids('black')
+        with self.captureOnCommitCallbacks(execute=True):
+            search._backend = self.backend
+            self.sandals.name = 'Flip-Flops'
+            self.sandals.save()
+        Product.objects.filter(pk=self.boots.pk).update(stock=5)
+        user = User.objects.create_user(username='buyer', password='secret')
+        with self.captureOnCommitCallbacks(execute=True):
+            place_order(user, [{'product': self.boots, 'quantity': 1}], 'cash')
+        with mock.patch.object(self.backend, 'build') as build:
+            self.assertEqual(self.backend.ranked_ids('flip'), [self.sandals.pk])
+        build.assert_not_called()
+
+    def test_results_cut_at_max_results_are_flagged(self):
+        self.backend.max_results = 1
+        search._backend = self.backend
+        self.assertTrue(self.backend.search(Product.objects.all(), 'black').truncated)
+        self.assertFalse(self.backend.search(Product.objects.all(), 'boots').truncated)
+
+        data = self.client.get(reverse('store:product-list'), {'search': 'black'}).json()
+        self.assertEqual((data['count'], data['truncated']), (1, True))
+        self.assertNotIn('truncated', self.client.get(reverse('store:product-list'), {'search': 'boots'}).json())
+        self.assertContains(self.client.get(reverse('store:index'), {'q': 'black'}), 'Top 1 Products Detected')
+
+    def test_index_view_uses_ranked_search(self):
+        response = self.client.get(reverse('store:index'), {'q': 'black leath'})
+        self.assertEqual(list(response.context['products']), [self.boots, self.jordan])
+
+    def test_search_respects_other_filters(self):
+        response = self.client.get(reverse('store:index'), {'q': 'black', 'max_price': '150'})
+        self.assertEqual(list(response.context['products']), [self.boots])
+
+
+class CartServiceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='buyer', password='secret')
+        category = Category.objects.create(name='Drinks')
+        cls.products = Product.objects.bulk_create([
+            Product(name=f'Drink {i}', price=i + 1, category=category, stock=10) for i in range(40)
+        ])
+
+    def fill_cart(self, count):
+        CartItem.objects.filter(user=self.user).delete()
+        CartItem.objects.bulk_create([CartItem(user=self.user, product=p, quantity=2) for p in self.products[:count]])
+        cache.clear()
+
+    def cart_view_queries(self, count):
+        self.fill_cart(count)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('store:cart'))
+        self.assertEqual(len(response.context['cart_items']), count)
+        return len(ctx)
+
+    def test_build_cart_totals_and_drops_missing_products(self):
+        cart = {str(self.products[0].pk): {'quantity': 3}, str(self.products[1].pk): {'quantity': 1}, '999999': {'quantity': 1}}
+        with self.assertNumQueries(1):
+            lines, total = build_cart(cart)
+        self.assertEqual([line['product'] for line in lines], self.products[:2])
+        self.assertEqual(lines[0]['total'], 3)
+        self.assertEqual(total, 5)
+
+    def test_build_cart_restricts_to_selected_ids(self):
+        cart = {str(p.pk): {'quantity': 1} for p in self.products[:3]}
+        lines, total = build_cart(cart, [self.products[2].pk])
+        self.assertEqual([line['product'] for line in lines], [self.products[2]])
+
+    def test_cart_view_query_count_is_constant(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.cart_view_queries(1), self.cart_view_queries(40))
+
+    def test_checkout_query_count_is_constant(self):
+        self.client.force_login(self.user)
+        counts = []
+        for size in (1, 40):
+            self.fill_cart(size)
+            with CaptureQueriesContext(connection) as ctx:
+                self.client.get(reverse('store:checkout'))
+            counts.append(len(ctx))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_anonymous_session_cart_merges_on_login(self):
+        CartItem.objects.create(user=self.user, product=self.products[0], quantity=1)
+        self.client.get(reverse('store:add_to_cart', args=[self.products[0].pk]))
+        self.client.get(reverse('store:add_to_cart', args=[self.products[1].pk]))
+        self.client.get(reverse('store:add_to_cart', args=[self.products[1].pk]))
+        self.assertFalse(CartItem.objects.filter(product=self.products[1]).exists())
+
+        self.client.post(reverse('store:login'), {'username': 'buyer', 'password': 'secret'})
+
+        quantities = dict(CartItem.objects.filter(user=self.user).values_list('product_id', 'quantity'))
+        self.assertEqual(quantities, {self.products[0].pk: 2, self.products[1].pk: 2})
+        self.assertNotIn('cart', self.client.session)
+
+    def test_db_cart_add_and_decrement(self):
+        cart = DBCart(self.user)
+        cart.add(self.products[0].pk)
+        cart.add(self.products[0].pk, 2)
+        self.assertEqual(cart.count(), 3)
+        cart.decrement(self.products[0].pk)
+        self.assertEqual(cart.count(), 2)
+        cart.decrement(self.products[0].pk)
+        cart.decrement(self.products[0].pk)
+        self.assertEqual(cart.count(), 0)
+        self.assertFalse(cart.items.exists())
+
+    def test_api_create_increments_existing_item(self):
+        self.client.force_login(self.user)
+        url = reverse('store:cart-item-list')
+        self.client.post(url, {'product': self.products[0].pk, 'quantity': 1})
+        response = self.client.post(url, {'product': self.products[0].pk, 'quantity': 2})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['quantity'], 3)
+        self.assertEqual(CartItem.objects.filter(user=self.user).count(), 1)
+
+
+class PlaceOrderTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='buyer', password='secret')
+        category = Category.objects.create(name='Shoes')
+        cls.boots = Product.objects.create(name='Boots', price=50, category=category, stock=3)
+        cls.heels = Product.objects.create(name='Heels', price=80, category=category, stock=1)
+
+    def place(self, *lines):
+        return place_order(
+            self.user, [{'product': p, 'quantity': q} for p, q in lines], 'khqr',
+            first_name='Dara', email='dara@example.com', address='St 1', city='Phnom Penh', phone='012',
+        )
+
+    def test_places_order_and_decrements_stock(self):
+        # savepoint, stock UPDATE, sell-out check, order INSERT, items bulk
+        # INSERT, release
+        with self.assertNumQueries(6):
+            order = self.place((self.boots, 2), (self.heels, 1))
+        self.assertEqual(order.total_amount, 182)
+        self.assertEqual(order.status, 'Paid')
+        self.assertEqual(order.items.count(), 2)
+        self.boots.refresh_from_db()
+        self.heels.refresh_from_db()
+        self.assertEqual((self.boots.stock, self.heels.stock), (1, 0))
+
+    def test_out_of_stock_rolls_back_everything(self):
+        with self.assertRaises(OutOfStock) as ctx:
+            self.place((self.boots, 1), (self.heels, 2))
+        self.assertEqual(ctx.exception.products, [self.heels])
+        self.boots.refresh_from_db()
+        self.assertEqual(self.boots.stock, 3)
+        self.assertFalse(Order.objects.exists())
+
+    def test_deleted_product_is_reported_as_unavailable(self):
+        ghost = Product.objects.create(name='Ghost', price=10, category=self.boots.category, stock=5)
+        Product.objects.filter(pk=ghost.pk).delete()
+        with self.assertRaisesMessage(OutOfStock, "Not enough stock for: unavailable product"):
+            self.place((self.boots, 1), (ghost, 1))
+        self.assertFalse(Order.objects.exists())
+
+
+class ConcurrentCheckoutTests(TransactionTestCase):
+    def test_concurrent_buyers_never_oversell(self):
+        user = User.objects.create_user(username='buyer', password='secret')
+        product = Product.objects.create(name='Jordan 1', price=180, category=Category.objects.create(name='Shoes'), stock=5)
+        placed, failed = [], []
+
+        def buy():
+            try:
+                for _ in range(3):
+                    try:
+                        placed.append(place_order(user, [{'product': product, 'quantity': 1}], 'cash'))
+                    except (OutOfStock, OperationalError):
+                        failed.append(1)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=buy) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        product.refresh_from_db()
+        self.assertLessEqual(len(placed), 5)
+        self.assertEqual(product.stock, 5 - len(placed))
+        self.assertEqual(OrderItem.objects.count(), len(placed))
+        self.assertEqual(len(placed) + len(failed), 24)
+
+
+class NavbarCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='shopper', password='secret')
+        cls.category = Category.objects.create(name='Hoodies')
+        cls.product = Product.objects.create(name='Grey Hoodie', price=40, category=cls.category, stock=5)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+        self.detail_url = reverse('store:product_detail', args=[self.product.pk])
+
+    def page_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        return response, [q['sql'] for q in ctx.captured_queries]
+
+    def test_warm_cache_skips_navbar_queries(self):
+        _, cold = self.page_queries(self.detail_url)
+        response, warm = self.page_queries(self.detail_url)
+        self.assertEqual(len(cold) - len(warm), 5)  # categories, wishlist count, cart count, recommendations, related products
+        self.assertFalse(any('store_wishlistitem' in sql for sql in warm))
+        self.assertContains(response, 'Hoodies')
+
+    def test_wishlist_change_invalidates_count(self):
+        self.page_queries(self.detail_url)
+        WishlistItem.objects.create(user=self.user, product=self.product)
+        response, _ = self.page_queries(self.detail_url)
+        self.assertEqual(response.context['wishlist_item_count'](), 1)
+
+    def test_category_change_invalidates_list(self):
+        self.page_queries(self.detail_url)
+        Category.objects.create(name='Sneakers')
+        response, _ = self.page_queries(self.detail_url)
+        self.assertContains(response, 'Sneakers')
+
+    def test_pages_without_sidebar_skip_category_query(self):
+        _, queries = self.page_queries(reverse('store:cart'))
+        self.assertFalse(any('FROM "store_category"' in sql for sql in queries))
+
+    def test_admin_pages_skip_navbar_queries(self):
+        self.user.is_staff = True
+        self.user.save()
+        _, queries = self.page_queries(reverse('store:product_list'))
+        self.assertFalse(any('store_wishlistitem' in sql for sql in queries))
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Shirts')
+        # Repeated prices exercise the (price, id) tie-breaker
+        cls.products = Product.objects.bulk_create([
+            Product(name=f'Shirt {i}', price=10 + i % 3, category=category) for i in range(25)
+        ])
+
+    def setUp(self):
+        cache.clear()
+
+    def walk(self, ordering, page_size=4):
+        seen, cursor = [], None
+        while True:
+            page, cursor, _ = keyset_page(Product.objects.all(), ordering, cursor, page_size)
+            seen.extend(page)
+            if cursor is None:
+                return seen
+
+    def test_walks_every_row_once_in_order(self):
+        expected = list(Product.objects.order_by('price', 'id'))
+        self.assertEqual(self.walk(('price', 'id')), expected)
+        self.assertEqual(self.walk(('-price', '-id')), expected[::-1])
+
+    def test_previous_cursor_returns_previous_page(self):
+        first, next_cursor, _ = keyset_page(Product.objects.all(), ('id',), None, 5)
+        second, _, previous_cursor = keyset_page(Product.objects.all(), ('id',), next_cursor, 5)
+        back, _, none = keyset_page(Product.objects.all(), ('id',), previous_cursor, 5)
+        self.assertEqual(back, first)
+        self.assertIsNone(none)
+        self.assertEqual(second[0].pk, first[-1].pk + 1)
+
+    def test_deep_page_does_not_offset(self):
+        _, cursor, _ = keyset_page(Product.objects.all(), ('id',), None, 20)
+        with CaptureQueriesContext(connection) as ctx:
+            keyset_page(Product.objects.all(), ('id',), cursor, 20)
+        self.assertNotIn('OFFSET', ctx.captured_queries[0]['sql'])
+
+    def test_api_cursor_mode(self):
+        url = reverse('store:product-list')
+        data = self.client.get(url, {'paginate': 'cursor', 'ordering': 'price'}).json()
+        self.assertEqual(data['count'], 25)
+        self.assertEqual(len(data['results']), 10)
+        self.assertNotIn('paginate=', data['next'])
+        names = [row['name'] for row in data['results']]
+        names += [row['name'] for row in self.client.get(data['next']).json()['results']]
+        expected = [p.name for p in Product.objects.order_by('price', 'id')[:20]]
+        self.assertEqual(names, expected)
+
+    def test_api_defaults_to_page_numbers(self):
+        data = self.client.get(reverse('store:product-list'), {'page': 2}).json()
+        self.assertEqual(data['count'], 25)
+        self.assertIn('page=3', data['next'])
+
+    def test_storefront_next_link(self):
+        response = self.client.get(reverse('store:index'), {'category': self.products[0].category_id})
+        self.assertEqual(len(response.context['products']), 12)
+        response = self.client.get(reverse('store:index'), {'cursor': response.context['next_cursor']})
+        self.assertEqual(response.context['products'][0], self.products[12])
+
+    def test_tampered_cursors_are_rejected(self):
+        def token(payload):
+            return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+        first = list(Product.objects.order_by('id')[:12])
+        for payload, ordering in [
+            ({'v': 5}, 'id'), ({'v': ['x']}, 'id'), ({'v': [None]}, 'id'), ({'v': [1], 'r': 'yes'}, 'id'),
+            ({'v': ['x', 1]}, 'price'), ({'v': [[10], 1]}, 'price'),
+        ]:
+            with self.subTest(payload=payload):
+                cursor = token(payload)
+                with self.assertRaises(InvalidCursor):
+                    keyset_page(Product.objects.all(), {'id': ('id',), 'price': ('price', 'id')}[ordering], cursor, 4)
+                response = self.client.get(reverse('store:product-list'), {'cursor': cursor, 'ordering': ordering})
+                self.assertEqual(response.status_code, 404)
+                response = self.client.get(reverse('store:index'), {'cursor': cursor})
+                self.assertEqual(list(response.context['products']), first)
+
+
+class ApiQueryCountTests(TestCase):
+    """List endpoints must cost the same number of queries for 1 row or a full page."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='api', password='secret', is_staff=True)
+        cls.categories = Category.objects.bulk_create([Category(name=f'Cat {i}') for i in range(10)])
+        cls.products = Product.objects.bulk_create([
+            Product(name=f'Item {i}', price=5, category=cls.categories[i], stock=100) for i in range(10)
+        ])
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def create_rows(self, count):
+        CartItem.objects.bulk_create([CartItem(user=self.user, product=p) for p in self.products[:count]])
+        WishlistItem.objects.bulk_create([WishlistItem(user=self.user, product=p) for p in self.products[:count]])
+        for i in range(count):
+            order = Order.objects.create(user=self.user, first_name='A', email='a@example.com', address='-',
+                                         city='-', phone='-', total_amount=10, payment_method='cash')
+            OrderItem.objects.bulk_create([OrderItem(order=order, product=p, price=p.price) for p in self.products[:3]])
+
+    def assertConstantQueries(self, url_name, **params):
+        url = reverse(f'store:{url_name}')
+        counts = []
+        for count in (1, 10):
+            CartItem.objects.all().delete()
+            WishlistItem.objects.all().delete()
+            Order.objects.all().delete()
+            self.create_rows(count)
+            cache.clear()
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            counts.append(len(ctx))
+        self.assertEqual(counts[0], counts[1], f"{url_name}: {counts[0]} queries for 1 row, {counts[1]} for 10")
+
+    def test_list_endpoints_have_constant_query_counts(self):
+        for url_name in ('product-list', 'category-list', 'cart-item-list', 'wishlist-item-list', 'order-list'):
+            with self.subTest(url_name):
+                self.assertConstantQueries(url_name)
+        self.assertConstantQueries('order-list', paginate='cursor')
+
+    def test_orders_include_items(self):
+        self.create_rows(1)
+        data = self.client.get(reverse('store:order-list')).json()
+        self.assertEqual(len(data['results'][0]['items']), 3)
+        self.assertEqual(data['results'][0]['items'][0]['product_details']['category_name'], 'Cat 0')
+
+
+class FastReadTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Shoes', description='Footwear')
+        Product.objects.create(name='Jordan 1', description='High top', price='180.5', category=category,
+                               image='products/Jordan_1.jpg', stock=3)
+        Product.objects.create(name='Sandals', price=12, category=category)
+
+    def setUp(self):
+        cache.clear()
+
+    def assertSameResponse(self, url, params=None):
+        slow = self.client.get(url, params)
+        with override_settings(STORE_FAST_API_READS=True):
+            fast = self.client.get(url, params)
+        self.assertEqual(slow.status_code, 200)
+        self.assertEqual(fast.content, slow.content)
+
+    def test_fast_reads_are_byte_identical(self):
+        product = Product.objects.get(name='Jordan 1')
+        self.assertSameResponse(reverse('store:product-list'))
+        self.assertSameResponse(reverse('store:product-list'), {'paginate': 'cursor', 'ordering': 'price'})
+        self.assertSameResponse(reverse('store:product-detail', args=[product.pk]))
+        self.assertSameResponse(reverse('store:category-list'))
+
+    @override_settings(STORE_FAST_API_READS=True)
+    def test_fast_retrieve_missing_product_is_404(self):
+        self.assertEqual(self.client.get(reverse('store:product-detail', args=[999999])).status_code, 404)
+
+
+class CatalogHttpCachingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Boots')
+        cls.product = Product.objects.create(name='Brown Boots', price=90, category=cls.category, stock=4)
+
+    def setUp(self):
+        cache.clear()
+
+    def assertRevalidates(self, url):
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        self.assertTrue(first['ETag'].startswith('"'))
+        self.assertIn('Last-Modified', first)
+
+        with CaptureQueriesContext(connection) as ctx:
+            second = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 304)
+        self.assertFalse(any('store_product' in q['sql'] for q in ctx.captured_queries))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.stock = 3
+            self.product.save()
+        third = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(third.status_code, 200)
+        self.assertNotEqual(third['ETag'], first['ETag'])
+
+    def test_api_endpoints(self):
+        self.assertRevalidates(reverse('store:product-list'))
+        self.assertRevalidates(reverse('store:product-detail', args=[self.product.pk]))
+        self.assertRevalidates(reverse('store:category-list'))
+        response = self.client.get(reverse('store:product-list'))
+        self.assertIn('public', response['Cache-Control'])
+        self.assertIn('s-maxage=60', response['Cache-Control'])
+
+    def test_storefront_pages(self):
+        self.assertRevalidates(reverse('store:index'))
+        self.assertRevalidates(reverse('store:product_detail', args=[self.product.pk]))
+
+    def test_logged_in_pages_are_private_and_track_the_cart(self):
+        user = User.objects.create_user(username='etag', password='secret')
+        self.client.force_login(user)
+        url = reverse('store:index')
+        first = self.client.get(url)
+        self.assertIn('private', first['Cache-Control'])
+        DBCart(user).add(self.product.pk)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 200)
+
+    def checkout(self, quantity):
+        user, _ = User.objects.get_or_create(username='buyer')
+        with self.captureOnCommitCallbacks(execute=True):
+            place_order(user, [{'product': self.product, 'quantity': quantity}], 'cash')
+
+    def test_checkouts_bump_the_version_at_most_once_per_interval(self):
+        CatalogVersion.objects.update(updated_at=timezone.now() - timedelta(minutes=5))
+        url = reverse('store:product-detail', args=[self.product.pk])
+        etag = self.client.get(url)['ETag']
+        self.checkout(1)
+        second = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(second.status_code, 200)
+        self.checkout(1)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=second['ETag']).status_code, 304)
+
+    def test_selling_out_always_bumps_the_version(self):
+        url = reverse('store:product-detail', args=[self.product.pk])
+        etag = self.client.get(url)['ETag']
+        self.checkout(1)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.checkout(3)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class FragmentCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Sandals')
+        cls.products = [
+            Product.objects.create(name=f'Sandal {i}', price=20 + i, category=cls.category, stock=5)
+            for i in range(6)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def product_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, [q['sql'] for q in ctx.captured_queries if 'store_product' in q['sql']]
+
+    def test_related_products_come_from_cache(self):
+        url = reverse('store:product_detail', args=[self.products[0].pk])
+        response, cold = self.product_queries(url)
+        self.assertEqual(
+            [p.pk for p in response.context['related_products']()],
+            [p.pk for p in self.products[1:5]],
+        )
+        self.assertContains(response, 'Sandal 4')
+        self.assertNotContains(response, 'Sandal 5')
+
+        response, warm = self.product_queries(url)
+        self.assertEqual(len(warm), 1)  # only the product itself
+        self.assertLess(len(warm), len(cold))
+        self.assertContains(response, 'Sandal 4')
+
+    def test_product_change_refreshes_fragments(self):
+        url = reverse('store:index')
+        self.assertContains(self.client.get(url), 'Sandal 2')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.products[2].name = 'Renamed Slide'
+            self.products[2].save()
+        response = self.client.get(url)
+        self.assertContains(response, 'Renamed Slide')
+        self.assertNotContains(response, 'Sandal 2<')
+        self.assertContains(response, 'Sandals')  # category label on the card
+
+
+class SalesRollupTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user(username='boss', password='secret', is_staff=True)
+        cls.shoes = Category.objects.create(name='Shoes')
+        cls.boots = Product.objects.create(name='Boots', price=50, category=cls.shoes, stock=100)
+        cls.heels = Product.objects.create(name='Heels', price=80, category=cls.shoes, stock=100)
+
+    def place(self, method, *lines):
+        with self.captureOnCommitCallbacks(execute=True):
+            return place_order(
+                self.staff, [{'product': p, 'quantity': q} for p, q in lines], method,
+                first_name='Dara', email='dara@example.com', address='St 1', city='Phnom Penh', phone='012',
+            )
+
+    def rollups(self):
+        return sorted(
+            DailySalesRollup.objects.values_list('category_id', 'product_id', 'revenue', 'orders', 'units'),
+            key=lambda row: (row[0] or 0, row[1] or 0),
+        )
+
+    def test_paid_orders_are_rolled_up(self):
+        self.place('khqr', (self.boots, 2), (self.heels, 1))
+        self.place('khqr', (self.boots, 1))
+        self.place('cod', (self.heels, 5))  # pending, not counted
+        self.assertEqual(self.rollups(), [
+            (None, None, 234, 2, 4),
+            (None, self.boots.pk, 150, 2, 3),
+            (None, self.heels.pk, 80, 1, 1),
+            (self.shoes.pk, None, 230, 2, 4),
+        ])
+        self.assertEqual([p['product__name'] for p in top_products()], ['Boots', 'Heels'])
+
+    def test_status_changes_update_rollups(self):
+        pending = self.place('cod', (self.heels, 2))
+        self.assertFalse(DailySalesRollup.objects.exists())
+        with self.captureOnCommitCallbacks(execute=True):
+            pending.status = 'Paid'
+            pending.save()
+        self.assertEqual(self.rollups()[0], (None, None, 162, 1, 2))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            pending.status = 'Shipped'
+            pending.save()
+        self.assertEqual(self.rollups()[0], (None, None, 162, 1, 2))
+
+        order = Order.objects.get(pk=pending.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            order.status = 'Cancelled'
+            order.save()
+        self.assertEqual(self.rollups()[0], (None, None, 0, 0, 0))
+
+    @override_settings(STORE_JOB_QUEUE=True)
+    def test_queued_updates_and_deletes_land_in_any_order(self):
+        def run_jobs():
+            for job in Job.objects.filter(name='store.reports.apply_order'):
+                reports.apply_order(**job.kwargs)
+
+        kept = self.place('khqr', (self.boots, 1))
+        run_jobs()
+        doomed = self.place('khqr', (self.boots, 2))
+        with self.captureOnCommitCallbacks(execute=True):
+            doomed.delete()  # before its job has run
+        run_jobs()
+        run_jobs()
+        self.assertEqual(self.rollups()[0], (None, None, 52, 1, 1))
+        self.assertTrue(Order.objects.get(pk=kept.pk).rollup_applied)
+
+    def test_rebuild_matches_incremental_rollups(self):
+        self.place('khqr', (self.boots, 2), (self.heels, 1))
+        self.place('aba_payway', (self.heels, 3))
+        incremental = self.rollups()
+        rebuild_sales_rollups()
+        self.assertEqual(self.rollups(), incremental)
+
+    def test_dashboard_queries_do_not_grow_with_orders(self):
+        self.client.force_login(self.staff)
+        self.place('khqr', (self.boots, 1))
+        with CaptureQueriesContext(connection) as few:
+            response = self.client.get(reverse('store:admin_dashboard'))
+        self.assertEqual(response.context['revenue'], 52)
+        for _ in range(5):
+            self.place('khqr', (self.boots, 1), (self.heels, 1))
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get(reverse('store:admin_dashboard'))
+        self.assertEqual(response.context['revenue'], 52 + 5 * 132)
+        self.assertEqual(response.context['today']['orders'], 6)
+        self.assertEqual(len(many), len(few))
+
+
+class IndexReportTests(TestCase):
+    def test_flags_table_scans_only(self):
+        self.assertEqual(sequential_scans('3 0 0 SCAN store_order'), ['store_order'])
+        self.assertEqual(sequential_scans('Seq Scan on store_product  (cost=0.00..1.01 rows=1)'), ['store_product'])
+        self.assertEqual(sequential_scans('3 0 0 SCAN store_order USING INDEX order_created_idx'), [])
+        self.assertEqual(sequential_scans('Index Scan using product_price_id_idx on store_product'), [])
+
+
+class ImageVariantTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media)
+        overrides = self.settings(MEDIA_ROOT=self.media)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.category = Category.objects.create(name='Jackets')
+
+    def upload(self, name, size=(800, 1000)):
+        buffer = io.BytesIO()
+        Image.new('RGB', size, 'navy').save(buffer, format='PNG')
+        with self.captureOnCommitCallbacks(execute=True):
+            return Product.objects.create(
+                name=name, price=60, category=self.category,
+                image=SimpleUploadedFile(f'{name}.png', buffer.getvalue(), content_type='image/png'),
+            )
+
+    def test_variants_are_built_on_upload_under_content_hashes(self):
+        product = self.upload('Rain Jacket')
+        manifest = images.read_manifest(product.image.name)
+        widths = [width for width, _ in manifest['sources']['webp']]
+        self.assertEqual(widths, [160, 320, 640, 800])  # never upscaled past the original
+        for fmt, _, _, _ in images.FORMATS:
+            for _, name in manifest['sources'][fmt]:
+                self.assertTrue(product.image.storage.exists(name))
+
+        # Same bytes under another product: same derivative names
+        twin = self.upload('Rain Jacket Twin')
+        self.assertEqual(images.get_variants(twin.image)['sources'], manifest['sources'])
+
+        # The manifest outlives the cache: no rebuild, no job
+        cache.clear()
+        with mock.patch.object(jobs, 'enqueue') as enqueue:
+            self.assertEqual(images.get_variants(product.image), manifest)
+        enqueue.assert_not_called()
+
+    def test_picture_tag_renders_srcset(self):
+        product = self.upload('Wind Jacket', size=(300, 300))
+        html = Template('{% load store_images %}{% picture image alt="Wind" %}').render(Context({'image': product.image}))
+        self.assertIn('type="image/webp"', html)
+        self.assertIn('-160w.webp 160w', html)
+        self.assertIn('-300w.jpg', html)
+        self.assertIn('loading="lazy"', html)
+
+    def test_missing_original_falls_back_to_upload_url(self):
+        product = Product.objects.create(name='Ghost', price=1, category=self.category, image='products/missing.png')
+        with self.assertLogs('store.images', 'WARNING'), self.captureOnCommitCallbacks(execute=True):
+            html = Template('{% load store_images %}{% picture image %}').render(Context({'image': product.image}))
+        self.assertIn('src="/media/products/missing.png"', html)
+        self.assertNotIn('srcset', html)
+
+    @override_settings(STORE_JOB_QUEUE=True)
+    def test_uncached_image_renders_the_original_and_queues_its_variants(self):
+        product = self.upload('Snow Jacket', size=(300, 300))
+        cache.clear()
+        render = Template('{% load store_images %}{% picture image %}').render
+        html = render(Context({'image': product.image}))
+        self.assertIn(f'src="{product.image.url}"', html)
+        self.assertNotIn('srcset', html)
+        render(Context({'image': product.image}))
+        job = Job.objects.get(name='store.images.build_image_variants')  # queued once
+
+        version = CatalogVersion.objects.get().version
+        with self.captureOnCommitCallbacks(execute=True):
+            images.build_image_variants(**job.kwargs)
+        self.assertIn('-300w.jpg', render(Context({'image': product.image})))
+        # Fragments cached with the original are dropped
+        self.assertEqual(CatalogVersion.objects.get().version, version + 1)
+
+
+class MediaServingTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media)
+        overrides = self.settings(MEDIA_ROOT=self.media, STORE_MEDIA_ACCEL_REDIRECT='')
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.storage = HashedMediaStorage()
+        self.body = bytes(range(256)) * 4
+        self.name = self.storage.save('products/Boots Photo.PNG', ContentFile(self.body))
+
+    def get(self, path, **headers):
+        response = serve_media(RequestFactory().get(f'/media/{path}', headers=headers), path)
+        self.addCleanup(response.close)
+        return response
+
+    def test_uploads_get_content_hashed_names(self):
+        self.assertRegex(self.name, r'^products/Boots Photo\.[0-9a-f]{12}\.png$')
+        self.assertEqual(self.storage.save('products/copy.png', ContentFile(self.body)).split('.')[-2],
+                         self.name.split('.')[-2])
+        self.assertEqual(self.storage.save('products/Boots Photo.PNG', ContentFile(self.body)), self.name)
+        self.assertEqual(self.storage.save('other/plain.txt', ContentFile(b'x')), 'other/plain.txt')
+
+    def test_hashed_files_are_immutable_and_revalidate(self):
+        response = self.get(self.name)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.body)
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn('max-age=31536000', response['Cache-Control'])
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertEqual(self.get(self.name, if_none_match=response['ETag']).status_code, 304)
+
+        self.storage.save('other/plain.txt', ContentFile(b'x'))
+        self.assertNotIn('immutable', self.get('other/plain.txt')['Cache-Control'])
+
+    def test_byte_ranges(self):
+        response = self.get(self.name, range='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 10-19/{len(self.body)}')
+        self.assertEqual(b''.join(response.streaming_content), self.body[10:20])
+
+        suffix = self.get(self.name, range='bytes=-5')
+        self.assertEqual(b''.join(suffix.streaming_content), self.body[-5:])
+        self.assertEqual(self.get(self.name, range='bytes=5000-').status_code, 416)
+        self.assertEqual(self.get(self.name, range='bytes=500-100').status_code, 200)  # invalid: ignored
+        self.assertEqual(self.get(self.name, range='bytes=0-9', if_range='"stale"').status_code, 200)
+
+    def test_rejects_paths_outside_media_root(self):
+        with self.assertRaises(Http404):
+            self.get('../settings.py')
+        with self.assertRaises(Http404):
+            self.get('products/missing.png')
+
+
+class BulkApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user(username='supplier', password='secret', is_staff=True)
+        cls.shoes = Category.objects.create(name='Shoes')
+        cls.boots = Product.objects.create(name='Boots', description='Leather', price=50, category=cls.shoes, stock=3)
+
+    def setUp(self):
+        self.client.force_login(self.staff)
+
+    def send(self, method, url, payload):
+        with self.captureOnCommitCallbacks(execute=True):
+            return getattr(self.client, method)(url, payload, content_type='application/json')
+
+    def test_bulk_upsert_reports_row_errors(self):
+        version = CatalogVersion.objects.get().version
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.send('post', reverse('store:product-bulk'), [
+                {'name': 'Boots', 'price': '55.00', 'category': self.shoes.pk},
+                {'name': 'Sandals', 'price': '20.00', 'category': self.shoes.pk, 'stock': 7},
+                {'name': 'Ghost', 'price': '1.00', 'category': 999},
+                {'name': 'Sandals', 'price': '25.00', 'category': self.shoes.pk},
+                {'price': '-1', 'category': self.shoes.pk},
+            ])
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual((body['created'], body['updated']), (1, 1))
+        self.assertEqual([error['index'] for error in body['errors']], [2, 3, 4])
+        self.assertIn('category', body['errors'][0]['errors'])
+        self.assertEqual(set(body['errors'][2]['errors']), {'name', 'price'})
+
+        self.boots.refresh_from_db()
+        self.assertEqual((self.boots.price, self.boots.description, self.boots.stock), (55, 'Leather', 3))
+        self.assertEqual(Product.objects.get(name='Sandals').stock, 7)
+        self.assertEqual(CatalogVersion.objects.get().version, version + 1)
+        self.assertLess(len(ctx.captured_queries), 20)
+
+    def test_bulk_stock_update(self):
+        sandals = Product.objects.create(name='Sandals', price=20, category=self.shoes, stock=0)
+        response = self.send('patch', reverse('store:product-stock'), [
+            {'id': self.boots.pk, 'stock': 10},
+            {'id': str(sandals.pk), 'stock': 4},
+            {'id': 999, 'stock': 1},
+            {'id': sandals.pk, 'stock': -2},
+        ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['updated'], 2)
+        self.assertEqual([error['index'] for error in response.json()['errors']], [2, 3])
+        self.assertEqual(
+            list(Product.objects.order_by('id').values_list('stock', flat=True)), [10, 4]
+        )
+
+    def test_bulk_categories_and_permissions(self):
+        response = self.send('post', reverse('store:category-bulk'), [{'name': 'Shoes', 'description': 'All shoes'},
+                                                                      {'name': 'Hats'}])
+        self.assertEqual(response.json()['created'], 1)
+        self.assertEqual(Category.objects.get(name='Shoes').description, 'All shoes')
+
+        self.assertEqual(self.send('post', reverse('store:product-bulk'), {'name': 'x'}).status_code, 400)
+        self.assertEqual(self.send('post', reverse('store:product-bulk'), [{'name': 'x'}]).status_code, 400)
+        self.client.force_login(User.objects.create_user(username='shopper'))
+        self.assertEqual(self.send('post', reverse('store:product-bulk'), []).status_code, 403)
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user(username='accountant', is_staff=True)
+        cls.customer = User.objects.create_user(username='customer')
+        category = Category.objects.create(name='Shoes')
+        cls.boots = Product.objects.create(name='Boots', price=50, category=category, stock=5)
+        cls.hat = Product.objects.create(name='Hat, "wool"', price=10, category=category, stock=5)
+        order_fields = dict(first_name='Dara', email='d@example.com', address='-', city='-', phone='-',
+                            payment_method='cash')
+        cls.paid = Order.objects.create(user=cls.customer, total_amount=110, status='Paid', **order_fields)
+        OrderItem.objects.create(order=cls.paid, product=cls.boots, quantity=2, price=50)
+        OrderItem.objects.create(order=cls.paid, product=cls.hat, quantity=1, price=10)
+        cls.empty = Order.objects.create(user=cls.staff, total_amount=0, status='Pending', **order_fields)
+        cls.old = Order.objects.create(user=cls.staff, total_amount=50, status='Paid', **order_fields)
+        OrderItem.objects.create(order=cls.old, product=cls.boots, quantity=1, price=50)
+        Order.objects.filter(pk=cls.old.pk).update(created_at=timezone.now() - timedelta(days=30))
+
+    def export(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_has_one_line_per_item(self):
+        self.client.force_login(self.staff)
+        rows = list(csv.reader(io.StringIO(self.export(reverse('store:order-export')))))
+        self.assertEqual(rows[0][:2], ['order_id', 'user_id'])
+        self.assertEqual([row[0] for row in rows[1:]], [str(self.paid.pk)] * 2 + [str(self.empty.pk), str(self.old.pk)])
+        self.assertEqual(rows[2][-3:], ['Hat, "wool"', '1', '10.00'])
+        self.assertEqual(rows[3][-5:], [''] * 5)
+
+    def test_ndjson_filters_by_date_and_status(self):
+        self.client.force_login(self.staff)
+        today = timezone.localdate().isoformat()
+        lines = self.export(reverse('store:order-export'), format='ndjson', start=today, status=['Paid', 'Shipped'])
+        documents = [json.loads(line) for line in lines.splitlines()]
+        self.assertEqual([doc['id'] for doc in documents], [self.paid.pk])
+        self.assertEqual([(item['product_name'], item['price']) for item in documents[0]['items']],
+                         [('Boots', '50.00'), ('Hat, "wool"', '10.00')])
+
+        response = self.client.get(reverse('store:order-export'), {'start': today, 'end': '2000-01-01'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_customers_export_their_own_orders(self):
+        self.client.force_login(self.customer)
+        lines = self.export(reverse('store:order-export'), format='ndjson').splitlines()
+        self.assertEqual([json.loads(line)['id'] for line in lines], [self.paid.pk])
+        self.assertEqual(self.client.get(reverse('store:product-export')).status_code, 403)
+
+    def test_product_export_and_command(self):
+        self.client.force_login(self.staff)
+        lines = self.export(reverse('store:product-export'), format='ndjson').splitlines()
+        self.assertEqual(json.loads(lines[1])['category_name'], 'Shoes')
+
+        out = io.StringIO()
+        call_command('export_orders', '--status', 'Paid', '--format', 'csv', stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 4)  # header + 3 items of the two paid orders
+
+
+class ProductImportTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media)
+        overrides = self.settings(MEDIA_ROOT=self.media)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.shoes = Category.objects.create(name='Shoes')
+        self.boots = Product.objects.create(name='Boots', description='Leather', price=50, category=self.shoes, stock=3)
+
+    def write(self, name, content):
+        path = os.path.join(self.media, name)
+        with open(path, 'w', encoding='utf-8') as fileobj:
+            fileobj.write(content)
+        return path
+
+    def run_import(self, *args):
+        out, err = io.StringIO(), io.StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('import_products', *args, '--chunk-size', '2', stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_csv_upserts_by_name_and_reports_bad_rows(self):
+        path = self.write('products.csv', (
+            'name,price,category,stock,description\n'
+            'Boots,55.00,Shoes,,\n'
+            'Cap,12.50,Hats,4,Cotton\n'
+            'Scarf,-1,Hats,1,Wool\n'
+            'Gloves,8,Hats,2,Knit\n'
+        ))
+        out, err = self.run_import(path)
+        self.assertIn('Imported 3 of 4 rows (2 created, 1 updated)', out)
+        self.assertIn('row 3:', err)
+
+        self.boots.refresh_from_db()
+        self.assertEqual((self.boots.price, self.boots.stock, self.boots.description), (55, 3, 'Leather'))  # blank cells keep stored values
+        hats = Category.objects.get(name='Hats')
+        self.assertEqual(list(Product.objects.filter(category=hats).order_by('name').values_list('name', 'stock')), [('Cap', 4), ('Gloves', 2)])
+
+    def test_jsonl_without_creating_categories(self):
+        path = self.write('products.jsonl', '{"name": "Sandals", "price": "20", "category": "Shoes"}\n'
+                                            'not json\n\n'
+                                            '{"name": "Beret", "price": "9", "category": "Hats"}\n')
+        out, err = self.run_import(path, '--no-create-categories')
+        self.assertIn('Imported 1 of 3 rows', out)
+        self.assertIn('row 2:', err)
+        self.assertIn('Unknown category "Hats"', err)
+        self.assertFalse(Category.objects.filter(name='Hats').exists())
+
+    def test_images_are_stored_once_from_a_directory(self):
+        source = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, source)
+        Image.new('RGB', (400, 300), 'teal').save(os.path.join(source, 'runner.png'))
+        path = self.write('products.csv', (
+            'name,price,category,image\n'
+            'Runner,70,Shoes,runner.png\n'
+            'Runner Pro,90,Shoes,runner.png\n'
+            'Ghost,10,Shoes,missing.png\n'
+        ))
+        out, err = self.run_import(path, '--images', source)
+        self.assertIn('Imported 2 of 3 rows', out)
+        self.assertIn('missing.png', err)
+        names = set(Product.objects.filter(name__startswith='Runner').values_list('image', flat=True))
+        self.assertEqual(len(names), 1)
+        self.assertRegex(names.pop(), r'^products/runner\.[0-9a-f]{12}\.png$')
+        self.assertIsNotNone(images.read_manifest(Product.objects.get(name='Runner').image.name))
+
+    def test_admin_upload(self):
+        self.client.force_login(User.objects.create_superuser(username='admin', password='secret'))
+        url = reverse('admin:store_product_import')
+        self.assertContains(self.client.get(reverse('admin:store_product_changelist')), url)
+        upload = SimpleUploadedFile('catalog.csv', b'name,price,category\nLoafers,45,Shoes\n', content_type='text/csv')
+        response = self.client.post(url, {'file': upload, 'create_categories': 'on'})
+        self.assertRedirects(response, reverse('admin:store_product_changelist'))
+        self.assertTrue(Product.objects.filter(name='Loafers', category=self.shoes).exists())
+
+        bad = SimpleUploadedFile('catalog.xlsx', b'data')
+        self.assertContains(self.client.post(url, {'file': bad}), 'Upload a .csv or .jsonl file.')
+
+
+FAKE_REDIS_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': 'redis://redis-stand-in:6379/0',
+        'OPTIONS': {'connection_class': getattr(fakeredis, 'FakeConnection', None)},
+    }
+}
+
+
+class SessionBackendTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = Product.objects.create(name='Boots', price=50, category=Category.objects.create(name='Shoes'))
+
+    def session_queries(self, engine):
+        """django_session queries made by a warm anonymous cart page view."""
+        with self.settings(SESSION_ENGINE=f'django.contrib.sessions.backends.{engine}'):
+            client = Client()  # SessionMiddleware picks its engine when the handler loads
+            client.get(reverse('store:add_to_cart', args=[self.product.pk]))
+            client.get(reverse('store:cart'))
+            with CaptureQueriesContext(connection) as ctx:
+                response = client.get(reverse('store:cart'))
+        self.assertContains(response, 'Boots')
+        return [query for query in ctx.captured_queries if 'django_session' in query['sql']]
+
+    def test_cached_db_sessions_skip_the_session_table_on_reads(self):
+        cache.clear()
+        self.assertTrue(self.session_queries('db'))
+        self.assertEqual(self.session_queries('cached_db'), [])
+
+    @skipUnless(fakeredis, "fakeredis is not installed")
+    def test_redis_cache_backs_sessions(self):
+        with self.settings(CACHES=FAKE_REDIS_CACHES):
+            cache.clear()
+            self.assertEqual(self.session_queries('cached_db'), [])
+            self.assertEqual(self.session_queries('cache'), [])  # cart survives in Redis alone
+            cache.clear()
+
+
+@override_settings(STORE_PERF_SAMPLE_RATE=1, STORE_PERF_FLUSH_SECONDS=0)
+class PerfMiddlewareTests(TestCase):
+    def setUp(self):
+        perf.recorder.flush()  # drop samples taken by other tests
+        cache.clear()
+
+    def test_server_timing_counts_queries_and_repeats(self):
+        category = Category.objects.create(name='Shoes')
+        first, second = [Product.objects.create(name=name, price=5, category=category) for name in ('A', 'B')]
+
+        def view(request):
+            # The same statement twice: one repeat
+            list(Product.objects.filter(pk=first.pk))
+            list(Product.objects.filter(pk=second.pk))
+            return HttpResponse('ok')
+
+        with self.assertLogs('store.perf', 'INFO') as logs:
+            response = PerfMiddleware(view)(RequestFactory().get('/'))
+        self.assertRegex(response['Server-Timing'], r'^total;dur=[\d.]+, db;dur=[\d.]+;desc="2 queries, 1 repeated", tpl;dur=')
+        entry = json.loads(logs.output[0].split(':', 2)[2])
+        self.assertEqual((entry['view'], entry['queries'], entry['duplicates'], entry['bytes']), ('unresolved', 2, 1, 2))
+
+        with override_settings(STORE_PERF_SAMPLE_RATE=0):
+            self.assertNotIn('Server-Timing', PerfMiddleware(view)(RequestFactory().get('/')))
+
+    def test_dashboard_shows_percentiles_per_view(self):
+        for _ in range(3):
+            response = self.client.get(reverse('store:index'))
+            self.assertIn('tpl;dur=', response['Server-Timing'])
+        row = next(row for row in perf.summary() if row['view'] == 'store:index')
+        self.assertEqual(row['count'], 3)
+        self.assertLessEqual(row['p50'], row['p95'])
+        self.assertGreater(row['template_ms'], 0)
+
+        self.assertEqual(self.client.get(reverse('store:perf_dashboard')).status_code, 302)
+        self.client.force_login(User.objects.create_user(username='ops', is_staff=True))
+        self.assertContains(self.client.get(reverse('store:perf_dashboard'), {'hours': 24}), 'store:index')
+
+
+class LoadTestTests(TestCase):
+    def test_percentiles_use_nearest_rank(self):
+        result = percentiles([float(ms) for ms in range(1, 101)])
+        self.assertEqual((result['p50_ms'], result['p95_ms'], result['p99_ms'], result['max_ms']), (50, 95, 99, 100))
+        self.assertIsNone(percentiles([])['p95_ms'])
+
+    def test_seed_store_refuses_to_seed_twice_without_reset(self):
+        call_command('seed_store', products=30, categories=3, users=4, orders=12, stdout=io.StringIO())
+        self.assertEqual(Order.objects.count(), 12)
+        self.assertTrue(User.objects.get(username='bench_admin').is_staff)
+        with self.assertRaises(CommandError):
+            call_command('seed_store', products=30, users=4, orders=12, stdout=io.StringIO())
+
+        call_command('seed_store', products=20, categories=2, users=2, orders=5, reset=True, stdout=io.StringIO())
+        self.assertEqual((Product.objects.count(), Order.objects.count()), (20, 5))
+        self.assertEqual(User.objects.filter(username__startswith='bench_customer_').count(), 2)
+
+    def test_every_scenario_runs_cleanly(self):
+        call_command('seed_store', products=30, categories=3, users=2, orders=6, stdout=io.StringIO())
+        ctx = scenario_context()
+        self.assertTrue(ctx['orders'])
+        for name in SCENARIOS:
+            result = run_scenario(name, ClientSession, ctx, iterations=2)
+            self.assertEqual(result['errors'], 0, name)
+            self.assertGreater(result['mean_queries'], 0, name)
+
+
+class AsyncViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Shoes')
+        cls.products = [
+            Product.objects.create(name=f'Runner {i}', description='Light trainer', price=10 + i, category=category)
+            for i in range(15)
+        ]
+        cls.user = User.objects.create_user(username='ann', password='pw')
+        CartItem.objects.create(user=cls.user, product=cls.products[0], quantity=2)
+
+    def setUp(self):
+        cache.clear()
+
+    def use_async_views(self, enabled):
+        with override_settings(STORE_ASYNC_VIEWS=enabled):
+            importlib.reload(store_urls)
+        # The project URLconf's include() holds the old patterns
+        importlib.reload(importlib.import_module(settings.ROOT_URLCONF))
+        clear_url_caches()
+        if enabled:
+            self.addCleanup(self.use_async_views, False)
+
+    def test_async_views_are_routed_under_asgi_settings(self):
+        self.assertFalse(asyncio.iscoroutinefunction(resolve(reverse('store:index')).func))
+        self.use_async_views(True)
+        for url in (reverse('store:index'), reverse('store:cart'), reverse('store:product-list')):
+            self.assertTrue(asyncio.iscoroutinefunction(resolve(url).func), url)
+
+    async def test_pages_render_the_same_products(self):
+        detail = reverse('store:product_detail', args=[self.products[0].pk])
+        pages = [reverse('store:index'), reverse('store:index') + '?q=runner', detail]
+        expected = [await sync_to_async(self.client.get)(url) for url in pages]
+        await sync_to_async(self.use_async_views)(True)
+
+        for url, sync_response in zip(pages, expected):
+            response = await self.async_client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['ETag'], sync_response['ETag'])
+            for product in self.products[:12]:
+                self.assertEqual(product.name in response.content.decode(), product.name in sync_response.content.decode())
+            revalidated = await self.async_client.get(url, headers={'if-none-match': response['ETag']})
+            self.assertEqual(revalidated.status_code, 304)
+
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse('store:cart'))
+        self.assertEqual([line['quantity'] for line in response.context['cart_items']], [2])
+
+    @override_settings(STORE_FAST_API_READS=True)
+    async def test_catalog_list_api_is_byte_identical(self):
+        requests = [
+            (reverse('store:product-list'), {}),
+            (reverse('store:product-list'), {'page': 2}),
+            (reverse('store:product-list'), {'page': 'last', 'format': 'json'}),
+            (reverse('store:category-list'), {}),
+            (reverse('store:product-list'), {'page': 9}),
+        ]
+        expected = [await sync_to_async(self.client.get)(url, params) for url, params in requests]
+        await sync_to_async(self.use_async_views)(True)
+
+        for (url, params), sync_response in zip(requests, expected):
+            response = await self.async_client.get(url, params)
+            self.assertEqual((response.status_code, response.content), (sync_response.status_code, sync_response.content))
+            self.assertEqual(response['Allow'], sync_response['Allow'])
+        # Searches and writes are still the viewset's
+        response = await self.async_client.get(reverse('store:product-list'), {'search': 'runner'})
+        self.assertEqual(response.json()['count'], 15)
+        response = await self.async_client.post(reverse('store:product-list'), {}, content_type='application/json')
+        self.assertEqual(response.status_code, 403)
+
+    async def test_catalog_list_api_keeps_the_model_serializers_when_fast_reads_are_off(self):
+        expected = await sync_to_async(self.client.get)(reverse('store:product-list'), {'page': 2})
+        await sync_to_async(self.use_async_views)(True)
+        with mock.patch.object(FastProductSerializer, 'rows') as rows:
+            response = await self.async_client.get(reverse('store:product-list'), {'page': 2})
+        rows.assert_not_called()
+        self.assertEqual(response.content, expected.content)
+
+    async def test_exports_stream_asynchronously_under_asgi(self):
+        await self.async_client.aforce_login(await User.objects.acreate(username='ops', is_staff=True))
+        response = await self.async_client.get(reverse('store:product-export'), {'format': 'ndjson'})
+        self.assertTrue(response.is_async)
+        lines = b''.join([chunk async for chunk in response.streaming_content]).splitlines()
+        self.assertEqual(len(lines), 15)
+
+    @override_settings(STORE_PERF_SAMPLE_RATE=1)
+    async def test_perf_middleware_counts_async_view_queries(self):
+        await sync_to_async(self.use_async_views)(True)
+        response = await self.async_client.get(reverse('store:product-list'))
+        self.assertRegex(response['Server-Timing'], r'desc="[1-9]\d* queries')
+
+
+class ConnectionPoolReportTests(TestCase):
+    STATS = {'pool_min': 2, 'pool_max': 10, 'pool_size': 4, 'pool_available': 1, 'requests_waiting': 0,
+             'requests_num': 50, 'requests_wait_ms': 25}
+
+    def setUp(self):
+        cache.clear()
+
+    def test_report_without_published_stats(self):
+        pooled = bool(connection.settings_dict.get('OPTIONS', {}).get('pool'))
+        self.assertEqual(dbpool.pool_stats() is not None, pooled)
+        out = io.StringIO()
+        call_command('db_pool_report', stdout=out)
+        self.assertIn('No worker pool stats published', out.getvalue())
+
+    @override_settings(DB_POOL=True, STORE_POOL_STATS_SECONDS=0)
+    def test_workers_publish_pool_stats_after_requests(self):
+        with mock.patch.object(dbpool, 'pool_stats', return_value=self.STATS):
+            self.client.get(reverse('store:index'))
+        [(worker, stats)] = dbpool.worker_stats().items()
+        self.assertEqual(worker.rsplit(':', 1)[1], str(os.getpid()))
+        self.assertEqual(stats['pool_size'], 4)
+
+        out = io.StringIO()
+        call_command('db_pool_report', stdout=out)
+        self.assertRegex(out.getvalue(), rf'{worker}\s+3\s+4\s+10\s+0\s+50\s+0.50')
+        self.assertIn('1 worker: 3/4 pooled connections in use (up to 10), 0 requests waiting', out.getvalue())
+
+
+class ReplicaRoutingTests(TransactionTestCase):
+    """A second SQLite database stands in for a replica that has not caught
+    up with the primary yet."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Registered after the test database setup, which only knows DATABASES
+        cls.replica_dir = tempfile.mkdtemp()
+        connections.settings['replica'] = {
+            **connections.settings['default'],
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(cls.replica_dir, 'replica.sqlite3'),
+            'OPTIONS': {},
+        }
+        cls.databases = cls.databases | {'replica'}
+        call_command('migrate', database='replica', verbosity=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        connections['replica'].close()
+        del connections['replica']
+        del connections.settings['replica']
+        shutil.rmtree(cls.replica_dir)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(name='Shoes')
+        self.product = Product.objects.create(name='Trail runner v2', price=50, category=category, stock=10)
+        CatalogVersion.objects.update_or_create(pk=1, defaults={'version': 2})
+        # The replica still has the product's old name
+        Category.objects.using('replica').bulk_create([Category(pk=category.pk, name='Shoes')])
+        Product.objects.using('replica').bulk_create([
+            Product(pk=self.product.pk, name='Trail runner v1', price=50, category_id=category.pk, stock=10),
+        ])
+        CatalogVersion.objects.using('replica').update_or_create(pk=1, defaults={'version': 1})
+        override = override_settings(STORE_READ_REPLICAS=['replica'], REPLICA_PIN_SECONDS=5)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_catalog_reads_come_from_a_replica(self):
+        for url in (reverse('store:index'), reverse('store:product_detail', args=[self.product.pk])):
+            response = self.client.get(url)
+            self.assertContains(response, 'Trail runner v1')
+            self.assertNotIn(replicas.PIN_COOKIE, response.cookies)
+        response = self.client.get(reverse('store:product-list'))
+        self.assertEqual([product['name'] for product in response.json()['results']], ['Trail runner v1'])
+        response = self.client.get(reverse('store:product-detail', args=[self.product.pk]))
+        self.assertEqual(response.json()['name'], 'Trail runner v1')
+        # Everything else reads from the primary
+        response = self.client.get(reverse('store:add_to_cart', args=[self.product.pk]), follow=True)
+        self.assertContains(response, 'Trail runner v2')
+
+    def test_a_write_pins_the_client_to_the_primary(self):
+        response = self.client.get(reverse('store:add_to_cart', args=[self.product.pk]))
+        self.assertEqual(response.cookies[replicas.PIN_COOKIE]['max-age'], 5)
+
+        response = self.client.get(reverse('store:index'))
+        self.assertContains(response, 'Trail runner v2')
+        self.assertEqual(response.context['cart_item_count'](), 1)
+        self.assertContains(Client().get(reverse('store:index')), 'Trail runner v1')
+
+    def test_router_keeps_writes_and_transactions_on_the_primary(self):
+        with replicas.replica_reads():
+            product = Product.objects.get(pk=self.product.pk)
+            self.assertEqual(product._state.db, 'replica')
+            with transaction.atomic():
+                self.assertEqual(Product.objects.get(pk=self.product.pk).name, 'Trail runner v2')
+            product.stock = 9
+            product.save(update_fields=['stock'])
+            # Once the block has written it reads its own writes
+            self.assertEqual(Product.objects.get(pk=self.product.pk).stock, 9)
+        self.assertEqual(Product.objects.using('replica').get(pk=self.product.pk).stock, 10)
+        self.assertEqual(Product.objects.get(pk=self.product.pk).stock, 9)
+
+    @override_settings(STORE_READ_REPLICAS=[])
+    def test_without_replicas_everything_uses_the_primary(self):
+        with replicas.replica_reads():
+            self.assertEqual(Product.objects.get(pk=self.product.pk).name, 'Trail runner v2')
+        self.assertContains(self.client.get(reverse('store:index')), 'Trail runner v2')
+        response = self.client.get(reverse('store:add_to_cart', args=[self.product.pk]))
+        self.assertNotIn(replicas.PIN_COOKIE, response.cookies)
+
+
+JOB_CALLS = []
+
+
+def record_job(key):
+    JOB_CALLS.append(key)
+
+
+def failing_job():
+    raise ValueError("payment provider unavailable")
+
+
+@override_settings(STORE_JOB_QUEUE=True, STORE_JOB_MAX_ATTEMPTS=2, STORE_JOB_RETRY_DELAY=10)
+class JobQueueTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='dara', password='secret', email='dara@example.com')
+        cls.boots = Product.objects.create(name='Boots', price=50, category=Category.objects.create(name='Shoes'), stock=10)
+
+    def test_checkout_queues_follow_up_work(self):
+        self.client.force_login(self.user)
+        self.client.get(reverse('store:add_to_cart', args=[self.boots.pk]))
+        response = self.client.post(reverse('store:checkout'), {
+            'name': 'Dara', 'location': 'St 1', 'city': 'Phnom Penh', 'phone': '012', 'payment_method': 'khqr',
+        })
+        order = Order.objects.get()
+        self.assertRedirects(response, reverse('store:order_success', args=[order.pk]))
+        self.assertEqual(
+            sorted(Job.objects.values_list('name', flat=True)),
+            ['store.orders.send_order_confirmation', 'store.reports.apply_order'],
+        )
+        self.assertEqual(mail.outbox, [])
+        self.assertFalse(DailySalesRollup.objects.exists())
+
+        with self.assertLogs('store.jobs', 'INFO'):
+            self.assertEqual(jobs.work(burst=True), (2, 0))
+        self.assertFalse(Job.objects.exists())
+        [email] = mail.outbox
+        self.assertEqual((email.subject, email.to), (f"Your order #{order.pk} is confirmed", ['dara@example.com']))
+        self.assertIn('Boots x 1: $50.00', email.body)
+        self.assertEqual(DailySalesRollup.objects.get(category=None, product=None).revenue, 52)
+
+    def test_rolled_back_work_is_never_queued(self):
+        with self.assertRaises(OutOfStock):
+            place_order(self.user, [{'product': self.boots, 'quantity': 11}], 'khqr', email='dara@example.com')
+        self.assertFalse(Job.objects.exists())
+
+    def test_failures_are_retried_with_backoff_then_kept(self):
+        job = jobs.enqueue(failing_job)
+        with self.assertLogs('store.jobs', 'WARNING'):
+            self.assertEqual(jobs.work(burst=True), (0, 1))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+        self.assertGreater(job.run_at, timezone.now() + timedelta(seconds=9))
+        self.assertIn('payment provider unavailable', job.last_error)
+        self.assertEqual(jobs.work(burst=True), (0, 0))  # not due yet
+
+        Job.objects.update(run_at=timezone.now())
+        with self.assertLogs('store.jobs', 'ERROR'):
+            jobs.work(burst=True)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+
+    @override_settings(STORE_JOB_TIMEOUT=60)
+    def test_jobs_of_dead_workers_are_requeued(self):
+        jobs.enqueue(record_job, key='stale')
+        job = jobs.claim('dead-worker')
+        Job.objects.update(locked_at=timezone.now() - timedelta(seconds=61))
+        self.assertEqual(jobs.requeue_stale(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+
+    @override_settings(STORE_JOB_BACKLOG_WARNING=60)
+    def test_unclaimed_jobs_are_reported(self):
+        jobs.enqueue(record_job, key='fresh')
+        Job.objects.update(run_at=timezone.now() - timedelta(seconds=61))
+        with mock.patch.object(jobs, '_backlog_checked', None):
+            with self.assertLogs('store.jobs', 'WARNING') as logs:
+                jobs.enqueue(record_job, key='next')
+            self.assertIn('run_store_worker', logs.output[0])
+            with self.assertNoLogs('store.jobs', 'WARNING'):
+                jobs.enqueue(record_job, key='soon after')  # checked once a minute
+
+    @override_settings(STORE_JOB_QUEUE=False)
+    def test_without_the_queue_jobs_run_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            place_order(self.user, [{'product': self.boots, 'quantity': 1}], 'cash', email='dara@example.com')
+        self.assertFalse(Job.objects.exists())
+        self.assertEqual(len(mail.outbox), 1)
+
+
+@override_settings(STORE_JOB_QUEUE=True)
+class JobWorkerTests(TransactionTestCase):
+    def run_worker(self, jobs_count, concurrency):
+        JOB_CALLS.clear()
+        for index in range(jobs_count):
+            jobs.enqueue(record_job, key=index)
+        out = io.StringIO()
+        with self.assertLogs('store.jobs', 'INFO'):
+            call_command('run_store_worker', '--burst', '--concurrency', str(concurrency), stdout=out)
+        self.assertEqual(sorted(JOB_CALLS), list(range(jobs_count)))
+        self.assertIn(f'{jobs_count} job(s) done, 0 failed', out.getvalue())
+        self.assertFalse(Job.objects.exists())
+
+    def test_worker_command_drains_the_queue(self):
+        self.run_worker(5, concurrency=1)
+
+    @skipUnless(connection.vendor == 'postgresql', "SQLite has no row locks to skip")
+    def test_concurrent_workers_run_each_job_once(self):
+        self.run_worker(200, concurrency=8)
+
+
+class RecommendationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='dara', password='secret')
+        shoes = Category.objects.create(name='Shoes')
+        cls.boots, cls.heels, cls.sandals = [
+            Product.objects.create(name=name, price=50, category=shoes, stock=100) for name in ('Boots', 'Heels', 'Sandals')
+        ]
+        care = Category.objects.create(name='Care')
+        cls.socks, cls.polish = [
+            Product.objects.create(name=name, price=5, category=care, stock=100) for name in ('Socks', 'Polish')
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def place(self, *products):
+        with self.captureOnCommitCallbacks(execute=True):
+            place_order(self.user, [{'product': p, 'quantity': 1} for p in products], 'khqr')
+
+    def recommended(self, product):
+        return list(product.recommendations.order_by('rank').values_list('recommended__name', 'orders'))
+
+    def test_orders_update_top_k_incrementally(self):
+        self.place(self.boots, self.socks)
+        self.place(self.boots, self.socks, self.polish)
+        self.place(self.boots, self.heels)
+        self.place(self.sandals)  # nothing to pair with
+        self.assertEqual(self.recommended(self.boots), [('Socks', 2), ('Heels', 1), ('Polish', 1)])
+        self.assertEqual(self.recommended(self.polish), [('Boots', 1), ('Socks', 1)])
+        self.assertEqual(self.recommended(self.sandals), [])
+        self.assertEqual(ProductPair.objects.get(product=self.socks, other=self.boots).orders, 2)
+
+        with override_settings(STORE_RECOMMENDATIONS_TOP_K=1):
+            self.place(self.heels, self.boots)
+        self.assertEqual(self.recommended(self.heels), [('Boots', 2)])
+
+    def test_refresh_drops_ranks_past_the_new_top_k(self):
+        self.place(self.boots, self.socks)
+        self.place(self.boots, self.socks)
+        self.place(self.boots, self.polish)
+        self.place(self.boots, self.heels)
+        self.assertEqual(self.recommended(self.boots), [('Socks', 2), ('Heels', 1), ('Polish', 1)])
+        self.heels.delete()
+        with CaptureQueriesContext(connection) as ctx:
+            self.place(self.boots, self.socks)
+        self.assertEqual(self.recommended(self.boots), [('Socks', 3), ('Polish', 1)])
+        self.assertEqual(sum('store_productpair' in q['sql'] and 'INSERT' in q['sql'] for q in ctx.captured_queries), 1)
+
+    def test_rebuild_matches_incremental_updates(self):
+        self.place(self.boots, self.socks)
+        self.place(self.boots, self.socks, self.polish)
+        self.place(self.heels, self.polish)
+        pairs = set(ProductPair.objects.values_list('product', 'other', 'orders'))
+        recommendations = set(Recommendation.objects.values_list('product', 'rank', 'recommended', 'orders'))
+
+        self.assertEqual(rebuild_recommendations(), (8, 8))
+        self.assertEqual(set(ProductPair.objects.values_list('product', 'other', 'orders')), pairs)
+        self.assertEqual(set(Recommendation.objects.values_list('product', 'rank', 'recommended', 'orders')), recommendations)
+
+    def test_new_recommendations_refresh_cached_pages(self):
+        url = reverse('store:product_detail', args=[self.boots.pk])
+        response = self.client.get(url)
+        self.assertEqual([p.name for p in response.context['related_products']()], ['Heels', 'Sandals'])
+
+        CatalogVersion.objects.update(updated_at=timezone.now() - timedelta(minutes=5))
+        version = CatalogVersion.objects.get().version
+        self.place(self.boots, self.polish)
+        self.assertGreater(CatalogVersion.objects.get().version, version)
+        response = self.client.get(url)
+        self.assertEqual([p.name for p in response.context['related_products']()], ['Polish', 'Heels', 'Sandals'])
+        self.assertContains(response, 'Polish')
+
+    def test_api_recommendations(self):
+        self.place(self.boots, self.socks, self.polish)
+        self.place(self.boots, self.polish)
+        url = reverse('store:product-recommendations', args=[self.boots.pk])
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual([p['name'] for p in response.json()], ['Polish', 'Socks'])
+        self.assertEqual(response.json()[0]['category_name'], 'Care')
+        self.assertEqual(len([q for q in ctx.captured_queries if 'store_recommendation' in q['sql']]), 1)
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        url = reverse('store:product-recommendations', args=[self.sandals.pk])
+        self.assertEqual(self.client.get(url).json(), [])
+        self.assertEqual(self.client.get(reverse('store:product-recommendations', args=[0])).status_code, 404)
@@ -1,7 +1,14 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from . import views, api_views
 
+if settings.STORE_ASYNC_VIEWS:
+    from . import async_views
+    catalog_views = async_views
+else:
+    catalog_views = views
+
 # Create a router and register our viewsets with it.
 router = DefaultRouter()
 router.register(r'categories', api_views.CategoryViewSet)
@@ -14,8 +21,8 @@ app_name = 'store'
 
 urlpatterns = [
     # Frontend
-    path('', views.index, name='index'),
-    path('product/<int:pk>/', views.product_detail, name='product_detail'),
+    path('', catalog_views.index, name='index'),
+    path('product/<int:pk>/', catalog_views.product_detail, name='product_detail'),
 
     # Authentication
     path('login/', views.login_view, name='login'),
@@ -23,7 +30,7 @@ urlpatterns = [
     path('logout/', views.logout_view, name='logout'),
 
     # Cart & Wishlist
-    path('cart/', views.cart, name='cart'),
+    path('cart/', catalog_views.cart, name='cart'),
     path('cart/add/<int:pk>/', views.add_to_cart, name='add_to_cart'),
     path('cart/update/<int:pk>/', views.update_cart, name='update_cart'),
     path('cart/remove/<int:pk>/', views.remove_from_cart, name='remove_from_cart'),
@@ -37,6 +44,7 @@ urlpatterns = [
     # =========================
     # Admin dashboard
     path('dashboard/', views.admin_dashboard, name='admin_dashboard'),  # make sure this exists
+    path('dashboard/perf/', views.perf_dashboard, name='perf_dashboard'),
     # Cart & Checkout
     path('checkout_selected/', views.checkout_selected, name='checkout_selected'),
 
@@ -57,3 +65,10 @@ urlpatterns = [
     # API
     path('api/', include(router.urls)),
 ]
+
+if settings.STORE_ASYNC_VIEWS:
+    # Ahead of the router, which keeps the other methods and routes
+    urlpatterns[-1:-1] = [
+        path('api/categories/', async_views.category_list),
+        path('api/products/', async_views.product_list),
+    ]
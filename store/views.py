@@ -1,29 +1,38 @@
+from django.conf import settings
 from django.utils import timezone
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth.models import User
-from django.db.models import Q
 from django.core.paginator import Paginator
 from django.contrib.admin.views.decorators import staff_member_required
 
 from .models import Product, Category, CartItem, WishlistItem, Order, OrderItem
 from .forms import ProductForm, CategoryForm
+from .search import search_products
+from .cart import get_cart
+from .orders import OutOfStock, place_order
+from .pagination import InvalidCursor, keyset_page
+from .catalog import catalog_page
+from .fragments import fragment_context, related_products
+from .reports import revenue_over_time, sales_summary, top_products
+from .replicas import read_from_replica
+from . import perf
 
 # ============================
 # 🏠 FRONTEND VIEWS
 # ============================
 
-def index(request):
-    products = Product.objects.all()
+def catalog_filters(request):
+    """The storefront product queryset narrowed by ?category=, ?min_price=
+    and ?max_price=, with the filter values for the template."""
+    products = Product.objects.select_related('category')
     query = request.GET.get('q', '')
     category_id = request.GET.get('category')
     min_price = request.GET.get('min_price')
     max_price = request.GET.get('max_price')
 
-    if query:
-        products = products.filter(Q(name__icontains=query) | Q(description__icontains=query))
     if category_id and category_id.isdigit():
         products = products.filter(category_id=int(category_id))
     
@@ -32,25 +41,51 @@ def index(request):
     if max_price and max_price.isdigit():
         products = products.filter(price__lte=float(max_price))
 
-    paginator = Paginator(products, 12) # Increased to match grid
-    page_obj = paginator.get_page(request.GET.get('page'))
-
-    return render(request, 'store/index.html', {
-        'products': page_obj,
+    return products, {
         'query': query,
         'selected_category': int(category_id) if category_id and category_id.isdigit() else None,
-        'page_obj': page_obj,
         'min_price': min_price,
         'max_price': max_price,
-    })
+    }
+
 
+def search_page(request, products, query):
+    # Relevance-ranked results are bounded, numbered pages are fine here
+    results = search_products(products, query)
+    paginator = Paginator(results, 12) # Increased to match grid
+    page_obj = paginator.get_page(request.GET.get('page'))
+    return {'products': page_obj, 'page_obj': page_obj, 'search_truncated': getattr(results, 'truncated', False)}
+
+
+@read_from_replica
+@catalog_page
+def index(request):
+    products, context = catalog_filters(request)
+    context.update(fragment_context(request))
 
+    if context['query']:
+        context.update(search_page(request, products, context['query']))
+    else:
+        # Browsing walks the whole catalog: keyset pages cost the same at any depth
+        try:
+            page, next_cursor, previous_cursor = keyset_page(products, ('id',), request.GET.get('cursor'), 12)
+        except InvalidCursor:
+            page, next_cursor, previous_cursor = keyset_page(products, ('id',), None, 12)
+        context.update(products=page, next_cursor=next_cursor, previous_cursor=previous_cursor)
+
+    return render(request, 'store/index.html', context)
+
+
+@read_from_replica
+@catalog_page
 def product_detail(request, pk):
-    product = get_object_or_404(Product, pk=pk)
-    related_products = Product.objects.filter(category=product.category).exclude(pk=pk)[:4]
+    product = get_object_or_404(Product.objects.select_related('category'), pk=pk)
+    context = fragment_context(request)
     return render(request, 'store/product_detail.html', {
         'product': product,
-        'related_products': related_products
+        # Only evaluated when the related-products fragment is not cached
+        'related_products': lambda: related_products(product, context['catalog_version']),
+        **context,
     })
 
 
@@ -58,38 +93,19 @@ def product_detail(request, pk):
 # 🛒 CART VIEWS
 # ============================
 
-@login_required
+# Anonymous visitors can fill a session cart; it is merged into their
+# CartItem rows when they log in (see store.cart).
+
 def add_to_cart(request, pk):
     product = get_object_or_404(Product, pk=pk)
-    cart = request.session.get('cart', {})
-
-    if str(pk) in cart:
-        cart[str(pk)]['quantity'] += 1
-    else:
-        cart[str(pk)] = {'quantity': 1, 'price': float(product.price)}
-
-    request.session['cart'] = cart
-    request.session.modified = True
+    get_cart(request).add(product.pk)
     messages.success(request, f"✅ {product.name} added to cart!")
 
     return redirect('store:cart')
 
 
-@login_required
 def cart(request):
-    cart_session = request.session.get('cart', {})
-    cart_items = []
-    total = 0
-
-    for pk, item in cart_session.items():
-        product = get_object_or_404(Product, pk=pk)
-        quantity = item.get('quantity', 1)
-        total += product.price * quantity
-        cart_items.append({
-            'product': product,
-            'quantity': quantity,
-            'total': product.price * quantity
-        })
+    cart_items, total = get_cart(request).lines()
 
     return render(request, 'store/cart.html', {
         'cart_items': cart_items,
@@ -97,86 +113,54 @@ def cart(request):
     })
 
 
-@login_required
 def update_cart(request, pk):
     if request.method == 'POST':
         action = request.POST.get('action')
-        cart = request.session.get('cart', {})
+        cart = get_cart(request)
 
-        if str(pk) in cart:
+        if pk in cart:
             if action == 'increase':
-                cart[str(pk)]['quantity'] += 1
+                cart.add(pk)
             elif action == 'decrease':
-                cart[str(pk)]['quantity'] -= 1
-                if cart[str(pk)]['quantity'] <= 0:
-                    del cart[str(pk)]
-            request.session['cart'] = cart
-            request.session.modified = True
+                cart.decrement(pk)
             messages.success(request, "Cart updated successfully ✅")
 
     return redirect('store:cart')
 
 
-@login_required
 def remove_from_cart(request, pk):
-    cart = request.session.get('cart', {})
-    if str(pk) in cart:
-        del cart[str(pk)]
-        request.session['cart'] = cart
-        request.session.modified = True
+    cart = get_cart(request)
+    if pk in cart:
+        cart.remove([pk])
         messages.info(request, "Removed from cart ❌")
     return redirect('store:cart')
 
 
+def _order_details(request):
+    # Checkout form field names come from the original Laravel templates
+    return {
+        'first_name': request.POST.get('name'),
+        'email': request.user.email if request.user.is_authenticated else request.POST.get('email', ''),
+        'address': request.POST.get('location'),
+        'city': request.POST.get('city', 'Phnom Penh'),
+        'phone': request.POST.get('phone'),
+    }
+
+
 @login_required
 def checkout(request):
-    cart = request.session.get('cart', {})
-    products = []
-    total = 0
-    for product_id, item in cart.items():
-        try:
-            product = Product.objects.get(pk=product_id)
-            products.append({
-                'product': product,
-                'quantity': item['quantity'],
-                'price': product.price
-            })
-            total += product.price * item['quantity']
-        except Product.DoesNotExist:
-            continue
+    cart = get_cart(request)
+    products, total = cart.lines()
 
     if request.method == 'POST':
-        # Create Order (Mapping Laravel field names)
-        order = Order.objects.create(
-            user=request.user,
-            first_name=request.POST.get('name'), # Laravel used 'name'
-            email=request.user.email if request.user.is_authenticated else request.POST.get('email', ''),
-            address=request.POST.get('location'), # Laravel used 'location'
-            city=request.POST.get('city', 'Phnom Penh'),
-            phone=request.POST.get('phone'),
-            total_amount=total + 2, # +2 for shipping in template
-            payment_method=request.POST.get('payment_method'),
-            # Recognize both aba_payway and khqr as 'Paid' for simulation
-            status='Paid' if request.POST.get('payment_method') in ['aba_payway', 'khqr'] else 'Pending'
-        )
-
-        # Create Order Items
-        for item in products:
-            OrderItem.objects.create(
-                order=order,
-                product=item['product'],
-                quantity=item['quantity'],
-                price=item['price']
-            )
-            
-            # Reduce stock
-            item['product'].stock -= item['quantity']
-            item['product'].save()
-
-        # Clear cart
-        request.session['cart'] = {}
-        request.session.modified = True
-        
+        try:
+            order = place_order(request.user, products, request.POST.get('payment_method'), **_order_details(request))
+        except OutOfStock as e:
+            messages.error(request, f"❌ {e}")
+            return redirect('store:cart')
+
+        cart.clear()
+
         messages.success(request, "✅ Order placed successfully!")
         return redirect('store:order_success', order_id=order.id)
 
@@ -200,44 +184,17 @@ def checkout_selected(request):
             # We need the product IDs either from hidden fields or we can pass them in the form
             # For simplicity, let's assume the template passes them as 'checkout_product_ids'
             product_ids = request.POST.getlist('checkout_product_ids')
-            cart = request.session.get('cart', {})
-            products_to_buy = []
-            total = 0
-            
-            for pid in product_ids:
-                if pid in cart:
-                    product = Product.objects.get(pk=pid)
-                    qty = cart[pid]['quantity']
-                    products_to_buy.append({'product': product, 'quantity': qty})
-                    total += product.price * qty
-            
-            # Create Order (Same logic as checkout)
-            order = Order.objects.create(
-                user=request.user,
-                first_name=request.POST.get('name'),
-                email=request.user.email if request.user.is_authenticated else request.POST.get('email', ''),
-                address=request.POST.get('location'),
-                city=request.POST.get('city', 'Phnom Penh'),
-                phone=request.POST.get('phone'),
-                total_amount=total + 2,
-                payment_method=request.POST.get('payment_method'),
-                status='Paid' if request.POST.get('payment_method') in ['aba_payway', 'khqr'] else 'Pending'
-            )
-
-            for item in products_to_buy:
-                OrderItem.objects.create(
-                    order=order,
-                    product=item['product'],
-                    quantity=item['quantity'],
-                    price=item['product'].price
-                )
-                item['product'].stock -= item['quantity']
-                item['product'].save()
-                # Remove ONLY selected items from cart
-                del cart[str(item['product'].id)]
-
-            request.session['cart'] = cart
-            request.session.modified = True
+            cart = get_cart(request)
+            products_to_buy, total = cart.lines(product_ids)
+
+            try:
+                order = place_order(request.user, products_to_buy, request.POST.get('payment_method'), **_order_details(request))
+            except OutOfStock as e:
+                messages.error(request, f"❌ {e}")
+                return redirect('store:cart')
+
+            # Remove ONLY selected items from cart
+            cart.remove([item['product'].id for item in products_to_buy])
             messages.success(request, "✅ Order placed successfully!")
             return redirect('store:order_success', order_id=order.id)
 
@@ -246,23 +203,7 @@ def checkout_selected(request):
             messages.warning(request, "⚠️ Please select at least one product to checkout.")
             return redirect('store:cart')
 
-        cart = request.session.get('cart', {})
-        selected_products = []
-        total = 0
-
-        for product_id in selected_ids:
-            if product_id in cart:
-                try:
-                    product = Product.objects.get(pk=product_id)
-                    quantity = cart[product_id]['quantity']
-                    selected_products.append({
-                        'product': product,
-                        'quantity': quantity,
-                        'total': product.price * quantity
-                    })
-                    total += product.price * quantity
-                except Product.DoesNotExist:
-                    continue
+        selected_products, total = get_cart(request).lines(selected_ids)
 
         return render(request, 'store/checkout.html', {
             'products': selected_products, # Standard structure: List of dicts with 'product' and 'quantity'
@@ -310,17 +251,6 @@ def remove_from_wishlist(request, pk):
     return redirect('store:wishlist')
 
 
-# ============================
-# NAVBAR CONTEXT PROCESSOR
-# ============================
-
-def cart_and_wishlist_counts(request):
-    cart = request.session.get('cart', {})
-    wishlist_count = WishlistItem.objects.filter(user=request.user).count() if request.user.is_authenticated else 0
-    cart_count = sum(item['quantity'] for item in cart.values())
-    return {'cart_item_count': cart_count, 'wishlist_item_count': wishlist_count}
-
-
 # ============================
 # AUTHENTICATION
 # ============================
@@ -373,25 +303,45 @@ def logout_view(request):
 admin_required = user_passes_test(lambda u: u.is_staff)
 
 @admin_required
+@read_from_replica
 def admin_dashboard(request):
-    total_revenue = sum(order.total_amount for order in Order.objects.filter(status='Paid'))
+    sales = sales_summary()
     total_orders = Order.objects.count()
     total_products = Product.objects.count()
     total_customers = User.objects.filter(is_staff=False).count()
     
     recent_orders = Order.objects.all().order_by('-created_at')[:5]
     
-    # Simple growth simulation data (Optional for UI)
+    # Revenue and widgets read DailySalesRollup rows only (see store.reports)
     stats = {
-        'revenue': total_revenue,
+        'revenue': sales['total']['revenue'],
+        'today': sales['today'],
         'orders': total_orders,
         'products': total_products,
         'customers': total_customers,
-        'recent_orders': recent_orders
+        'recent_orders': recent_orders,
+        'revenue_over_time': revenue_over_time(),
+        'top_products': top_products(),
     }
     return render(request, 'store/admin/dashboard.html', stats)
 
 
+@admin_required
+def perf_dashboard(request):
+    # Aggregated by store.middleware.PerfMiddleware; ?hours=1..24
+    try:
+        hours = int(request.GET.get('hours', 1))
+    except ValueError:
+        hours = 1
+    hours = max(1, min(hours, perf.MAX_HOURS))
+    return render(request, 'store/admin/perf.html', {
+        'rows': perf.summary(hours),
+        'hours': hours,
+        'hour_choices': (1, 6, 24),
+        'sample_rate': settings.STORE_PERF_SAMPLE_RATE,
+    })
+
+
 # ===== PRODUCTS CRUD =====
 @admin_required
 def product_list(request):